@@ -0,0 +1,94 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+"""
+Measures how many ops per second are constructed when building an unrolled LSTM.
+
+Usage:
+    python op_construction.py --steps 100
+"""
+from __future__ import division
+from __future__ import print_function
+import argparse
+import time
+
+import numpy as np
+
+import ngraph as ng
+from ngraph.op_graph.op_graph import Op
+
+
+def unrolled_lstm(steps, hidden=128, features=64, batch=32):
+    """
+    Builds a graph for an LSTM unrolled over steps time steps.
+
+    Returns:
+        The output of the last step.
+    """
+    F = ng.make_axis(length=features, name='F')
+    H = ng.make_axis(length=hidden, name='H')
+    H2 = ng.make_axis(length=hidden, name='H2')
+    N = ng.make_axis(length=batch, name='N')
+
+    def gate_weights():
+        return (ng.variable([H, F], initial_value=np.zeros((hidden, features))),
+                ng.variable([H, H2], initial_value=np.zeros((hidden, hidden))),
+                ng.variable([H], initial_value=0.0))
+
+    gates = {name: gate_weights() for name in ('i', 'f', 'o', 'g')}
+    h = ng.constant(0.0, [H, N])
+    c = ng.constant(0.0, [H, N])
+    for _ in range(steps):
+        x = ng.placeholder([F, N])
+        h_prev = ng.cast_axes(h, [H2, N])
+
+        def gate(name, activation):
+            W_input, W_recur, b = gates[name]
+            return activation(ng.dot(W_input, x) + ng.dot(W_recur, h_prev) + b)
+        i = gate('i', ng.sigmoid)
+        f = gate('f', ng.sigmoid)
+        o = gate('o', ng.sigmoid)
+        g = gate('g', ng.tanh)
+        c = f * c + i * g
+        h = o * ng.tanh(c)
+    return h
+
+
+def run_benchmark(steps, fast, repeats):
+    """
+    Builds the graph repeats times and reports the best rate.
+    """
+    best = 0
+    for _ in range(repeats):
+        ops = []
+        start = time.time()
+        with Op.all_ops(ops):
+            if fast:
+                with ng.fast_construction():
+                    unrolled_lstm(steps)
+            else:
+                unrolled_lstm(steps)
+        elapsed = time.time() - start
+        best = max(best, len(ops) / elapsed)
+    print("steps: {}, ops: {}, fast_construction: {}, ops/sec: {:.0f}"
+          .format(steps, len(ops), fast, best))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--steps', type=int, default=100, help="LSTM time steps")
+    parser.add_argument('--repeats', type=int, default=3, help="Times to build the graph")
+    args = parser.parse_args()
+    for fast in (False, True):
+        run_benchmark(args.steps, fast, args.repeats)
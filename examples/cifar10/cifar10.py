@@ -14,7 +14,8 @@
 # ----------------------------------------------------------------------------
 import numpy as np
 import os
-from ngraph.util.persist import pickle_load, valid_path_append, fetch_file
+from ngraph.util.persist import pickle_load, valid_path_append, fetch_file, \
+    save_dataset, load_dataset
 import tarfile
 
 
@@ -34,7 +35,7 @@ class CIFAR10(object):
 
     def load_data(self):
         """
-        Fetch the CIFAR-10 dataset and load it into memory.
+        Fetch the CIFAR-10 dataset and memory-map it.
 
         Arguments:
             path (str, optional): Local directory in which to cache the raw
@@ -46,6 +47,26 @@ class CIFAR10(object):
             tuple: Both training and test sets are returned.
         """
         workdir, filepath = valid_path_append(self.path, '', self.filename)
+        # The unpickled data is saved as .npy files, which later loads memory-map
+        npydir = os.path.join(workdir, 'cifar-10-npy')
+        if not os.path.exists(npydir):
+            train_set, valid_set = self.load_pickled_data(workdir, filepath)
+            save_dataset(npydir + '.tmp', {'train': train_set, 'valid': valid_set})
+            os.rename(npydir + '.tmp', npydir)
+
+        dataset = load_dataset(npydir)
+        self.train_set = dataset['train']
+        self.valid_set = dataset['valid']
+
+        return self.train_set, self.valid_set
+
+    def load_pickled_data(self, workdir, filepath):
+        """
+        Fetch the CIFAR-10 dataset and unpickle it.
+
+        Returns:
+            tuple: Both training and test sets are returned.
+        """
         if not os.path.exists(filepath):
             fetch_file(self.url, self.filename, filepath, self.size)
 
@@ -71,13 +92,13 @@ class CIFAR10(object):
             X_test, y_test = d['data'], d['labels']
             X_test = X_test.reshape(-1, 3, 32, 32)
 
-        self.train_set = {'image': {'data': X_train,
-                                    'axes': ('batch', 'C', 'height', 'width')},
-                          'label': {'data': y_train,
-                                    'axes': ('batch',)}}
-        self.valid_set = {'image': {'data': X_test,
-                                    'axes': ('batch', 'C', 'height', 'width')},
-                          'label': {'data': np.array(y_test),
-                                    'axes': ('batch',)}}
+        train_set = {'image': {'data': X_train,
+                               'axes': ('batch', 'C', 'height', 'width')},
+                     'label': {'data': y_train,
+                               'axes': ('batch',)}}
+        valid_set = {'image': {'data': X_test,
+                               'axes': ('batch', 'C', 'height', 'width')},
+                     'label': {'data': np.array(y_test),
+                               'axes': ('batch',)}}
 
-        return self.train_set, self.valid_set
+        return train_set, valid_set
@@ -22,7 +22,9 @@ from ngraph.transformers.base import UnsupportedTransformerException
 from ngraph.op_graph.convolution import convolution
 from ngraph.op_graph.pooling import pooling
 from ngraph.op_graph.lookuptable import lookuptable
+from ngraph.op_graph.lstm import lstm_cell
 from ngraph.op_graph.ctc import ctc
+from ngraph.op_graph.scan import scan
 from ngraph.op_graph.debug import PrintOp
 from ngraph.op_graph.op_graph import *
 from ngraph.op_graph.op_graph import axes_with_order, \
@@ -52,6 +54,7 @@ __all__ = [
     'exp',
     'log',
     'lookuptable',
+    'lstm_cell',
     'ctc',
     'make_axes',
     'make_axis',
@@ -63,6 +66,7 @@ __all__ = [
     'pooling',
     'reciprocal',
     'safelog',
+    'scan',
     'sequential',
     'sigmoid',
     'sign',
@@ -16,13 +16,41 @@ import numpy as np
 import ngraph as ng
 from future.utils import viewitems
 import six
+from six.moves import queue
 from ngraph.frontends.neon import ax
+from ngraph.util.persist import load_dataset
 import collections
+import sys
+import threading
+
+
+def load_directory(directory):
+    """
+    Memory-maps a dataset saved by ngraph.util.persist.save_dataset, for the iterators.
+
+    Arguments:
+        directory (str): The directory the dataset was saved to.
+
+    Returns:
+        dict: A mapping from names to dicts with the keys 'data' and 'axes'. The axes of the
+              arrays saved without axes are None.
+
+    Raises:
+        ValueError: if the dataset holds other datasets, such as train and valid
+                    subdirectories, which must be given to separate iterators.
+    """
+    data_arrays = {}
+    for k, v in viewitems(load_dataset(directory)):
+        if isinstance(v, dict) and 'data' not in v:
+            raise ValueError("{} holds the nested dataset {}; create an iterator for its "
+                             "directory instead".format(directory, k))
+        data_arrays[k] = v if isinstance(v, dict) else {'data': v, 'axes': None}
+    return data_arrays
 
 
 class ArrayIterator(object):
 
-    def __init__(self, data_arrays, batch_size, total_iterations=None):
+    def __init__(self, data_arrays, batch_size, total_iterations=None, shuffle=False):
         """
         During initialization, the input data will be converted to backend tensor objects
         (e.g. CPUTensor or GPUTensor). If the backend uses the GPU, the data is copied over to the
@@ -30,14 +58,21 @@ class ArrayIterator(object):
 
         Args:
             data_arrays (ndarray, shape: [# examples, feature size]): Input features of the
-                dataset.
+                dataset. It may also be the directory of a dataset saved by
+                ngraph.util.persist.save_dataset, which is memory-mapped so that only the
+                examples of each minibatch are read.
             batch_size (int): number of examples in each minibatch
             total_iterations (int): number of minibatches to cycle through on this iterator.
                                     If not provided, it will cycle through all of the data once.
+            shuffle (bool): if True, the examples are visited in a new random order on every
+                            pass through the data. Only the order is permuted; the data is not
+                            copied.
         """
         # Treat singletons like list so that iteration follows same syntax
         self.batch_size = batch_size
         self.axis_names = None
+        if isinstance(data_arrays, six.string_types):
+            data_arrays = load_directory(data_arrays)
         if isinstance(data_arrays, dict):
             self.data_arrays = {k: v['data'] for k, v in data_arrays.items()}
             self.axis_names = {k: v['axes'] for k, v in data_arrays.items()}
@@ -59,6 +94,8 @@ class ArrayIterator(object):
 
         self.start = 0
         self.index = 0
+        self.shuffle = shuffle
+        self.order = np.random.permutation(self.ndata) if shuffle else None
 
         self.total_iterations = self.nbatches if total_iterations is None else total_iterations
 
@@ -91,36 +128,100 @@ class ArrayIterator(object):
         self.start = 0
         self.index = 0
 
-    def __iter__(self):
+    def minibatch_rows(self):
         """
-        Returns a new minibatch of data with each call.
+        Advances through the minibatches without reading their data.
 
         Yields:
-            tuple: The next minibatch which includes both features and labels.
+            tuple: The iteration number of the next minibatch and its rows in the data arrays,
+                as a slice or as an array of indices.
         """
-        i1 = self.start
         while self.index < self.total_iterations:
             i1 = (self.start + self.index * self.batch_size) % self.ndata
             bsz = min(self.batch_size, self.ndata - i1)
-            oslice1 = slice(i1, i1 + bsz)
             self.index += 1
 
-            if self.batch_size > bsz:
-                batch_bufs = {k: np.concatenate([src[oslice1], src[:self.batch_size - bsz]])
-                              for k, src in self.data_arrays.items()}
+            if self.order is not None:
+                rows = self.order[i1:i1 + bsz]
+                if i1 + bsz == self.ndata:
+                    # The pass through the data is finished, so start another order
+                    self.order = np.random.permutation(self.ndata)
+                    if self.batch_size > bsz:
+                        rows = np.concatenate([rows, self.order[:self.batch_size - bsz]])
+            elif self.batch_size > bsz:
+                rows = np.concatenate([np.arange(i1, self.ndata),
+                                       np.arange(self.batch_size - bsz)])
             else:
-                batch_bufs = {k: src[oslice1] for k, src in self.data_arrays.items()}
+                rows = slice(i1, i1 + bsz)
 
-            batch_bufs['iteration'] = self.index
-            yield batch_bufs
+            yield self.index, rows
 
         self.start = (self.start + self.total_iterations * self.batch_size) % self.ndata
 
+    def make_batch_buffers(self):
+        """
+        Returns:
+            dict: An array for the data of each key, with the shape and dtype of a minibatch.
+        """
+        return {k: np.empty((self.batch_size,) + src.shape[1:], dtype=src.dtype)
+                for k, src in self.data_arrays.items()}
+
+    def get_batch(self, rows, out=None):
+        """
+        Reads the data of a minibatch.
+
+        Args:
+            rows (slice or ndarray): The rows of the minibatch, from minibatch_rows.
+            out (dict, optional): Arrays to write the data of each key into, such as those of
+                make_batch_buffers.
+
+        Returns:
+            dict: The data of each key. Unless out is given, the data of rows given by a slice
+                is a view of the data arrays.
+        """
+        if out is None:
+            return {k: src[rows] for k, src in self.data_arrays.items()}
+        for k, src in self.data_arrays.items():
+            if isinstance(rows, slice) or out[k].dtype != src.dtype:
+                out[k][...] = src[rows]
+            else:
+                # The rows are in range; unlike the default mode, 'clip' writes into out
+                # without a temporary
+                np.take(src, rows, axis=0, out=out[k], mode='clip')
+        return out
+
+    def __iter__(self):
+        """
+        Returns a new minibatch of data with each call.
+
+        Yields:
+            tuple: The next minibatch which includes both features and labels.
+        """
+        for iteration, rows in self.minibatch_rows():
+            batch_bufs = self.get_batch(rows)
+            batch_bufs['iteration'] = iteration
+            yield batch_bufs
+
 
 class SequentialArrayIterator(object):
 
     def __init__(self, data_arrays, time_steps, batch_size,
-                 total_iterations=None, reverse_target=False, get_prev_target=False):
+                 total_iterations=None, reverse_target=False, get_prev_target=False,
+                 shuffle=False):
+        """
+        Args:
+            data_arrays (dict): The sequence of each key, as an ndarray. It may also be the
+                directory of a dataset saved by ngraph.util.persist.save_dataset, which is
+                memory-mapped so that only the sequences of each minibatch are read.
+            time_steps (int): number of time steps in each minibatch
+            batch_size (int): number of sequences in each minibatch
+            total_iterations (int): number of minibatches to cycle through on this iterator.
+                                    If not provided, it will cycle through all of the data once.
+            reverse_target (bool): if True, the time steps of 'tgt_txt' are reversed.
+            get_prev_target (bool): if True, 'prev_tgt' is 'tgt_txt' delayed by a time step.
+            shuffle (bool): if True, the minibatches are visited in a new random order on every
+                            pass through the data.
+        """
         self.get_prev_target = get_prev_target
         self.reverse_target = reverse_target
 
@@ -128,6 +229,8 @@ class SequentialArrayIterator(object):
         self.time_steps = time_steps
         self.index = 0
 
+        if isinstance(data_arrays, six.string_types):
+            data_arrays = {k: v['data'] for k, v in viewitems(load_directory(data_arrays))}
         if isinstance(data_arrays, dict):
             self.data_arrays = {k: v for k, v in viewitems(data_arrays)}
         else:
@@ -151,11 +254,14 @@ class SequentialArrayIterator(object):
         ) for k, x in viewitems(self.data_arrays)}
 
         if self.reverse_target:
-            self.data_arrays['tgt_txt'][:] = self.data_arrays['tgt_txt'][:, :, ::-1]
+            self.data_arrays['tgt_txt'] = self.data_arrays['tgt_txt'][:, :, ::-1]
 
         if self.get_prev_target:
             self.data_arrays['prev_tgt'] = np.roll(self.data_arrays['tgt_txt'], shift=1, axis=2)
 
+        self.shuffle = shuffle
+        self.order = np.random.permutation(self.nbatches) if shuffle else None
+
     def make_placeholders(self):
         batch_axis = ng.make_axis(length=self.batch_size, name="N")
         time_axis = ng.make_axis(length=self.time_steps, name="REC")
@@ -165,9 +271,142 @@ class SequentialArrayIterator(object):
     def reset(self):
         self.index = 0
 
-    def __iter__(self):
+    def minibatch_rows(self):
+        """
+        Advances through the minibatches without reading their data.
+
+        Yields:
+            tuple: The iteration number of the next minibatch and its index along the
+                minibatches of the data arrays.
+        """
         while self.index < self.total_iterations:
             idx = self.index % self.nbatches
             self.index += 1
+            if self.order is not None:
+                rows = self.order[idx]
+                if idx == self.nbatches - 1:
+                    self.order = np.random.permutation(self.nbatches)
+                idx = rows
+
+            yield self.index, idx
+
+    def make_batch_buffers(self):
+        """
+        Returns:
+            dict: An array for the data of each key, with the shape and dtype of a minibatch.
+        """
+        return {k: np.empty((self.batch_size, self.time_steps), dtype=x.dtype)
+                for k, x in viewitems(self.data_arrays)}
+
+    def get_batch(self, idx, out=None):
+        """
+        Reads the data of a minibatch.
+
+        Args:
+            idx (int): The index of the minibatch, from minibatch_rows.
+            out (dict, optional): Arrays to write the data of each key into, such as those of
+                make_batch_buffers.
+
+        Returns:
+            dict: The data of each key. Unless out is given, it is a view of the data arrays.
+        """
+        if out is None:
+            return {k: np.squeeze(x[:, idx:(idx + 1), :]) for k, x in viewitems(self.data_arrays)}
+        for k, x in viewitems(self.data_arrays):
+            out[k][...] = x[:, idx, :]
+        return out
+
+    def __iter__(self):
+        for _, idx in self.minibatch_rows():
+            yield self.get_batch(idx)
+
 
-            yield {k: np.squeeze(x[:, idx:(idx + 1), :]) for k, x in viewitems(self.data_arrays)}
+class PrefetchIterator(object):
+    """
+    Reads the minibatches of an ArrayIterator or a SequentialArrayIterator in a background
+    thread, while the minibatches before them are used.
+
+    The minibatches are written into a ring of depth buffers that are reused, so a minibatch
+    yielded by this iterator is only valid until the next one is requested.
+
+    Args:
+        dataset (ArrayIterator or SequentialArrayIterator): The iterator to read from.
+        depth (int): number of buffers, so up to depth - 1 minibatches are read ahead of the
+                     minibatch being used.
+
+    Attributes of dataset, such as ndata or make_placeholders, are available on this iterator.
+    """
+
+    def __init__(self, dataset, depth=2):
+        if depth < 1:
+            raise ValueError('The depth of a PrefetchIterator must be at least 1')
+        self.dataset = dataset
+        self.depth = depth
+        self.buffers = [dataset.make_batch_buffers() for _ in range(depth)]
+        self._thread = None
+
+    def __getattr__(self, attr):
+        return getattr(self.dataset, attr)
+
+    def _read(self, free, ready, stop):
+        """
+        Reads minibatches into the free buffers and passes them to the consumer, until the
+        dataset is exhausted or stop is set.
+        """
+        try:
+            for iteration, rows in self.dataset.minibatch_rows():
+                buffers = free.get()
+                if stop.is_set():
+                    return
+                self.dataset.get_batch(rows, out=buffers)
+                ready.put((iteration, buffers, None))
+            ready.put((None, None, None))
+        except Exception:
+            ready.put((None, None, sys.exc_info()))
+
+    def close(self):
+        """
+        Stops reading ahead, waiting for the background thread to finish.
+        """
+        if self._thread is not None:
+            self._stop.set()
+            # Wake the thread up in case it is waiting for a buffer
+            self._free.put(None)
+            self._thread.join()
+            self._thread = None
+
+    def reset(self):
+        self.close()
+        self.dataset.reset()
+
+    def __iter__(self):
+        """
+        Yields:
+            dict: The next minibatch, in buffers that are reused once the next minibatch is
+                requested.
+        """
+        self.close()
+        self._free = queue.Queue()
+        self._ready = queue.Queue()
+        self._stop = threading.Event()
+        for buffers in self.buffers:
+            self._free.put(buffers)
+        self._thread = threading.Thread(target=self._read,
+                                        args=(self._free, self._ready, self._stop))
+        self._thread.daemon = True
+        self._thread.start()
+
+        try:
+            while True:
+                iteration, buffers, exc_info = self._ready.get()
+                if exc_info is not None:
+                    six.reraise(*exc_info)
+                if buffers is None:
+                    break
+                batch = dict(buffers)
+                if isinstance(self.dataset, ArrayIterator):
+                    batch['iteration'] = iteration
+                yield batch
+                self._free.put(buffers)
+        finally:
+            self.close()
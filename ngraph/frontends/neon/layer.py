@@ -20,6 +20,7 @@ from contextlib import contextmanager
 from cachetools import cached, keys
 import ngraph as ng
 from ngraph.frontends.neon.axis import shadow_axes_map, is_shadow_axis, reorder_spatial_axes
+from ngraph.frontends.neon.activation import Logistic, Tanh
 
 
 def output_dim(X, S, padding, strides, pooling=False, dilation=1):
@@ -662,6 +663,9 @@ class Recurrent(Layer):
                             set to False to be stateful.
         return_sequence (bool): default to be True to return the whole sequence output.
         backward (bool): default to be False to process the sequence left to right
+        unroll (bool): default to be True to build the graph of a step for every time step.
+                       If False, a single step graph is run for every time step with ng.scan
+                       (CPU transformer only).
         name (str, optional): name to refer to this layer as.
 
     Attributes:
@@ -674,7 +678,7 @@ class Recurrent(Layer):
     metadata = {'layer_type': 'recurrent'}
 
     def __init__(self, nout, init, init_inner=None, activation=None, batch_norm=False,
-                 reset_cells=True, return_sequence=True, backward=False, **kwargs):
+                 reset_cells=True, return_sequence=True, backward=False, unroll=True, **kwargs):
         super(Recurrent, self).__init__(**kwargs)
 
         self.nout = nout
@@ -684,6 +688,7 @@ class Recurrent(Layer):
         self.reset_cells = reset_cells
         self.return_sequence = return_sequence
         self.backward = backward
+        self.unroll = unroll
         self.batch_norm = BatchNorm() if batch_norm is True else None
         self.w_in_axes = None
 
@@ -776,6 +781,14 @@ class Recurrent(Layer):
         if self.batch_norm is not None:
             h_ff = self.batch_norm(h_ff)
 
+        if not self.unroll:
+            def step(h_ff, h):
+                h = self._step(h_ff, h)
+                return [h], [h] if self.return_sequence else []
+            (h,), outputs = ng.scan(step, [h_ff], [self.h_init], self.recurrent_axis,
+                                    reverse=self.backward, pos=self.recurrent_axis_idx)
+            return outputs[0] if self.return_sequence else h
+
         # slice the weighted inputs into time slices
         in_s = get_steps(h_ff, self.recurrent_axis, self.backward)
 
@@ -818,13 +831,16 @@ class BiRNN(Layer):
         concat_out (bool): default to False. When True, concatenate the outputs from both
                            directions. If concat_out and sum_out are both False, output will be a
                            list.
+        unroll (bool): default to be True to build the graph of a step for every time step.
+                       If False, a single step graph is run for every time step with ng.scan
+                       (CPU transformer only).
         name (str, optional): name to refer to this layer as.
     """
     metadata = {'layer_type': 'birnn'}
 
     def __init__(self, nout, init, init_inner=None, activation=None, batch_norm=False,
                  reset_cells=False, return_sequence=True, sum_out=False,
-                 concat_out=False, **kwargs):
+                 concat_out=False, unroll=True, **kwargs):
         if sum_out and concat_out:
             raise ValueError("sum_out and concat_out cannot both be True")
 
@@ -834,10 +850,11 @@ class BiRNN(Layer):
         self.nout = nout
         self.fwd_rnn = Recurrent(nout, init, init_inner, activation=activation,
                                  batch_norm=batch_norm, reset_cells=reset_cells,
-                                 return_sequence=return_sequence)
+                                 return_sequence=return_sequence, unroll=unroll)
         self.bwd_rnn = Recurrent(nout, init, init_inner, activation=activation,
                                  batch_norm=batch_norm, reset_cells=reset_cells,
-                                 return_sequence=return_sequence, backward=True)
+                                 return_sequence=return_sequence, backward=True,
+                                 unroll=unroll)
 
     @ng.with_op_metadata
     @cached({})
@@ -920,6 +937,12 @@ class LSTM(Recurrent):
                             set to False to be stateful.
         return_sequence (bool): default to be True to return the whole sequence output.
         backward (bool): default to be False to process the sequence left to right
+        unroll (bool): default to be True to build the graph of a step for every time step.
+                       If False, a single step graph is run for every time step with ng.scan
+                       (CPU transformer only).
+        fused_cell (bool): default to be False. If True, the gates and states of a step are
+                           computed by one kernel with ng.lstm_cell (CPU transformer only).
+                           Requires the Tanh activation and the Logistic gate activation.
         name (str, optional): name to refer to this layer as.
     Attributes:
         W_input (Tensor): weights from inputs to output units
@@ -929,32 +952,45 @@ class LSTM(Recurrent):
         b (Tensor): Biases on output units (output_size, 1)
 
     Gates: i - input gate, f - forget gate, o - output gate, g - input modulation
+
+    The weights and biases of the gates are stacked along gate_axis, so that the inputs of all
+    gates and time steps are weighted by one dot, and each step has one recurrent dot.
     """
     metadata = {'layer_type': 'LSTM',
                 'gates': ['i', 'f', 'o', 'g']}
 
     def __init__(self, nout, init, init_inner=None, activation=None, gate_activation=None,
                  batch_norm=False, reset_cells=True, return_sequence=True, backward=False,
-                 **kwargs):
+                 unroll=True, fused_cell=False, **kwargs):
         super(LSTM, self).__init__(nout, init, init_inner=init_inner, activation=activation,
                                    reset_cells=reset_cells, return_sequence=return_sequence,
-                                   backward=backward, **kwargs)
+                                   backward=backward, unroll=unroll, **kwargs)
 
         if batch_norm is True:
             self.batch_norm = {k: BatchNorm() for k in self.metadata["gates"]}
         else:
             self.batch_norm = None
         self.gate_activation = gate_activation if gate_activation is not None else self.activation
-
-    def _step(self, h_ff, states):
+        if fused_cell and not (isinstance(self.activation, Tanh) and
+                               isinstance(self.gate_activation, Logistic)):
+            raise ValueError("fused_cell requires the Tanh activation and the Logistic "
+                             "gate activation")
+        self.fused_cell = fused_cell
+        self.gate_axis = ng.make_axis(length=len(self.metadata['gates']), name='gates')
+
+    def _step(self, h_ff, states, W_recur, b):
         h_state = states[0]
         c_state = states[1]
-        ifog = {
-            k: sum([ng.cast_role(h_ff[k], self.out_axes),
-                    ng.cast_role(ng.dot(self.W_recur[k], h_state), self.out_axes),
-                    self.b[k],
-                    ]) for k in self.metadata['gates']
-        }
+        gate_axes = ng.make_axes([self.gate_axis]) + self.out_axes
+        ifog = (ng.cast_role(h_ff, gate_axes) +
+                ng.cast_role(ng.dot(W_recur, h_state), gate_axes) +
+                b)
+        if self.fused_cell:
+            h, c = ng.lstm_cell(ifog, c_state, self.gate_axis)
+            return [h, c]
+
+        ifog = {k: ng.slice_along_axis(ifog, self.gate_axis, i)
+                for i, k in enumerate(self.metadata['gates'])}
         ifog_act = {k: self.activation(ifog[k]) if k is 'g'
                     else self.gate_activation(ifog[k]) for k in self.metadata['gates']}
 
@@ -1026,32 +1062,47 @@ class LSTM(Recurrent):
         h_list = []
         c_list = []
 
-        # Compute feed forward weighted inputs
+        gates = self.metadata['gates']
+        W_input = ng.stack([self.W_input[k] for k in gates], self.gate_axis, pos=0)
+        W_recur = ng.stack([self.W_recur[k] for k in gates], self.gate_axis, pos=0)
+        b = ng.stack([self.b[k] for k in gates], self.gate_axis, pos=0)
+
+        # Compute feed forward weighted inputs of all gates
         # Batch norm is computed only on the weighted inputs
         # as in https://arxiv.org/abs/1510.01378
-        h_ff = dict()
-        for k in self.metadata["gates"]:
-            h_ff[k] = ng.dot(self.W_input[k], in_obj)
-            if self.batch_norm is not None:
-                h_ff[k] = self.batch_norm[k](h_ff[k])
+        h_ff = ng.dot(W_input, in_obj)
+        if self.batch_norm is not None:
+            h_ff = ng.stack([self.batch_norm[k](ng.slice_along_axis(h_ff, self.gate_axis, i))
+                             for i, k in enumerate(gates)], self.gate_axis, pos=0)
 
+        if self.unroll:
             # slice the weighted inputs into time slices
-        h_ff = get_steps(h_ff, self.recurrent_axis, self.backward)
-
-        # recurrent computation
-        for i in range(self.recurrent_axis.length):
-            with ng.metadata(recurrent_step=str(i)):
-                [h, c] = self._step(h_ff[i], [h, c])
-                h_list.append(h)
-                c_list.append(c)
-
-        if self.return_sequence is True:
-            if self.backward:
-                h_list = h_list[::-1]
-                c_list = c_list[::-1]
-            lstm_out = ng.stack(h_list, self.recurrent_axis, pos=self.recurrent_axis_idx)
+            h_ff = get_steps(h_ff, self.recurrent_axis, self.backward)
+
+            # recurrent computation
+            for i in range(self.recurrent_axis.length):
+                with ng.metadata(recurrent_step=str(i)):
+                    [h, c] = self._step(h_ff[i], [h, c], W_recur, b)
+                    h_list.append(h)
+                    c_list.append(c)
+
+            if self.return_sequence is True:
+                if self.backward:
+                    h_list = h_list[::-1]
+                    c_list = c_list[::-1]
+                lstm_out = ng.stack(h_list, self.recurrent_axis, pos=self.recurrent_axis_idx)
+            else:
+                lstm_out = h_list[-1]
         else:
-            lstm_out = h_list[-1]
+            def step(h_ff, h, c, W_recur, b):
+                h, c = self._step(h_ff, [h, c], W_recur, b)
+                return [h, c], [h] if self.return_sequence else []
+            (h, c), outputs = ng.scan(step, [h_ff], [h, c], self.recurrent_axis,
+                                      non_sequences=[W_recur, b], reverse=self.backward,
+                                      pos=self.recurrent_axis_idx)
+            h_list = [h]
+            c_list = [c]
+            lstm_out = outputs[0] if self.return_sequence else h
 
         if self.reset_cells is True:
             return lstm_out
@@ -17,6 +17,7 @@ from builtins import object, zip
 import ngraph as ng
 import numbers
 import ngraph.frontends.common.learning_rate_policies as lrp
+from ngraph.op_graph.lookuptable import LookupTableOp, lookuptable_assign, sparse_lut_gradient
 
 
 def get_learning_rate_policy_callback(lr_params):
@@ -107,11 +108,36 @@ class Optimizer(object):
         pass
 
 
+def lookup_rows(tensor, fprop):
+    """
+    Looks up the rows of a tensor with the axes of a lookup table at the indices of a lookup.
+
+    Arguments:
+        tensor (TensorOp): A tensor with the axes of the lookup table of fprop.
+        fprop (LookupTableOp): The lookup.
+
+    Returns:
+        The rows, with the axes of fprop.
+    """
+    return LookupTableOp(tensor, fprop.args[1], axes=fprop.axes, update=False)
+
+
 class LearningRateOptimizer(Optimizer):
+    """
+    Arguments:
+        learning_rate: The learning rate, or the parameters of a learning rate policy.
+        iteration: The iteration for the learning rate policy.
+        sparse_updates (bool): If True, the gradients of lookup tables are computed as the
+            rows for the looked up indices, and only those rows of the lookup tables and of
+            their optimizer states are updated. Rows that are not looked up are not updated,
+            so momentum and decay only apply to a row when it is looked up. Only supported by
+            the CPU transformer.
+    """
 
-    def __init__(self, learning_rate, iteration=None, **kwargs):
+    def __init__(self, learning_rate, iteration=None, sparse_updates=False, **kwargs):
         super(LearningRateOptimizer, self).__init__(**kwargs)
         self.lrate = get_learning_rate_policy_callback(learning_rate)(iteration)
+        self.sparse_updates = sparse_updates
 
     @ng.with_op_metadata
     def __call__(self, cost_func, variable_scope=None):
@@ -122,16 +148,43 @@ class LearningRateOptimizer(Optimizer):
         selected_variables = batch_cost.variables()
         if variable_scope is not None:
             selected_variables = [op for op in selected_variables if op.scope == variable_scope]
-        grads = [ng.deriv(batch_cost, v) / batch_size for v in selected_variables]
+        derivs = [ng.deriv(batch_cost, v) for v in selected_variables]
+        grads = [deriv / batch_size for deriv in derivs]
         scale_factor = clip_gradient_norm(grads, self.gradient_clip_norm)
 
-        for variable, grad in zip(selected_variables, grads):
-            updates = self.variable_update(variable, grad, scale_factor)
+        for i, (variable, deriv) in enumerate(zip(selected_variables, derivs)):
+            sparse_grad = sparse_lut_gradient(deriv) if self.sparse_updates else None
+            updates = None
+            if sparse_grad is not None:
+                fprop, rows = sparse_grad
+                rows = rows / batch_size
+                updates = self.sparse_variable_update(variable, fprop, rows, scale_factor)
+                if updates is not None and self.gradient_clip_norm is None:
+                    # The dense gradient is not needed
+                    grads[i] = rows
+            if updates is None:
+                updates = self.variable_update(variable, grads[i], scale_factor)
             all_updates.append(updates)
         updates = ng.doall(all_updates)
         grads = ng.doall(grads)
         return ng.sequential([grads, updates, 0])
 
+    def sparse_variable_update(self, variable, fprop, rows, scale_factor):
+        """
+        Updates the rows of a lookup table that were looked up, when sparse_updates is True.
+
+        Arguments:
+            variable: The lookup table.
+            fprop: The LookupTableOp that looked up the rows.
+            rows: The gradient of the looked up rows.
+            scale_factor: The gradient scale from gradient norm clipping.
+
+        Returns:
+            The update op, or None to update the whole table with the dense gradient through
+            variable_update, as optimizers that do not override this method do.
+        """
+        return None
+
 
 class GradientDescentMomentum(LearningRateOptimizer):
     """
@@ -204,6 +257,23 @@ class GradientDescentMomentum(LearningRateOptimizer):
         updates.append(ng.assign(variable, variable + delta))
         return ng.sequential(updates)
 
+    def sparse_variable_update(self, variable, fprop, rows, scale_factor):
+        velocity = ng.persistent_tensor(axes=variable.axes,
+                                        initial_value=0.).named(variable.name + '_vel')
+        variable_rows = lookup_rows(variable, fprop)
+        clip_grad = clip_gradient_value(rows, self.gradient_clip_value)
+        lr = - self.lrate * (scale_factor * clip_grad + self.wdecay * variable_rows)
+        velocity_rows = lookup_rows(velocity, fprop) * self.momentum_coef + lr
+        if self.nesterov:
+            delta = (self.momentum_coef * velocity_rows + lr)
+        else:
+            delta = velocity_rows
+        idx = fprop.args[1]
+        return ng.sequential([
+            lookuptable_assign(velocity, idx, velocity_rows, fprop.lut_axis),
+            lookuptable_assign(variable, idx, variable_rows + delta, fprop.lut_axis)
+        ])
+
 
 class RMSProp(LearningRateOptimizer):
     """
@@ -262,3 +332,19 @@ class RMSProp(LearningRateOptimizer):
                                             / (ng.sqrt(state + epsilon) + epsilon)))
         ])
         return updates
+
+    def sparse_variable_update(self, variable, fprop, rows, scale_factor):
+        epsilon, decay = (self.epsilon, self.decay_rate)
+        grad = clip_gradient_value(rows, self.gradient_clip_value)
+        state = ng.persistent_tensor(axes=variable.axes, initial_value=0.)
+        state_rows = decay * lookup_rows(state, fprop) + (1.0 - decay) * ng.square(grad)
+        idx = fprop.args[1]
+        updates = ng.sequential([
+            lookuptable_assign(state, idx, state_rows, fprop.lut_axis),
+            lookuptable_assign(variable, idx,
+                               lookup_rows(variable, fprop) -
+                               ((scale_factor * grad * self.lrate) /
+                                (ng.sqrt(state_rows + epsilon) + epsilon)),
+                               fprop.lut_axis)
+        ])
+        return updates
@@ -0,0 +1,133 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+'''
+Test of the array iterators
+'''
+import pytest
+import numpy as np
+
+from ngraph.frontends.neon import ArrayIterator, SequentialArrayIterator, PrefetchIterator
+from ngraph.util.persist import save_dataset
+
+
+def make_data(ndata=10):
+    return {'image': {'data': np.arange(ndata * 6, dtype=np.float32).reshape(ndata, 2, 3),
+                      'axes': ('N', 'C', 'W')},
+            'label': {'data': np.arange(ndata, dtype=np.int32), 'axes': ('N',)}}
+
+
+def copy_batches(dataset):
+    return [{k: np.copy(v) for k, v in batch.items()} for batch in dataset]
+
+
+def assert_batches_equal(batches, expected):
+    assert len(batches) == len(expected)
+    for batch, expected_batch in zip(batches, expected):
+        assert sorted(batch.keys()) == sorted(expected_batch.keys())
+        for k in batch.keys():
+            np.testing.assert_array_equal(batch[k], expected_batch[k])
+
+
+@pytest.mark.parametrize('depth', [1, 2, 3])
+def test_prefetch_array_iterator(depth):
+    # 7 minibatches of 4 wrap around the 10 examples
+    expected = copy_batches(ArrayIterator(make_data(), 4, total_iterations=7))
+    dataset = PrefetchIterator(ArrayIterator(make_data(), 4, total_iterations=7), depth=depth)
+    assert dataset.nbatches == 3
+    assert_batches_equal(copy_batches(dataset), expected)
+
+    dataset.reset()
+    assert_batches_equal(copy_batches(dataset), expected)
+
+
+def test_prefetch_sequential_array_iterator():
+    data = {'inp_txt': np.arange(60), 'tgt_txt': np.arange(1, 61)}
+    expected = copy_batches(SequentialArrayIterator(data, 5, 3, total_iterations=6))
+    dataset = PrefetchIterator(SequentialArrayIterator(data, 5, 3, total_iterations=6))
+    assert_batches_equal(copy_batches(dataset), expected)
+
+
+def test_shuffle():
+    dataset = ArrayIterator(make_data(), 5, total_iterations=4, shuffle=True)
+    batches = copy_batches(PrefetchIterator(dataset))
+    for epoch in (batches[:2], batches[2:]):
+        labels = np.concatenate([batch['label'] for batch in epoch])
+        np.testing.assert_array_equal(np.sort(labels), np.arange(10))
+        for batch in epoch:
+            np.testing.assert_array_equal(batch['image'][:, 0, 0], batch['label'] * 6)
+
+    data = {'inp_txt': np.arange(60), 'tgt_txt': np.arange(1, 61)}
+    batches = copy_batches(SequentialArrayIterator(data, 5, 3, shuffle=True))
+    expected = copy_batches(SequentialArrayIterator(data, 5, 3))
+    assert_batches_equal(sorted(batches, key=lambda batch: batch['inp_txt'][0, 0]), expected)
+
+
+def test_prefetch_stop():
+    dataset = PrefetchIterator(ArrayIterator(make_data(), 2, total_iterations=5), depth=3)
+    for batch in dataset:
+        break
+    dataset.close()
+    assert batch['iteration'] == 1
+    assert dataset.dataset.index >= 1
+
+    dataset.reset()
+    assert len(copy_batches(dataset)) == 5
+
+
+def test_prefetch_error():
+    class BrokenIterator(ArrayIterator):
+        def get_batch(self, rows, out=None):
+            raise RuntimeError('broken')
+
+    dataset = PrefetchIterator(BrokenIterator(make_data(), 2))
+    with pytest.raises(RuntimeError):
+        copy_batches(dataset)
+
+
+def test_memory_mapped_dataset(tmpdir):
+    directory = str(tmpdir.join('dataset'))
+    save_dataset(directory, make_data())
+    expected = copy_batches(ArrayIterator(make_data(), 4, total_iterations=4))
+    assert_batches_equal(copy_batches(ArrayIterator(directory, 4, total_iterations=4)),
+                         expected)
+    assert_batches_equal(copy_batches(PrefetchIterator(ArrayIterator(directory, 4,
+                                                                     total_iterations=4))),
+                         expected)
+
+    directory = str(tmpdir.join('sequences'))
+    data = {'inp_txt': np.arange(60), 'tgt_txt': np.arange(1, 61)}
+    save_dataset(directory, data)
+    expected = copy_batches(SequentialArrayIterator(data, 5, 3, reverse_target=True))
+    assert_batches_equal(copy_batches(SequentialArrayIterator(directory, 5, 3,
+                                                              reverse_target=True)),
+                         expected)
+
+    # Arrays saved without axes
+    directory = str(tmpdir.join('bare'))
+    data = {k: v['data'] for k, v in make_data().items()}
+    save_dataset(directory, data)
+    expected = copy_batches(ArrayIterator({k: {'data': v, 'axes': None}
+                                           for k, v in data.items()}, 2))
+    assert_batches_equal(copy_batches(ArrayIterator(directory, 2)), expected)
+
+    # Datasets with train and valid subdirectories
+    directory = str(tmpdir.join('nested'))
+    save_dataset(directory, {'train': make_data(), 'valid': make_data(4)})
+    with pytest.raises(ValueError):
+        ArrayIterator(directory, 2)
+    with pytest.raises(ValueError):
+        SequentialArrayIterator(directory, 2, 2)
+    assert_batches_equal(copy_batches(ArrayIterator(directory + '/valid', 2)),
+                         copy_batches(ArrayIterator(make_data(4), 2)))
@@ -97,8 +97,6 @@ class RNNHelper(object):
     def __getattr__(self, attr):
         if attr in ('gmean', 'gvar', 'gamma', 'beta'):
             return getattr(self.batch_norm_dict[self.default_gate], attr)
-        elif attr == 'reference_W_input':
-            return self.reference_rnn.W_input[self.default_gate]
         else:
             return super(RNNHelper, self).__getattr__(attr)
 
@@ -107,13 +105,20 @@ class RNNHelper(object):
         return self.reference_rnn.metadata.get('gates') is not None
 
     # Since we only want to look at the delta back to a single gate, rather than summed over all
-    # gates, we can find the dot op between the input and the chosen gate's identity weight matrix
+    # gates, we can find the dot op between the input and the stacked identity weight matrices
+    # of the gates, and take the chosen gate's slice of the delta
     def get_ancestor_op(self, op):
+        gate_axis = self.reference_rnn.gate_axis
         for anc_op in ng.Op.ordered_ops([op]):
             if (isinstance(anc_op, ng.DotOp) and
-               any(arg.tensor == self.reference_W_input for arg in anc_op.args)):
+               any(gate_axis in arg.axes for arg in anc_op.args)):
                 return anc_op
 
+    def get_gate_delta(self, delta, op):
+        gate_axis = self.reference_rnn.gate_axis
+        index = self.reference_rnn.metadata['gates'].index(self.default_gate)
+        return np.take(delta, index, axis=op.axes.index(gate_axis))
+
 
 # TODO: Move the following *_size fixtures to conftest.py and refactor other tests to use them
 @pytest.fixture(params=[32])
@@ -289,7 +294,8 @@ def test_recurrent_batchnorm_bprop(RNN, recurrent_input, output_size,
     # Handle the case where we have gates in the RNN object
     bprop_vars = [helper.reference_input]
     if helper.has_gates:
-        bprop_vars.append(helper.get_ancestor_op(reference_fprop))
+        gate_op = helper.get_ancestor_op(reference_fprop)
+        bprop_vars.append(gate_op)
 
     reference_delta_placeholder = ng.placeholder(reference_fprop.axes)
     reference_bprop = [ng.deriv(reference_fprop, var,
@@ -328,7 +334,7 @@ def test_recurrent_batchnorm_bprop(RNN, recurrent_input, output_size,
 
         # Backprop through reference batch norm for a single gate
         if helper.has_gates:
-            rnn_gate_delta = reference_result[1]
+            rnn_gate_delta = helper.get_gate_delta(reference_result[1], gate_op)
             _, dgamma_ref, dbeta_ref = batch_norm_reference.bprop(rnn_gate_delta)
 
         # Backprop through weighted input
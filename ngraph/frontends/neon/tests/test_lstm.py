@@ -61,7 +61,10 @@ def pytest_generate_tests(metafunc):
         out_rng = [4]
         iter_rng = [2]
         reset_rng = [True, False]
-        fargs = itt.product(seq_rng, inp_rng, out_rng, bsz_rng, iter_rng, reset_rng)
+        unroll_rng = [True, False]
+        fused_rng = [False, True]
+        fargs = itt.product(seq_rng, inp_rng, out_rng, bsz_rng, iter_rng, reset_rng, unroll_rng,
+                            fused_rng)
         metafunc.parametrize('reflstmargs', fargs)
 
 
@@ -70,25 +73,32 @@ def test_ref_compare_rand(transformer_factory, reflstmargs):
             pytest.xfail("Hetr is expected to fail with code that checks side-effects")
         # run comparison with reference code
         # for Gaussian random init
-        seq_len, input_size, hidden_size, batch_size, num_iter, reset_cells = reflstmargs
+        seq_len, input_size, hidden_size, batch_size, num_iter, reset_cells, unroll, \
+            fused_cell = reflstmargs
+        if (not unroll or fused_cell) and transformer_factory.name != 'cpu':
+            pytest.skip("scan and fused_cell are only supported by the CPU transformer")
         check_lstm(seq_len, input_size, hidden_size, batch_size,
                    GaussianInit(0.0, 0.1), reset_cells=reset_cells,
-                   num_iter=num_iter)
+                   num_iter=num_iter, unroll=unroll, fused_cell=fused_cell)
 
 
 def test_ref_stacked(transformer_factory, reflstmargs):
         if transformer_factory.name == 'hetr':
             pytest.xfail("Hetr is expected to fail with code that checks side-effects")
-        seq_len, input_size, hidden_size, batch_size, num_iter, reset_cells = reflstmargs
+        seq_len, input_size, hidden_size, batch_size, num_iter, reset_cells, unroll, \
+            fused_cell = reflstmargs
+        if (not unroll or fused_cell) and transformer_factory.name != 'cpu':
+            pytest.skip("scan and fused_cell are only supported by the CPU transformer")
         check_stacked_lstm(seq_len, input_size, hidden_size, batch_size,
                            GaussianInit(0.0, 0.1), reset_cells=reset_cells,
-                           num_iter=num_iter)
+                           num_iter=num_iter, unroll=unroll, fused_cell=fused_cell)
 
 
 # compare ngraph LSTM to reference LSTM implementation
 def check_lstm(seq_len, input_size, hidden_size,
                batch_size, init_func, return_seq=True, backward=False,
-               reset_cells=False, num_iter=2):
+               reset_cells=False, num_iter=2, unroll=True,
+               fused_cell=False):
 
     Cin = ng.make_axis(input_size, name='Feature')
     REC = ng.make_axis(seq_len, name='REC')
@@ -101,7 +111,7 @@ def check_lstm(seq_len, input_size, hidden_size,
 
         lstm_ng = LSTM(hidden_size, init_func, activation=Tanh(), gate_activation=Logistic(),
                        reset_cells=reset_cells, return_sequence=return_seq,
-                       backward=backward)
+                       backward=backward, unroll=unroll, fused_cell=fused_cell)
 
         out_ng = lstm_ng(inp_ng)
 
@@ -169,7 +179,8 @@ def check_lstm(seq_len, input_size, hidden_size,
 # compare ngraph LSTM to reference LSTM implementation
 def check_stacked_lstm(seq_len, input_size, hidden_size,
                        batch_size, init_func, return_seq=True, backward=False,
-                       reset_cells=False, num_iter=2):
+                       reset_cells=False, num_iter=2, unroll=True,
+                       fused_cell=False):
 
     Cin = ng.make_axis(input_size, name='Feature')
     REC = ng.make_axis(seq_len, name='REC')
@@ -182,10 +193,12 @@ def check_stacked_lstm(seq_len, input_size, hidden_size,
 
         lstm_ng_1 = LSTM(hidden_size, init_func, activation=Tanh(),
                          gate_activation=Logistic(), reset_cells=reset_cells,
-                         return_sequence=return_seq, backward=backward)
+                         return_sequence=return_seq, backward=backward, unroll=unroll,
+                         fused_cell=fused_cell)
         lstm_ng_2 = LSTM(hidden_size + 1, init_func, activation=Tanh(),
                          gate_activation=Logistic(), reset_cells=reset_cells,
-                         return_sequence=return_seq, backward=backward)
+                         return_sequence=return_seq, backward=backward, unroll=unroll,
+                         fused_cell=fused_cell)
 
         out_ng_1 = lstm_ng_1(inp_ng)
         out_ng_2 = lstm_ng_2(out_ng_1)
@@ -19,7 +19,7 @@ Test of the optimizers
 import pytest
 import numpy as np
 import ngraph as ng
-from ngraph.frontends.neon import GradientDescentMomentum, LearningRateOptimizer
+from ngraph.frontends.neon import GradientDescentMomentum, LearningRateOptimizer, RMSProp
 from ngraph.testing.execution import ExecutorFactory
 
 pytestmark = [pytest.mark.transformer_dependent("module"),
@@ -117,6 +117,76 @@ def test_gdm(random_learning_rate, random_momentum_coef, wdecay, nesterov, trans
             ng.testing.assert_allclose(np_W, ng_W, rtol=1e-3)
 
 
+@pytest.mark.parametrize("optimizer", [
+    (GradientDescentMomentum, dict(learning_rate=0.1, momentum_coef=0.9, wdecay=0.01)),
+    (GradientDescentMomentum, dict(learning_rate=0.1, momentum_coef=0.5, nesterov=True)),
+    (RMSProp, dict(learning_rate=0.01, decay_rate=0.9))])
+def test_sparse_updates(transformer_factory, optimizer):
+    optimizer_cls, optimizer_args = optimizer
+    V = ng.make_axis(6)
+    F = ng.make_axis(4)
+    N = ng.make_axis(8, name='N')
+    idx = ng.placeholder([N])
+    data = ng.placeholder([N, F])
+    np_W = np.random.rand(V.length, F.length)
+
+    def train(sparse_updates):
+        W = ng.variable([V, F], initial_value=np_W)
+        lookup = ng.lookuptable(W, idx, ng.make_axes([N, F]))
+        cost = ng.sum(ng.square(lookup - data), out_axes=[N])
+        optimizer = optimizer_cls(sparse_updates=sparse_updates, **optimizer_args)
+        return ng.sequential([optimizer(cost), W])
+
+    dense, sparse = train(False), train(True)
+    with ExecutorFactory() as ex:
+        dense_step = ex.transformer.computation(dense, idx, data)
+        sparse_step = ex.transformer.computation(sparse, idx, data)
+        for _ in range(4):
+            # Every row is looked up at every step, so the updates are the same
+            idx_value = np.concatenate([np.random.permutation(V.length),
+                                        np.random.randint(V.length, size=2)])
+            data_value = np.random.rand(N.length, F.length)
+            ng.testing.assert_allclose(sparse_step(idx_value, data_value),
+                                       dense_step(idx_value, data_value), rtol=1e-4)
+
+        # Rows that are not looked up are not updated
+        before = np.copy(sparse_step(np.zeros(N.length), data_value))
+        after = sparse_step(np.ones(N.length), data_value)
+        ng.testing.assert_allclose(after[2:], before[2:])
+        assert not np.allclose(after[1], before[1])
+
+
+class PlainGradientDescent(LearningRateOptimizer):
+    """
+    An optimizer that only implements the dense update.
+    """
+    gradient_clip_norm = None
+
+    def variable_update(self, variable, grad, scale_factor):
+        return ng.assign(variable, variable - self.lrate * scale_factor * grad)
+
+
+def test_sparse_updates_fall_back_to_dense(transformer_factory):
+    V = ng.make_axis(6)
+    F = ng.make_axis(4)
+    N = ng.make_axis(8, name='N')
+    idx = ng.placeholder([N])
+    np_W = np.random.rand(V.length, F.length)
+
+    def train(sparse_updates):
+        W = ng.variable([V, F], initial_value=np_W)
+        cost = ng.sum(ng.square(ng.lookuptable(W, idx, ng.make_axes([N, F]))), out_axes=[N])
+        optimizer = PlainGradientDescent(0.1, sparse_updates=sparse_updates)
+        return ng.sequential([optimizer(cost), W])
+
+    dense, sparse = train(False), train(True)
+    with ExecutorFactory() as ex:
+        dense_step = ex.transformer.computation(dense, idx)
+        sparse_step = ex.transformer.computation(sparse, idx)
+        idx_value = np.random.randint(V.length, size=N.length)
+        ng.testing.assert_allclose(sparse_step(idx_value), dense_step(idx_value), rtol=1e-5)
+
+
 def test_learning_policy_step(transformer_factory):
     base_learning_rate = 1.0
     drop_factor = 0.1
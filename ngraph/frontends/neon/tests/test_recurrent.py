@@ -121,9 +121,12 @@ def make_weights(input_placeholder, hidden_size, weight_initializer, bias_initia
 @pytest.mark.parametrize("init_state", [True, False])
 @pytest.mark.parametrize("extra_axes", [0, 2])
 @pytest.mark.parametrize("backward", [True, False])
+@pytest.mark.parametrize("unroll", [True, False])
 def test_rnn_fprop(sequence_length, input_size, hidden_size, batch_size,
                    return_sequence, weight_initializer, bias_initializer,
-                   init_state, extra_axes, backward, transformer_factory):
+                   init_state, extra_axes, backward, unroll, transformer_factory):
+    if not unroll and transformer_factory.name != 'cpu':
+        pytest.skip("scan is only supported by the CPU transformer")
 
     assert batch_size == 1, "the recurrent reference implementation only support batch size 1"
 
@@ -149,7 +152,7 @@ def test_rnn_fprop(sequence_length, input_size, hidden_size, batch_size,
     # Generate ngraph RNN
     rnn_ng = Recurrent(hidden_size, init=W_in, init_inner=W_rec, activation=Tanh(),
                        reset_cells=True, return_sequence=return_sequence,
-                       backward=backward)
+                       backward=backward, unroll=unroll)
 
     # fprop ngraph RNN
     out_ng = rnn_ng(input_placeholder, init_state=init_state)
@@ -238,9 +241,12 @@ def test_rnn_deriv_ref(sequence_length, input_size, hidden_size, batch_size,
 @pytest.mark.parametrize("hidden_size", [10])
 @pytest.mark.parametrize("return_sequence", [True, False])
 @pytest.mark.parametrize("backward", [True, False])
+@pytest.mark.parametrize("unroll", [True, False])
 def test_rnn_deriv_numerical(sequence_length, input_size, hidden_size, batch_size,
                              return_sequence, weight_initializer, bias_initializer,
-                             backward, transformer_factory):
+                             backward, unroll, transformer_factory):
+    if not unroll and transformer_factory.name != 'cpu':
+        pytest.skip("scan is only supported by the CPU transformer")
 
     # Get input placeholder and numpy array
     input_placeholder, input_value = make_placeholder(input_size, sequence_length, batch_size)
@@ -253,7 +259,7 @@ def test_rnn_deriv_numerical(sequence_length, input_size, hidden_size, batch_siz
     # Generate ngraph RNN
     rnn_ng = Recurrent(hidden_size, init=W_in, init_inner=W_rec, activation=Tanh(),
                        reset_cells=True, return_sequence=return_sequence,
-                       backward=backward)
+                       backward=backward, unroll=unroll)
 
     # fprop ngraph RNN
     out_ng = rnn_ng(input_placeholder)
@@ -14,7 +14,6 @@
 # ----------------------------------------------------------------------------
 from __future__ import division
 
-import uuid
 import collections
 import operator
 import itertools
@@ -25,7 +24,7 @@ import numpy as np
 import types
 from builtins import object, map, zip
 
-from ngraph.util.names import NameableValue
+from ngraph.util.names import LazyUUID, NameableValue, next_uuid_int
 from ngraph.flex.base import Flex
 
 
@@ -77,8 +76,10 @@ def make_axes(axes=()):
         axes: A list of Axis.
 
     Returns:
-        Axes: An Axes.
+        Axes: An Axes, axes itself if it is one.
     """
+    if isinstance(axes, Axes):
+        return axes
     return Axes(axes=axes)
 
 
@@ -108,6 +109,7 @@ class Axis(object):
         recurrent: Whether the axis is a recurrent axis.
     """
     __name_counter = 0
+    uuid = LazyUUID()
 
     def __init__(self,
                  length=None,
@@ -127,7 +129,7 @@ class Axis(object):
             raise ValueError("Axis length {} must be >= 0".format(length))
         self.__length = length
 
-        self.uuid = uuid.uuid4()
+        self._uuid = next_uuid_int()
 
     def named(self, name):
         self.name = name
@@ -311,8 +313,23 @@ class Axes(object):
     An Axes is a tuple of Axis objects used as a label for a tensor's
     dimensions.
     """
+    __slots__ = ('_axes', '_uuid', 'name', '__weakref__')
+    uuid = LazyUUID()
 
     def __init__(self, axes=None):
+        self._uuid = next_uuid_int()
+        if isinstance(axes, Axes):
+            # Already checked
+            self._axes = axes._axes
+            return
+        if isinstance(axes, types.GeneratorType):
+            axes = tuple(axes)
+        if isinstance(axes, (list, tuple)) and all(isinstance(x, Axis) for x in axes):
+            # The common case of a sequence of Axis needs no conversion
+            if len(set(axis.name for axis in axes)) == len(axes):
+                self._axes = tuple(axes)
+                return
+
         if axes is None:
             axes = []
         elif isinstance(axes, Axis):
@@ -358,7 +375,6 @@ class Axes(object):
                 .format(str(duplicates(axes)))
             )
         self._axes = tuple(axes)
-        self.uuid = uuid.uuid4()
 
     @property
     def full_lengths(self):
@@ -1085,6 +1101,7 @@ class TensorDescription(NameableValue):
         self.__layout = layout
         self.__value = None
         self.__buffer = None
+        self.__buffer_offset = 0
         self.__register = None
         self.__base = base
         self.dtype = default_dtype(dtype)
@@ -1161,7 +1178,8 @@ class TensorDescription(NameableValue):
         """
         Returns: A tuple that can be used to tell if two views of a tensor are equivalent.
         """
-        return (self.shape, self.dtype, self.offset, self.strides, self.layout)
+        return (self.shape, self.dtype, self.buffer_offset + self.offset, self.strides,
+                self.layout)
 
     def flatten(self, new_axes):
         """
@@ -1602,6 +1620,23 @@ class TensorDescription(NameableValue):
         """
         self.base.__buffer = value
 
+    @property
+    def buffer_offset(self):
+        """The byte offset of the underlying storage within its buffer."""
+        return self.base.__buffer_offset
+
+    @buffer_offset.setter
+    def buffer_offset(self, value):
+        """
+        Sets the byte offset of the underlying storage within a shared buffer.
+
+        Arguments:
+          value: the offset in bytes
+
+        Returns:
+        """
+        self.base.__buffer_offset = value
+
     @property
     def register(self):
         return self.base.__register
@@ -14,6 +14,7 @@
 # ----------------------------------------------------------------------------
 from __future__ import division
 from ngraph.op_graph.op_graph import TensorOp, make_axes, make_axis, compute_reduction_axes
+from ngraph.util.shared_queue import SharedArrayQueue, SharedArrayExchange
 from orderedset import OrderedSet
 import multiprocessing
 
@@ -300,10 +301,16 @@ class GPUCudaGatherRecvOp(GatherRecvOp):
 
 
 class CPUQueueSendOp(SendOp):
+    """
+    Sends a tensor to a CPUQueueRecvOp in another process through a SharedArrayQueue.
+
+    Arguments:
+        from_node: The source node.
+    """
 
     def __init__(self, from_node):
         super(CPUQueueSendOp, self).__init__(from_node)
-        self._queue = multiprocessing.Queue()
+        self._queue = SharedArrayQueue(self.axes.lengths, self.dtype)
 
     @property
     def queue(self):
@@ -322,10 +329,19 @@ class CPUQueueRecvOp(RecvOp):
 
 
 class CPUQueueScatterSendOp(ScatterSendOp):
+    """
+    Sends a slice of a tensor to each CPUQueueScatterRecvOp through a SharedArrayQueue per
+    destination.
+
+    Arguments:
+        from_node: The source node.
+        to_node: The destination node.
+    """
 
     def __init__(self, from_node, to_node):
         super(CPUQueueScatterSendOp, self).__init__(from_node, to_node)
-        self._shared_queues = [multiprocessing.Queue() for i in to_node.metadata['device_id']]
+        self._shared_queues = [SharedArrayQueue(self.axes.lengths, self.dtype)
+                               for i in to_node.metadata['device_id']]
 
     @property
     def shared_queues(self):
@@ -345,11 +361,21 @@ class CPUQueueScatterRecvOp(ScatterRecvOp):
 
 
 class CPUQueueGatherSendOp(GatherSendOp):
+    """
+    Sends the slice of a tensor computed by one device to the CPUQueueGatherRecvOp through
+    a SharedArrayQueue per source.
+
+    Arguments:
+        from_node: The source node, before it is cloned for each device.
+    """
 
     def __init__(self, from_node):
         super(CPUQueueGatherSendOp, self).__init__(from_node)
         self.idx = 0
-        self._shared_queues = [multiprocessing.Queue() for i in from_node.metadata['device_id']]
+        # The queues are made before the graph is split, so they are sized for the whole
+        # tensor
+        self._shared_queues = [SharedArrayQueue(self.axes.lengths, self.dtype)
+                               for i in from_node.metadata['device_id']]
 
     @property
     def shared_queues(self):
@@ -387,21 +413,28 @@ class AllReduceOp(CommunicationOp):
 
 class CPUQueueAllReduceOp(AllReduceOp):
     """
-    Represents CPU-based queue implementation for AllReduce op. Sets reduction function and creates
-    shared queues.
+    Represents CPU-based implementation for AllReduce op. Sets reduction function and creates
+    the SharedArrayExchange the devices reduce through.
 
     Arguments:
         x: The input node.
         func: The reduction function, e.g. 'sum', 'mean'.
+        algorithm: 'ring', 'tree' or 'auto', see SharedArrayExchange.
     """
-    def __init__(self, input_node, func=None):
+    def __init__(self, input_node, func=None, algorithm='auto'):
         super(CPUQueueAllReduceOp, self).__init__(x=input_node,
                                                   out_axes=input_node.axes,
                                                   dtype=input_node.dtype)
         self.idx = 0
         self.reduce_func = func
-        self._shared_queues = [multiprocessing.Queue() for i in input_node.metadata['device_id']]
+        self._exchange = SharedArrayExchange(self.axes.lengths, self.dtype,
+                                             len(input_node.metadata['device_id']),
+                                             algorithm=algorithm)
 
     @property
-    def shared_queues(self):
-        return self._shared_queues
+    def algorithm(self):
+        return self._exchange.algorithm
+
+    @property
+    def exchange(self):
+        return self._exchange
@@ -13,7 +13,8 @@
 # limitations under the License.
 # ----------------------------------------------------------------------------
 from __future__ import division
-from ngraph.op_graph.op_graph import TensorOp
+from ngraph.op_graph.axes import make_axes
+from ngraph.op_graph.op_graph import Op, TensorOp, axes_with_order
 
 
 def lookuptable(lut, idx, axes, update=True, pad_idx=None, docstring=None):
@@ -51,6 +52,41 @@ def lookuptable_update(delta, lut, idx, fprop_op):
     return update_lut(delta, lut, idx, fprop_op)
 
 
+def lookuptable_assign(lut, idx, rows, lut_axis):
+    """
+    An operation to set the rows of the lookup table lut at idx.
+
+    Args:
+        lut (TensorOp): The lookup table.
+        idx (TensorOp): The indices of the rows to set.
+        rows (TensorOp): The rows, with the axes of a lookup of idx in lut. Rows for the same
+            index must be the same.
+        lut_axis (int): The axis of lut that idx indexes.
+
+    Returns:
+        Op: The assignment.
+    """
+    return LookupTableAssignOp(lut, idx, rows, lut_axis)
+
+
+def sparse_lut_gradient(grad):
+    """
+    Finds the row-sparse form of the gradient of a lookup table.
+
+    Args:
+        grad (TensorOp): The gradient of a lookup table, as returned by ng.deriv.
+
+    Returns:
+        The LookupTableOp of the lookup and an update_lut_rows with the rows of the gradient
+        for its indices, or None if grad is not the gradient of a single updated lookup.
+    """
+    grad = grad.forwarded
+    if not isinstance(grad, update_lut) or not grad.update:
+        return None
+    delta, idx = grad.args
+    return grad.fprop.forwarded, update_lut_rows(delta, idx, grad.fprop)
+
+
 class LookupTableOp(TensorOp):
 
     def __init__(self, lut, idx, axes, update=True, pad_idx=None, **kwargs):
@@ -168,6 +204,50 @@ class update_lut(LutDerivOp):
         )
 
 
+class update_lut_rows(LutDerivOp):
+    def __init__(self, delta, idx, fprop, **kwargs):
+        """
+        The rows of the gradient of the lookup table for each index, which is the sparse form
+        of update_lut. The row for an index is the sum of the rows of delta for all
+        occurrences of the index, and 0 for pad_idx.
+
+        Arguments:
+            delta : the delta of the lookup.
+            idx  : indices for lookup
+        """
+        super(update_lut_rows, self).__init__(
+            args=(delta, idx),
+            fprop=fprop,
+            axes=delta.axes, **kwargs
+        )
+
+
+class LookupTableAssignOp(Op):
+    """
+    Sets the rows of a lookup table at indices.
+
+    Arguments:
+        lut: The lookup table.
+        idx: The indices.
+        rows: The rows, with the axes of a lookup of idx in lut.
+        lut_axis: The axis of lut that idx indexes.
+    """
+    def __init__(self, lut, idx, rows, lut_axis, **kwargs):
+        rows_axes = list(lut.axes)
+        rows_axes[lut_axis] = idx.axes[0]
+        rows = axes_with_order(rows, make_axes(rows_axes))
+        super(LookupTableAssignOp, self).__init__(args=(lut, idx, rows), **kwargs)
+        self.lut_axis = lut_axis
+
+    @property
+    def states_written(self):
+        return self.args[0].states_read
+
+    @property
+    def states_read(self):
+        return self.args[2].states_read
+
+
 class bprop_lut(LutDerivOp):
     def __init__(self, delta, lut, idx, fprop, **kwargs):
         """
@@ -0,0 +1,99 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+from __future__ import division
+from ngraph.op_graph.axes import make_axis, make_axes
+from ngraph.op_graph.op_graph import TensorOp, axes_with_order, slice_along_axis
+
+# The axis of the output of LSTMCellOp, along which it has the hidden state, the cell state,
+# the activations of the gates i, f, o and g, and tanh of the cell state
+lstm_cell_axis = make_axis(length=7, name='lstm_cell')
+
+
+def lstm_cell(ifog, c_prev, gate_axis):
+    """
+    Computes a step of an LSTM from the pre-activations of its gates, with one kernel.
+
+    The gates i, f and o use the logistic function and g uses tanh:
+
+        c = f * c_prev + i * g
+        h = o * tanh(c)
+
+    Arguments:
+        ifog (TensorOp): The pre-activations of the gates i, f, o and g, in that order along
+            gate_axis. The other axes are those of c_prev.
+        c_prev (TensorOp): The cell state before the step.
+        gate_axis (Axis): The axis of the gates, with length 4.
+
+    Returns:
+        The hidden state and the cell state after the step.
+    """
+    if gate_axis.length != 4:
+        raise ValueError("The gate axis {} must have length 4".format(gate_axis))
+    axes = make_axes([gate_axis]) + c_prev.axes
+    if not ifog.axes.is_equal_set(axes):
+        raise ValueError("The gates must have axes {}, found {}".format(axes, ifog.axes))
+    cell = LSTMCellOp(axes_with_order(ifog, axes), c_prev)
+    return (slice_along_axis(cell, lstm_cell_axis, 0),
+            slice_along_axis(cell, lstm_cell_axis, 1))
+
+
+class LSTMCellOp(TensorOp):
+    """
+    A step of an LSTM, along lstm_cell_axis. Besides the states after the step, the
+    activations used by the derivatives are kept, so they are not computed again.
+
+    Arguments:
+        ifog (TensorOp): The pre-activations of the gates, with the gate axis first and then
+            the axes of c_prev.
+        c_prev (TensorOp): The cell state before the step.
+    """
+
+    def __init__(self, ifog, c_prev, **kwargs):
+        super(LSTMCellOp, self).__init__(args=(ifog, c_prev),
+                                         axes=make_axes([lstm_cell_axis]) + c_prev.axes,
+                                         **kwargs)
+
+    def generate_adjoints(self, adjoints, delta, ifog, c_prev):
+        ifog.generate_add_delta(adjoints, bprop_lstm_cell(delta, self, c_prev, axes=ifog.axes))
+        c_prev.generate_add_delta(adjoints, bprop_lstm_cell_state(delta, self))
+
+
+class bprop_lstm_cell(TensorOp):
+    """
+    The derivative of an LSTMCellOp with respect to the pre-activations of its gates.
+
+    Arguments:
+        delta (TensorOp): The derivative with respect to the LSTMCellOp.
+        cell (TensorOp): The LSTMCellOp.
+        c_prev (TensorOp): The cell state before the step.
+    """
+
+    def __init__(self, delta, cell, c_prev, **kwargs):
+        super(bprop_lstm_cell, self).__init__(args=(delta, cell, c_prev), **kwargs)
+
+
+class bprop_lstm_cell_state(TensorOp):
+    """
+    The derivative of an LSTMCellOp with respect to the cell state before the step.
+
+    Arguments:
+        delta (TensorOp): The derivative with respect to the LSTMCellOp.
+        cell (TensorOp): The LSTMCellOp.
+    """
+
+    def __init__(self, delta, cell, **kwargs):
+        super(bprop_lstm_cell_state, self).__init__(args=(delta, cell),
+                                                    axes=cell.axes - [lstm_cell_axis],
+                                                    **kwargs)
@@ -15,10 +15,10 @@ from __future__ import division
 
 from contextlib import contextmanager
 import collections
-import uuid
 
-import inspect
-import cachetools
+import linecache
+import os
+import sys
 import numpy as np
 from builtins import object
 from functools import wraps
@@ -27,11 +27,14 @@ from collections import defaultdict
 from ngraph.op_graph.axes import TensorDescription, \
     make_axis, make_axes, Axes, FlattenedAxis, slice_axis, default_dtype, \
     default_int_dtype, AxesMap
-from ngraph.util.names import NameableValue
+from ngraph.util.names import LazyUUID, NameableValue, next_uuid_int
 from ngraph.util.threadstate import get_thread_state
 from orderedset import OrderedSet
 from cached_property import cached_property
 
+# Frames in files under this path are skipped when looking for where an op was created
+_op_graph_path = os.path.join('ngraph', 'op_graph')
+
 
 def tensor_descriptions(args):
     """
@@ -50,13 +53,40 @@ def tdcache():
     """
     Decorator to mark tensor description method as cached.
 
+    Values are cached on the op, by method name, so they are released with the op's graph.
+    tdcache.invalidate() invalidates the cached values of all ops, which is done whenever an
+    op is replaced.
+
     Returns:
         Cache decorator set to use a particular cache.
     """
-    return cachetools.cached(cache=tdcache.tensor_description_cache)
+    def decorator(f):
+        name = f.__name__
+
+        @wraps(f)
+        def wrapper(self):
+            cache = self.__dict__.get('_tdcache')
+            if cache is None or cache[0] != tdcache.generation:
+                cache = self._tdcache = (tdcache.generation, {})
+            values = cache[1]
+            try:
+                return values[name]
+            except KeyError:
+                value = values[name] = f(self)
+                return value
+        return wrapper
+    return decorator
+
+
+def invalidate_tensor_descriptions():
+    """
+    Invalidates all cached tensor descriptions.
+    """
+    tdcache.generation += 1
 
 
-tdcache.tensor_description_cache = {}
+tdcache.generation = 0
+tdcache.invalidate = invalidate_tensor_descriptions
 
 
 @contextmanager
@@ -75,6 +105,21 @@ def metadata(**metadata):
             op.metadata.update(metadata)
 
 
+@contextmanager
+def fast_construction():
+    """
+    Ops created within the context do not capture where they were created, which makes
+    building very large graphs, such as unrolled recurrent networks, faster.
+    """
+    state = get_thread_state()
+    previous = getattr(state, 'fast_construction', False)
+    state.fast_construction = True
+    try:
+        yield
+    finally:
+        state.fast_construction = previous
+
+
 def with_op_metadata(f, metadata=None):
     """
     Decorator to add metadata to all ops created inside the decorated function.
@@ -100,31 +145,49 @@ def with_op_metadata(f, metadata=None):
 
 
 class DebugInfo(object):
-    """Mixin that captures file/line location of an object's creation."""
+    """
+    Mixin that captures file/line location of an object's creation.
+
+    Only the code object and line number of the first frame outside of ngraph/op_graph are
+    kept, and the file name and source line are looked up when they are used. No location
+    is captured for objects created within fast_construction().
+    """
 
     def __init__(self, **kwargs):
-        # TODO This is a good first cut for debugging info, but it would be nice to
-        # TODO be able to reliably walk the stack back to user code rather than just
-        # TODO back past this constructor
         super(DebugInfo, self).__init__(**kwargs)
-        frame = None
+        self._debug_location = None
+        if getattr(get_thread_state(), 'fast_construction', False):
+            return
+        frame = sys._getframe(1)
         try:
-            frame = inspect.currentframe()
-            while frame.f_locals.get('self', None) is self:
+            while frame is not None and _op_graph_path in frame.f_code.co_filename:
                 frame = frame.f_back
-            while frame:
-                filename, lineno, function, code_context, index = inspect.getframeinfo(
-                    frame)
-                if -1 == filename.find('ngraph/op_graph'):
-                    break
-                frame = frame.f_back
-
-            self.filename = filename
-            self.lineno = lineno
-            self.code_context = code_context
+            if frame is not None:
+                self._debug_location = (frame.f_code, frame.f_lineno)
         finally:
             del frame
 
+    @property
+    def filename(self):
+        """The file that created the object, or None if it is not known."""
+        if self._debug_location is None:
+            return None
+        return self._debug_location[0].co_filename
+
+    @property
+    def lineno(self):
+        """The line that created the object, or None if it is not known."""
+        if self._debug_location is None:
+            return None
+        return self._debug_location[1]
+
+    @property
+    def code_context(self):
+        """A list with the source line that created the object, or None if it is not known."""
+        if self._debug_location is None:
+            return None
+        return [linecache.getline(self.filename, self.lineno)]
+
     @property
     def file_info(self):
         """
@@ -138,7 +201,7 @@ class DebugInfo(object):
             filename=self.filename, lineno=self.lineno)
 
 
-class Op(NameableValue):
+class Op(DebugInfo, NameableValue):
     """
     Any operation that can be in an AST.
 
@@ -161,6 +224,8 @@ class Op(NameableValue):
         trainable: The value is trainable.
     """
 
+    uuid = LazyUUID()
+
     # Default is to not collect Ops as they are created
     @staticmethod
     def _get_thread_ops():
@@ -320,7 +385,7 @@ class Op(NameableValue):
         self._control_deps = OrderedSet()
         self._deriv_handler = None
         self._const = const
-        self.uuid = uuid.uuid4()
+        self._uuid = next_uuid_int()
         self._is_constant = constant
         self._is_persistent = persistent
         self._is_trainable = trainable
@@ -492,7 +557,7 @@ class Op(NameableValue):
         for dep in self._control_deps:
             value.add_control_dep(dep)
         self._forward = value
-        tdcache.tensor_description_cache.clear()
+        tdcache.invalidate()
         value.metadata.update(self.metadata)
 
     @property
@@ -654,7 +719,7 @@ class Op(NameableValue):
     def tensor_description(self):
         return None
 
-    @cachetools.cached({})
+    @tdcache()
     def call_info(self):
         """
         Creates the TensorDescriptions (of this op or its arguments)
@@ -670,6 +735,39 @@ class Op(NameableValue):
         return list(tensor_descriptions(self.args))
 
 
+def propagate_adjoints(adjoints, roots):
+    """
+    Propagates adjoints back to all the ops that roots are computed from.
+
+    Arguments:
+        adjoints: A map from ops to the adjoints they start with, usually the roots; it is
+            updated with the adjoints of the other ops.
+        roots: The ops to propagate from.
+
+    Returns:
+        adjoints.
+    """
+    # visit ops in reverse depth first post-order. it is important that
+    # ordered_ops returns a copy of this traversal order since the graph
+    # may change as we generate adjoints and we don't want to visit those
+    # new ops. Some ops may be containers for other ops, so we create an
+    # ordered set to ensure we don't do multiple backprops.
+    processed = set()
+    for o in reversed(Op.ordered_ops(roots)):
+        if o.tensor in processed:
+            continue
+        if o.tensor in adjoints:
+            adjoint = adjoints[o.tensor]
+            if o.scale is not None:
+                adjoint = adjoint * o.scale
+
+            deriv_handler = o.deriv_handler
+            deriv_handler.generate_adjoints(adjoints, adjoint, *deriv_handler.args)
+            processed.add(o.tensor)
+
+    return adjoints
+
+
 def as_op(x):
     """
     Finds an Op appropriate for x.
@@ -975,7 +1073,6 @@ class TensorOp(Op):
         return True
 
     @property
-    @cachetools.cached(cache=dict())
     def one(self):
         """
         Returns a singleton constant 1 for this Op. Used by DerivOp to ensure that
@@ -985,15 +1082,19 @@ class TensorOp(Op):
             A unique constant 1 associated with this TensorOp.
 
         """
-        return as_op(1)
+        try:
+            return self._one
+        except AttributeError:
+            self._one = as_op(1)
+            return self._one
 
-    @cachetools.cached({})
     def adjoints(self, error):
         """
         Returns a map containing the adjoints of this op with respect to other
         ops.
 
-        Creates the map if it does not already exist.
+        Creates the map if it does not already exist. The maps are kept on the op, since they
+        refer to it, so they are released with it.
 
         Arguments:
             error (TensorOp, optional): The tensor holding the error value
@@ -1003,29 +1104,25 @@ class TensorOp(Op):
         Returns:
             Map from Op to dSelf/dOp.
         """
-        adjoints = {
-            self.tensor: error,
-        }
-
-        # visit ops in reverse depth first post-order. it is important that
-        # ordered_ops returns a copy of this traversal order since the graph
-        # may change as we generate adjoints and we don't want to visit those
-        # new ops. Some ops may be containers for other ops, so we create an
-        # ordered set to ensure we don't do multiple backprops.
-        processed = set()
-        for o in reversed(Op.ordered_ops([self])):
-            if o.tensor in processed:
-                continue
-            if o.tensor in adjoints:
-                adjoint = adjoints[o.tensor]
-                if o.scale is not None:
-                    adjoint = adjoint * o.scale
+        try:
+            cache = self._adjoints
+        except AttributeError:
+            cache = self._adjoints = {}
+        if error not in cache:
+            cache[error] = self.generate_adjoints_map(error)
+        return cache[error]
 
-                deriv_handler = o.deriv_handler
-                deriv_handler.generate_adjoints(adjoints, adjoint, *deriv_handler.args)
-                processed.add(o.tensor)
+    def generate_adjoints_map(self, error):
+        """
+        Creates the map returned by adjoints.
+
+        Arguments:
+            error (TensorOp): The tensor holding the error value.
 
-        return adjoints
+        Returns:
+            Map from Op to dSelf/dOp.
+        """
+        return propagate_adjoints({self.tensor: error}, [self])
 
     def generate_add_delta(self, adjoints, delta):
         """
@@ -1929,7 +2026,7 @@ class TensorSliceOp(ReshapeOp):
 
         Goals:
             adjoints[x] += _unslice(delta, self.slices, x.axes)
-            more exactly, if x is ValueOp, should be handled by x.value_tensor
+            more exactly, if x is ValueOp, should be handled by x.tensor
 
         Dependencies graph:
 
@@ -1948,9 +2045,9 @@ class TensorSliceOp(ReshapeOp):
         """
 
         # special handling of value op, this is because in generate_add_delta,
-        # ValueOp has special handler
+        # ValueOp has special handler that adds to the adjoint of its tensor
         if isinstance(x, ValueOp):
-            x = x.value_tensor
+            x = x.tensor
 
         if x not in adjoints:
             # x not in adjoints dict, so need to allocate a new buffer with
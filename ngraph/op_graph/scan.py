@@ -0,0 +1,354 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+from __future__ import division
+from collections import OrderedDict
+
+from ngraph.op_graph.axes import make_axes
+from ngraph.op_graph.op_graph import Op, TensorOp, AssignableTensorOp, ComputationOp, \
+    axes_with_order, broadcast, constant, placeholder, propagate_adjoints
+
+
+def scan(step, sequences, initial_states, axis, non_sequences=(), reverse=False, pos=0):
+    """
+    Computes a recurrence along an axis.
+
+    At every position of axis, in order or in reverse order, step is called with the slices
+    of the sequences at the position, the states and the non-sequences, and returns the new
+    states and the outputs of the position:
+
+        new_states, outputs = step(*(slices + states + non_sequences))
+
+    step is only called once, with placeholders, to build the graph of one step, which is then
+    computed for every position. The size of the graph does not depend on the length of axis.
+
+    Besides its arguments, step may use constants, variables and other tensors computed from
+    them, but no placeholders; tensors computed from placeholders must be passed in
+    non_sequences.
+
+    Arguments:
+        step: A function building the graph of a step.
+        sequences: Tensors with axis, which are sliced along it.
+        initial_states: Tensors with the states before the first step.
+        axis: The axis to iterate along.
+        non_sequences: Tensors used by every step.
+        reverse: Iterate from the last position of axis to the first.
+        pos: The position of axis in the axes of the outputs.
+
+    Returns:
+        A tuple of the list of the states after the last step and the list of the outputs,
+        each collected along axis.
+    """
+    sequences = list(sequences)
+    initial_states = list(initial_states)
+    non_sequences = list(non_sequences)
+    for sequence in sequences:
+        if axis not in sequence.axes:
+            raise ValueError("Sequence {} does not have the scan axis {}"
+                             .format(sequence, axis))
+
+    sequence_params = [placeholder(sequence.axes - make_axes([axis]), dtype=sequence.dtype)
+                       for sequence in sequences]
+    state_params = [placeholder(state.axes, dtype=state.dtype) for state in initial_states]
+    non_sequence_params = [placeholder(tensor.axes, dtype=tensor.dtype)
+                           for tensor in non_sequences]
+    params = sequence_params + state_params + non_sequence_params
+
+    new_states, outputs = step(*params)
+    new_states = list(new_states)
+    outputs = list(outputs)
+    if len(new_states) != len(initial_states):
+        raise ValueError("The step returned {} states instead of {}"
+                         .format(len(new_states), len(initial_states)))
+
+    scan_op = ScanOp(sequences, sequence_params,
+                     initial_states, state_params, new_states,
+                     non_sequences, non_sequence_params,
+                     outputs, [pos] * len(outputs),
+                     axis, reverse=reverse)
+    return list(scan_op.final_states), list(scan_op.outputs)
+
+
+def conform(x, axes):
+    """
+    Arguments:
+        x: A tensor whose axes are some of axes.
+        axes: The axes of the result.
+
+    Returns:
+        x, broadcast or reordered to axes.
+    """
+    if x.axes == axes:
+        return x
+    if x.axes.is_equal_set(axes):
+        return axes_with_order(x, axes)
+    return broadcast(x, axes)
+
+
+def captured_variables(values, params):
+    """
+    Finds the variables a step uses without receiving them as parameters.
+
+    Arguments:
+        values: The results of the step.
+        params: The parameters of the step.
+
+    Returns:
+        A list of AssignableTensorOps.
+
+    Raises:
+        ValueError: If the step uses a placeholder that is not one of its parameters.
+    """
+    params = set(param.tensor for param in params)
+    captured = []
+    for op in Op.ordered_ops(values):
+        tensor = op.tensor
+        if not isinstance(tensor, AssignableTensorOp) or tensor in params or \
+                tensor.is_constant or tensor in captured:
+            continue
+        if tensor.is_placeholder:
+            raise ValueError(("The scan step uses {}, which must be passed to scan in "
+                              "non_sequences").format(tensor))
+        # Temporaries are written by the ops of the step that use them
+        if tensor.is_persistent:
+            captured.append(tensor)
+    return captured
+
+
+class ScanOp(Op):
+    """
+    Computes a recurrence along an axis with a computation of one step; see scan.
+
+    The step is a ComputationOp whose parameters are placeholders for the slices of the
+    sequences, the states and the non-sequences, in that order. The transformer computes it
+    once for every position of axis, after setting its parameters, and collects its results.
+    The variables the step uses without receiving them as parameters follow the non-sequences
+    in the args of the op, so that derivatives are found for them.
+
+    Arguments:
+        sequences: Tensors with axis.
+        sequence_params: The placeholders of the slices of sequences.
+        initial_states: Tensors with the states before the first step.
+        state_params: The placeholders of the states.
+        new_states: The new values of the states, computed from the placeholders.
+        non_sequences: Tensors used by every step.
+        non_sequence_params: The placeholders of non_sequences.
+        outputs: The outputs of a step, computed from the placeholders.
+        positions: For each output, the position of axis in the axes of the collected output.
+        axis: The axis to iterate along.
+        reverse: Iterate from the last position of axis to the first.
+
+    Attributes:
+        body: The ComputationOp of one step.
+        state_results: For each state, the index of its new value in body.values.
+        output_results: For each output, the index of its value in body.values.
+        final_states: ScanOutputOps with the states after the last step.
+        outputs: ScanOutputOps with the outputs, collected along axis.
+        state_history: ScanOutputOps with the states before every step, collected along
+            axis with axis first. They are only computed when they are used, which the
+            derivative does.
+    """
+    # The op has no value to scale, but it receives the adjoints of its outputs
+    scale = None
+
+    def __init__(self, sequences, sequence_params, initial_states, state_params, new_states,
+                 non_sequences, non_sequence_params, outputs, positions, axis,
+                 reverse=False, **kwargs):
+        for sequence in sequences:
+            if axis not in sequence.axes:
+                raise ValueError("Sequence {} does not have the scan axis {}"
+                                 .format(sequence, axis))
+        new_states = [conform(new_state, param.axes)
+                      for new_state, param in zip(new_states, state_params)]
+        initial_states = [conform(state, param.axes)
+                          for state, param in zip(initial_states, state_params)]
+        params = list(sequence_params) + list(state_params) + list(non_sequence_params)
+
+        values = []
+        for value in new_states + list(outputs):
+            if value not in values:
+                values.append(value)
+        captured = captured_variables(values, params)
+
+        super(ScanOp, self).__init__(args=list(sequences) + initial_states +
+                                     list(non_sequences) + captured, **kwargs)
+        self.axis = axis
+        self.reverse = reverse
+        self.n_sequences = len(sequences)
+        self.n_states = len(initial_states)
+        self.n_non_sequences = len(non_sequences)
+        self.body = ComputationOp(values, *params)
+        self.state_results = [values.index(value) for value in new_states]
+        self.output_results = [values.index(value) for value in outputs]
+
+        self.final_states = [ScanOutputOp(self, 'final_states', index,
+                                          axes=state.axes, dtype=state.dtype)
+                             for index, state in enumerate(state_params)]
+        self.outputs = [ScanOutputOp(self, 'outputs', index,
+                                     axes=output.axes[:position] + make_axes([axis]) +
+                                     output.axes[position:], dtype=output.dtype)
+                        for index, (output, position) in enumerate(zip(outputs, positions))]
+        self.state_history = [ScanOutputOp(self, 'state_history', index,
+                                           axes=make_axes([axis]) + state.axes,
+                                           dtype=state.dtype)
+                              for index, state in enumerate(state_params)]
+
+    @property
+    def is_device_op(self):
+        """
+        Returns:
+            False, because the step is computed by the transformer.
+        """
+        return False
+
+    def split_args(self, args):
+        """
+        Arguments:
+            args: The args of the op, or values for them.
+
+        Returns:
+            A tuple of lists of the sequences, initial states, non-sequences and captured
+            variables.
+        """
+        args = list(args)
+        n_sequences, n_states, n_non_sequences = \
+            self.n_sequences, self.n_states, self.n_non_sequences
+        return (args[:n_sequences],
+                args[n_sequences:n_sequences + n_states],
+                args[n_sequences + n_states:n_sequences + n_states + n_non_sequences],
+                args[n_sequences + n_states + n_non_sequences:])
+
+    def generate_adjoints(self, adjoints, delta, *args):
+        """
+        The derivative is a scan in the opposite direction, whose step computes the step
+        again from the saved states and then its derivative. Its states are the derivatives
+        of the states, and of the non-sequences and captured variables summed over the steps.
+
+        Arguments:
+            adjoints: dy/dOp for all Ops used to compute y.
+            delta: A map from the ScanOutputOps of this op to their adjoints.
+            *args: The args of this op.
+        """
+        sequences, initial_states, non_sequences, captured = self.split_args(args)
+        params = list(self.body.parameters)
+        values = [value.forwarded for value in self.body.values]
+        sequence_params, state_params, non_sequence_params, _ = self.split_args(params)
+
+        # The step and the sequences of the derivative
+        step_adjoints = OrderedDict()
+        d_sequences = list(zip(sequences, sequence_params))
+        d_sequences += list(zip(self.state_history, state_params))
+        for output, index in zip(self.outputs, self.output_results):
+            if output in delta:
+                d_output = placeholder(output.axes - make_axes([self.axis]), dtype=output.dtype)
+                values[index].generate_add_delta(step_adjoints, d_output)
+                d_sequences.append((conform(delta[output], output.axes), d_output))
+
+        d_state_params = []
+        for final_state, index in zip(self.final_states, self.state_results):
+            d_state = placeholder(final_state.axes, dtype=final_state.dtype)
+            values[index].generate_add_delta(step_adjoints, d_state)
+            d_state_params.append(d_state)
+        propagate_adjoints(step_adjoints, values)
+
+        def step_adjoint(param):
+            adjoint = step_adjoints.get(param.tensor)
+            if adjoint is None:
+                return constant(0, axes=param.axes, dtype=param.dtype)
+            return conform(adjoint, param.axes)
+
+        d_initial_states = [conform(delta[final_state], final_state.axes)
+                            if final_state in delta
+                            else constant(0, axes=final_state.axes, dtype=final_state.dtype)
+                            for final_state in self.final_states]
+        d_new_states = [step_adjoint(param) for param in state_params]
+
+        # Derivatives of the tensors used by every step are summed over the steps
+        summed = []
+        for tensor, param in zip(non_sequences + captured, non_sequence_params + captured):
+            if param.tensor in step_adjoints:
+                summed.append((tensor, param.tensor))
+        sum_params = [placeholder(param.axes, dtype=param.dtype) for _, param in summed]
+        d_new_states += [conform(sum_param + step_adjoints[param], param.axes)
+                         for sum_param, (_, param) in zip(sum_params, summed)]
+        d_initial_states += [constant(0, axes=param.axes, dtype=param.dtype)
+                             for _, param in summed]
+
+        # Derivatives of the sequences are the outputs
+        d_outputs = []
+        d_positions = []
+        sequences_with_adjoints = []
+        for sequence, param in zip(sequences, sequence_params):
+            if param.tensor in step_adjoints:
+                d_outputs.append(step_adjoint(param))
+                d_positions.append(sequence.axes.index(self.axis))
+                sequences_with_adjoints.append(sequence)
+
+        # Only supply what the derivative uses
+        used = set(op.tensor for op in Op.ordered_ops(d_new_states + d_outputs))
+        d_sequences = [(sequence, param) for sequence, param in d_sequences
+                       if param.tensor in used]
+        d_non_sequences = [(tensor, param)
+                           for tensor, param in zip(non_sequences, non_sequence_params)
+                           if param.tensor in used]
+
+        d_scan = ScanOp([sequence for sequence, _ in d_sequences],
+                        [param for _, param in d_sequences],
+                        d_initial_states, d_state_params + sum_params, d_new_states,
+                        [tensor for tensor, _ in d_non_sequences],
+                        [param for _, param in d_non_sequences],
+                        d_outputs, d_positions,
+                        self.axis, reverse=not self.reverse)
+
+        d_final_states = list(d_scan.final_states)
+        for state, d_state in zip(initial_states, d_final_states):
+            state.generate_add_delta(adjoints, d_state)
+        for (tensor, _), d_tensor in zip(summed, d_final_states[self.n_states:]):
+            tensor.generate_add_delta(adjoints, d_tensor)
+        for sequence, d_sequence in zip(sequences_with_adjoints, d_scan.outputs):
+            sequence.generate_add_delta(adjoints, d_sequence)
+
+
+class ScanOutputOp(TensorOp):
+    """
+    A value computed by a ScanOp, which writes it.
+
+    Arguments:
+        scan: The ScanOp.
+        kind: The ScanOp attribute listing this value: 'final_states', 'outputs' or
+            'state_history'.
+        index: The position of this value in that list.
+    """
+
+    def __init__(self, scan, kind, index, **kwargs):
+        super(ScanOutputOp, self).__init__(**kwargs)
+        self.scan = scan
+        self.kind = kind
+        self.index = index
+        self.add_control_dep(scan)
+
+    @property
+    def is_device_op(self):
+        """
+        Returns:
+            False, because the value is written by the ScanOp.
+        """
+        return False
+
+    def generate_adjoints(self, adjoints, delta):
+        """
+        The ScanOp receives the adjoints of all its outputs together, after they are
+        complete.
+        """
+        adjoints.setdefault(self.scan, OrderedDict())[self] = delta
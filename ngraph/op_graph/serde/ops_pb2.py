@@ -21,7 +21,7 @@ DESCRIPTOR = _descriptor.FileDescriptor(
   name='ops.proto',
   package='',
   syntax='proto3',
-  serialized_pb=_b('\n\tops.proto\"\x14\n\x04UUID\x12\x0c\n\x04uuid\x18\x01 \x01(\x0c\"2\n\x08GraphDef\x12\x14\n\x05\x65\x64ges\x18\x01 \x03(\x0b\x32\x05.Edge\x12\x10\n\x03ops\x18\x02 \x03(\x0b\x32\x03.Op\"\xa5\x01\n\x02Op\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0f\n\x07op_type\x18\x04 \x01(\t\x12\x15\n\x05\x64type\x18\x05 \x01(\x0e\x32\x06.DTYPE\x12\x1d\n\x05\x61ttrs\x18\x06 \x03(\x0b\x32\x0e.Op.AttrsEntry\x1a\x35\n\nAttrsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x16\n\x05value\x18\x02 \x01(\x0b\x32\x07.OpAttr:\x02\x38\x01\"\xed\x01\n\x06OpAttr\x12\x19\n\x06scalar\x18\x03 \x01(\x0b\x32\x07.ScalarH\x00\x12*\n\x0frepeated_scalar\x18\x04 \x01(\x0b\x32\x0f.RepeatedScalarH\x00\x12$\n\x0b\x63onv_params\x18\x05 \x01(\x0b\x32\r.FilterParamsH\x00\x12$\n\x0bpool_params\x18\x06 \x01(\x0b\x32\r.FilterParamsH\x00\x12\x15\n\x04\x61xes\x18\x07 \x01(\x0b\x32\x05.AxesH\x00\x12\x19\n\x06tensor\x18\x08 \x01(\x0b\x32\x07.TensorH\x00\x12\x15\n\x04\x61xis\x18\t \x01(\x0b\x32\x05.AxisH\x00\x42\x07\n\x05value\"?\n\x0c\x46ilterParams\x12\x0e\n\x06\x66shape\x18\x01 \x03(\r\x12\x0e\n\x06stride\x18\x02 \x03(\r\x12\x0f\n\x07padding\x18\x03 \x03(\r\"\x83\x02\n\x06Scalar\x12\x12\n\x08\x62ool_val\x18\x01 \x01(\x08H\x00\x12\x14\n\nstring_val\x18\x02 \x01(\tH\x00\x12\x14\n\ndouble_val\x18\x03 \x01(\x01H\x00\x12\x11\n\x07int_val\x18\x04 \x01(\x03H\x00\x12\x12\n\x08\x62yte_val\x18\x05 \x01(\x0cH\x00\x12\x19\n\x08uuid_val\x18\x06 \x01(\x0b\x32\x05.UUIDH\x00\x12 \n\x07map_val\x18\x07 \x01(\x0b\x32\r.AttributeMapH\x00\x12\x12\n\x08null_val\x18\x08 \x01(\x08H\x00\x12\x1b\n\tslice_val\x18\t \x01(\x0b\x32\x06.SliceH\x00\x12\x1b\n\tdtype_val\x18\n \x01(\x0e\x32\x06.DTYPEH\x00\x42\x07\n\x05value\"h\n\x0c\x41ttributeMap\x12#\n\x03map\x18\x01 \x03(\x0b\x32\x16.AttributeMap.MapEntry\x1a\x33\n\x08MapEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x16\n\x05value\x18\x02 \x01(\x0b\x32\x07.Scalar:\x02\x38\x01\"&\n\x0eRepeatedScalar\x12\x14\n\x03val\x18\x01 \x03(\x0b\x32\x07.Scalar\"\x87\x02\n\x04\x45\x64ge\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x18\n\tfrom_uuid\x18\x02 \x01(\x0b\x32\x05.UUID\x12\x16\n\x07to_uuid\x18\x03 \x01(\x0b\x32\x05.UUID\x12\x1f\n\x05\x61ttrs\x18\x04 \x03(\x0b\x32\x10.Edge.AttrsEntry\x12!\n\tedge_type\x18\x05 \x01(\x0e\x32\x0e.Edge.EdgeType\x1a\x37\n\nAttrsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x18\n\x05value\x18\x02 \x01(\x0b\x32\t.EdgeAttr:\x02\x38\x01\";\n\x08\x45\x64geType\x12\x08\n\x04\x44\x41TA\x10\x00\x12\x0b\n\x07\x43ONTROL\x10\x01\x12\r\n\tCONTAINER\x10\x02\x12\t\n\x05OTHER\x10\x03\"Z\n\x08\x45\x64geAttr\x12\x19\n\x06scalar\x18\x01 \x01(\x0b\x32\x07.ScalarH\x00\x12*\n\x0frepeated_scalar\x18\x02 \x01(\x0b\x32\x0f.RepeatedScalarH\x00\x42\x07\n\x05value\"\x91\x01\n\x06Tensor\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x15\n\x05\x64type\x18\x02 \x01(\x0e\x32\x06.DTYPE\x12\r\n\x05shape\x18\x03 \x03(\r\x12\x12\n\nfloat_data\x18\x04 \x03(\x02\x12\x13\n\x0b\x64ouble_data\x18\x05 \x03(\x01\x12\x11\n\tuint_data\x18\x06 \x03(\x04\x12\x10\n\x08int_data\x18\x07 \x03(\x12\"\xa3\x01\n\x11TensorDescription\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x13\n\x04\x61xes\x18\x02 \x01(\x0b\x32\x05.Axes\x12\x13\n\x04\x62\x61se\x18\x03 \x01(\x0b\x32\x05.UUID\x12\x15\n\x05\x64type\x18\x04 \x01(\x0e\x32\x06.DTYPE\x12\x0e\n\x06offset\x18\x05 \x01(\x05\x12\x14\n\x0c\x66ull_strides\x18\x06 \x03(\x05\x12\x12\n\nfull_sizes\x18\x07 \x03(\x05\">\n\x04\x41xes\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x13\n\x04\x61xes\x18\x03 \x03(\x0b\x32\x05.Axis\"\xa6\x01\n\x04\x41xis\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0e\n\x06length\x18\x03 \x01(\x05\x12\x11\n\trecurrent\x18\x04 \x01(\x08\x12\r\n\x05\x62\x61tch\x18\x05 \x01(\x08\x12\x17\n\x0fmatch_on_length\x18\x06 \x01(\x08\x12\x11\n\tdocstring\x18\x08 \x01(\t\x12\x1d\n\x0e\x66lattened_axes\x18\t \x01(\x0b\x32\x05.Axes\"\x1b\n\nInt64Value\x12\r\n\x05value\x18\x01 \x01(\x03\"Y\n\x05Slice\x12\x1a\n\x05start\x18\x01 \x01(\x0b\x32\x0b.Int64Value\x12\x19\n\x04step\x18\x02 \x01(\x0b\x32\x0b.Int64Value\x12\x19\n\x04stop\x18\x03 \x01(\x0b\x32\x0b.Int64Value*\x88\x01\n\x05\x44TYPE\x12\x0b\n\x07\x46LOAT32\x10\x00\x12\x0b\n\x07\x46LOAT16\x10\x01\x12\x0b\n\x07\x46LOAT64\x10\x02\x12\t\n\x05UINT8\x10\x03\x12\n\n\x06UINT16\x10\x04\x12\n\n\x06UINT32\x10\x05\x12\x08\n\x04INT8\x10\x06\x12\t\n\x05INT16\x10\x07\x12\t\n\x05INT32\x10\x08\x12\t\n\x05INT64\x10\t\x12\n\n\x06\x46LEX16\x10\nb\x06proto3')
+  serialized_pb=_b('\n\tops.proto\"\x14\n\x04UUID\x12\x0c\n\x04uuid\x18\x01 \x01(\x0c\"2\n\x08GraphDef\x12\x14\n\x05\x65\x64ges\x18\x01 \x03(\x0b\x32\x05.Edge\x12\x10\n\x03ops\x18\x02 \x03(\x0b\x32\x03.Op\"\xa5\x01\n\x02Op\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0f\n\x07op_type\x18\x04 \x01(\t\x12\x15\n\x05\x64type\x18\x05 \x01(\x0e\x32\x06.DTYPE\x12\x1d\n\x05\x61ttrs\x18\x06 \x03(\x0b\x32\x0e.Op.AttrsEntry\x1a\x35\n\nAttrsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x16\n\x05value\x18\x02 \x01(\x0b\x32\x07.OpAttr:\x02\x38\x01\"\xed\x01\n\x06OpAttr\x12\x19\n\x06scalar\x18\x03 \x01(\x0b\x32\x07.ScalarH\x00\x12*\n\x0frepeated_scalar\x18\x04 \x01(\x0b\x32\x0f.RepeatedScalarH\x00\x12$\n\x0b\x63onv_params\x18\x05 \x01(\x0b\x32\r.FilterParamsH\x00\x12$\n\x0bpool_params\x18\x06 \x01(\x0b\x32\r.FilterParamsH\x00\x12\x15\n\x04\x61xes\x18\x07 \x01(\x0b\x32\x05.AxesH\x00\x12\x19\n\x06tensor\x18\x08 \x01(\x0b\x32\x07.TensorH\x00\x12\x15\n\x04\x61xis\x18\t \x01(\x0b\x32\x05.AxisH\x00\x42\x07\n\x05value\"?\n\x0c\x46ilterParams\x12\x0e\n\x06\x66shape\x18\x01 \x03(\r\x12\x0e\n\x06stride\x18\x02 \x03(\r\x12\x0f\n\x07padding\x18\x03 \x03(\r\"\x83\x02\n\x06Scalar\x12\x12\n\x08\x62ool_val\x18\x01 \x01(\x08H\x00\x12\x14\n\nstring_val\x18\x02 \x01(\tH\x00\x12\x14\n\ndouble_val\x18\x03 \x01(\x01H\x00\x12\x11\n\x07int_val\x18\x04 \x01(\x03H\x00\x12\x12\n\x08\x62yte_val\x18\x05 \x01(\x0cH\x00\x12\x19\n\x08uuid_val\x18\x06 \x01(\x0b\x32\x05.UUIDH\x00\x12 \n\x07map_val\x18\x07 \x01(\x0b\x32\r.AttributeMapH\x00\x12\x12\n\x08null_val\x18\x08 \x01(\x08H\x00\x12\x1b\n\tslice_val\x18\t \x01(\x0b\x32\x06.SliceH\x00\x12\x1b\n\tdtype_val\x18\n \x01(\x0e\x32\x06.DTYPEH\x00\x42\x07\n\x05value\"h\n\x0c\x41ttributeMap\x12#\n\x03map\x18\x01 \x03(\x0b\x32\x16.AttributeMap.MapEntry\x1a\x33\n\x08MapEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x16\n\x05value\x18\x02 \x01(\x0b\x32\x07.Scalar:\x02\x38\x01\"&\n\x0eRepeatedScalar\x12\x14\n\x03val\x18\x01 \x03(\x0b\x32\x07.Scalar\"\x87\x02\n\x04\x45\x64ge\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x18\n\tfrom_uuid\x18\x02 \x01(\x0b\x32\x05.UUID\x12\x16\n\x07to_uuid\x18\x03 \x01(\x0b\x32\x05.UUID\x12\x1f\n\x05\x61ttrs\x18\x04 \x03(\x0b\x32\x10.Edge.AttrsEntry\x12!\n\tedge_type\x18\x05 \x01(\x0e\x32\x0e.Edge.EdgeType\x1a\x37\n\nAttrsEntry\x12\x0b\n\x03key\x18\x01 \x01(\t\x12\x18\n\x05value\x18\x02 \x01(\x0b\x32\t.EdgeAttr:\x02\x38\x01\";\n\x08\x45\x64geType\x12\x08\n\x04\x44\x41TA\x10\x00\x12\x0b\n\x07\x43ONTROL\x10\x01\x12\r\n\tCONTAINER\x10\x02\x12\t\n\x05OTHER\x10\x03\"Z\n\x08\x45\x64geAttr\x12\x19\n\x06scalar\x18\x01 \x01(\x0b\x32\x07.ScalarH\x00\x12*\n\x0frepeated_scalar\x18\x02 \x01(\x0b\x32\x0f.RepeatedScalarH\x00\x42\x07\n\x05value\"\xc9\x01\n\x06Tensor\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x15\n\x05\x64type\x18\x02 \x01(\x0e\x32\x06.DTYPE\x12\r\n\x05shape\x18\x03 \x03(\r\x12\x12\n\nfloat_data\x18\x04 \x03(\x02\x12\x13\n\x0b\x64ouble_data\x18\x05 \x03(\x01\x12\x11\n\tuint_data\x18\x06 \x03(\x04\x12\x10\n\x08int_data\x18\x07 \x03(\x12\x12\x10\n\x08raw_data\x18\x08 \x01(\x0c\x12$\n\rexternal_data\x18\t \x01(\x0b\x32\r.ExternalData\".\n\x0c\x45xternalData\x12\x0e\n\x06offset\x18\x01 \x01(\x04\x12\x0e\n\x06nbytes\x18\x02 \x01(\x04\"\xa3\x01\n\x11TensorDescription\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x13\n\x04\x61xes\x18\x02 \x01(\x0b\x32\x05.Axes\x12\x13\n\x04\x62\x61se\x18\x03 \x01(\x0b\x32\x05.UUID\x12\x15\n\x05\x64type\x18\x04 \x01(\x0e\x32\x06.DTYPE\x12\x0e\n\x06offset\x18\x05 \x01(\x05\x12\x14\n\x0c\x66ull_strides\x18\x06 \x03(\x05\x12\x12\n\nfull_sizes\x18\x07 \x03(\x05\">\n\x04\x41xes\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x13\n\x04\x61xes\x18\x03 \x03(\x0b\x32\x05.Axis\"\xa6\x01\n\x04\x41xis\x12\x13\n\x04uuid\x18\x01 \x01(\x0b\x32\x05.UUID\x12\x0c\n\x04name\x18\x02 \x01(\t\x12\x0e\n\x06length\x18\x03 \x01(\x05\x12\x11\n\trecurrent\x18\x04 \x01(\x08\x12\r\n\x05\x62\x61tch\x18\x05 \x01(\x08\x12\x17\n\x0fmatch_on_length\x18\x06 \x01(\x08\x12\x11\n\tdocstring\x18\x08 \x01(\t\x12\x1d\n\x0e\x66lattened_axes\x18\t \x01(\x0b\x32\x05.Axes\"\x1b\n\nInt64Value\x12\r\n\x05value\x18\x01 \x01(\x03\"Y\n\x05Slice\x12\x1a\n\x05start\x18\x01 \x01(\x0b\x32\x0b.Int64Value\x12\x19\n\x04step\x18\x02 \x01(\x0b\x32\x0b.Int64Value\x12\x19\n\x04stop\x18\x03 \x01(\x0b\x32\x0b.Int64Value*\x9e\x01\n\x05\x44TYPE\x12\x0b\n\x07\x46LOAT32\x10\x00\x12\x0b\n\x07\x46LOAT16\x10\x01\x12\x0b\n\x07\x46LOAT64\x10\x02\x12\t\n\x05UINT8\x10\x03\x12\n\n\x06UINT16\x10\x04\x12\n\n\x06UINT32\x10\x05\x12\x08\n\x04INT8\x10\x06\x12\t\n\x05INT16\x10\x07\x12\t\n\x05INT32\x10\x08\x12\t\n\x05INT64\x10\t\x12\n\n\x06\x46LEX16\x10\n\x12\n\n\x06UINT64\x10\x0b\x12\x08\n\x04\x42OOL\x10\x0c\x62\x06proto3')
 )
 _sym_db.RegisterFileDescriptor(DESCRIPTOR)
 
@@ -75,11 +75,19 @@ _DTYPE = _descriptor.EnumDescriptor(
       name='FLEX16', index=10, number=10,
       options=None,
       type=None),
+    _descriptor.EnumValueDescriptor(
+      name='UINT64', index=11, number=11,
+      options=None,
+      type=None),
+    _descriptor.EnumValueDescriptor(
+      name='BOOL', index=12, number=12,
+      options=None,
+      type=None),
   ],
   containing_type=None,
   options=None,
-  serialized_start=1994,
-  serialized_end=2130,
+  serialized_start=2098,
+  serialized_end=2256,
 )
 _sym_db.RegisterEnumDescriptor(_DTYPE)
 
@@ -95,6 +103,8 @@ INT16 = 7
 INT32 = 8
 INT64 = 9
 FLEX16 = 10
+UINT64 = 11
+BOOL = 12
 
 
 _EDGE_EDGETYPE = _descriptor.EnumDescriptor(
@@ -804,6 +814,20 @@ _TENSOR = _descriptor.Descriptor(
       message_type=None, enum_type=None, containing_type=None,
       is_extension=False, extension_scope=None,
       options=None),
+    _descriptor.FieldDescriptor(
+      name='raw_data', full_name='Tensor.raw_data', index=7,
+      number=8, type=12, cpp_type=9, label=1,
+      has_default_value=False, default_value=_b(""),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='external_data', full_name='Tensor.external_data', index=8,
+      number=9, type=11, cpp_type=10, label=1,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
   ],
   extensions=[
   ],
@@ -817,7 +841,45 @@ _TENSOR = _descriptor.Descriptor(
   oneofs=[
   ],
   serialized_start=1327,
-  serialized_end=1472,
+  serialized_end=1528,
+)
+
+
+_EXTERNALDATA = _descriptor.Descriptor(
+  name='ExternalData',
+  full_name='ExternalData',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='offset', full_name='ExternalData.offset', index=0,
+      number=1, type=4, cpp_type=4, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+    _descriptor.FieldDescriptor(
+      name='nbytes', full_name='ExternalData.nbytes', index=1,
+      number=2, type=4, cpp_type=4, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      options=None),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=1530,
+  serialized_end=1576,
 )
 
 
@@ -889,8 +951,8 @@ _TENSORDESCRIPTION = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1475,
-  serialized_end=1638,
+  serialized_start=1579,
+  serialized_end=1742,
 )
 
 
@@ -934,8 +996,8 @@ _AXES = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1640,
-  serialized_end=1702,
+  serialized_start=1744,
+  serialized_end=1806,
 )
 
 
@@ -1014,8 +1076,8 @@ _AXIS = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1705,
-  serialized_end=1871,
+  serialized_start=1809,
+  serialized_end=1975,
 )
 
 
@@ -1045,8 +1107,8 @@ _INT64VALUE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1873,
-  serialized_end=1900,
+  serialized_start=1977,
+  serialized_end=2004,
 )
 
 
@@ -1090,8 +1152,8 @@ _SLICE = _descriptor.Descriptor(
   extension_ranges=[],
   oneofs=[
   ],
-  serialized_start=1902,
-  serialized_end=1991,
+  serialized_start=2006,
+  serialized_end=2095,
 )
 
 _GRAPHDEF.fields_by_name['edges'].message_type = _EDGE
@@ -1185,6 +1247,7 @@ _EDGEATTR.oneofs_by_name['value'].fields.append(
 _EDGEATTR.fields_by_name['repeated_scalar'].containing_oneof = _EDGEATTR.oneofs_by_name['value']
 _TENSOR.fields_by_name['uuid'].message_type = _UUID
 _TENSOR.fields_by_name['dtype'].enum_type = _DTYPE
+_TENSOR.fields_by_name['external_data'].message_type = _EXTERNALDATA
 _TENSORDESCRIPTION.fields_by_name['uuid'].message_type = _UUID
 _TENSORDESCRIPTION.fields_by_name['axes'].message_type = _AXES
 _TENSORDESCRIPTION.fields_by_name['base'].message_type = _UUID
@@ -1207,6 +1270,7 @@ DESCRIPTOR.message_types_by_name['RepeatedScalar'] = _REPEATEDSCALAR
 DESCRIPTOR.message_types_by_name['Edge'] = _EDGE
 DESCRIPTOR.message_types_by_name['EdgeAttr'] = _EDGEATTR
 DESCRIPTOR.message_types_by_name['Tensor'] = _TENSOR
+DESCRIPTOR.message_types_by_name['ExternalData'] = _EXTERNALDATA
 DESCRIPTOR.message_types_by_name['TensorDescription'] = _TENSORDESCRIPTION
 DESCRIPTOR.message_types_by_name['Axes'] = _AXES
 DESCRIPTOR.message_types_by_name['Axis'] = _AXIS
@@ -1315,6 +1379,13 @@ Tensor = _reflection.GeneratedProtocolMessageType('Tensor', (_message.Message,),
   ))
 _sym_db.RegisterMessage(Tensor)
 
+ExternalData = _reflection.GeneratedProtocolMessageType('ExternalData', (_message.Message,), dict(
+  DESCRIPTOR = _EXTERNALDATA,
+  __module__ = 'ops_pb2'
+  # @@protoc_insertion_point(class_scope:ExternalData)
+  ))
+_sym_db.RegisterMessage(ExternalData)
+
 TensorDescription = _reflection.GeneratedProtocolMessageType('TensorDescription', (_message.Message,), dict(
   DESCRIPTOR = _TENSORDESCRIPTION,
   __module__ = 'ops_pb2'
@@ -32,7 +32,13 @@ between them.
 
 Currently only python public (aka non underscore prefixed) attributes are referenced with the
 exception of those in EXCEPTION_ATTRIBUTES and starting with `_is_`.
+
+Tensor values, such as constants and initial values, are stored as little-endian bytes, either in
+the GraphDef or, when a data file path is given, in a separate data file. The data file is
+memory-mapped on deserialization, so tensors are not copied and are only read from disk when
+they are used.
 """
+import os
 import uuid
 import weakref
 import pkgutil
@@ -58,6 +64,9 @@ EXCEPTION_ATTRIBUTES = {'_axes', '_tensor', '_const', '_deriv_handler'}
 # Dict of Axis and Axes UUID to Axis to enable matching of deserialized axis
 GLOBAL_AXIS_REGISTRY = weakref.WeakValueDictionary()
 
+# Tensors in data files start at multiples of this many bytes
+DATA_FILE_ALIGNMENT = 64
+
 
 ##################
 # SERIALIZATION
@@ -95,28 +104,31 @@ def axes_to_protobuf(axes):
     return pb_axes
 
 
-def tensor_to_protobuf(tensor):
+def tensor_to_protobuf(tensor, data_file=None):
+    """
+    Converts a numpy array or scalar to a Tensor protobuf holding its bytes.
+
+    Args:
+        tensor <np.ndarray or np.generic>: The value.
+        data_file <file>: If given, a binary file the bytes are appended to, instead of being
+            stored in the protobuf.
+    """
+    # A numpy scalar is obtained with `my_ndarray[()]`
+    if not isinstance(tensor, (np.ndarray, np.generic)):
+        raise ValueError("Unknown tensor value of {}".format(tensor))
     pb_tensor = ops_pb.Tensor()
     pb_tensor.dtype = dtype_to_protobuf(tensor.dtype)
     pb_tensor.shape.extend(tensor.shape)
-    if tensor.dtype == np.float16:
-        destination = pb_tensor.float_data
-    elif tensor.dtype == np.float32:
-        destination = pb_tensor.float_data
-    elif tensor.dtype == np.float64:
-        destination = pb_tensor.double_data
-    elif tensor.dtype == np.int64:
-        destination = pb_tensor.int_data
-    elif tensor.dtype == np.uint64:
-        destination = pb_tensor.uint_data
-
-    if isinstance(tensor, np.ndarray):
-        destination.extend(tensor.ravel().tolist())
-    elif isinstance(tensor, np.generic):
-        # A numpy scalar (obtained with `my_ndarray[()]`)
-        destination.append(np.asscalar(tensor))
+    data = np.array(tensor, dtype=tensor.dtype.newbyteorder('<'), order='C', copy=False)
+    if data_file is None:
+        pb_tensor.raw_data = data.tobytes()
     else:
-        raise ValueError("Unknown tensor value of {}".format(tensor))
+        position = data_file.tell()
+        offset = -(-position // DATA_FILE_ALIGNMENT) * DATA_FILE_ALIGNMENT
+        data_file.write(b'\0' * (offset - position))
+        data_file.write(data.reshape(-1).data)
+        pb_tensor.external_data.offset = offset
+        pb_tensor.external_data.nbytes = data.nbytes
     return pb_tensor
 
 
@@ -167,7 +179,7 @@ def assign_scalar(message, value):
         raise unhandled_scalar_value(value)
 
 
-def assign_op_attr(message, value):
+def assign_op_attr(message, value, data_file=None):
     """
     Assigns a python object in value to the protobuf object `message` after conversion to
     the equivalent protobuf object.
@@ -176,6 +188,7 @@ def assign_op_attr(message, value):
         message <protobuf OpAttr>: protobuf object to have value assigned to after conversion
             to protobuf.
         value <python object>: The python object to be converted and assigned.
+        data_file <file>: If given, the binary file tensor data is written to.
     """
     if is_scalar_type(value):
         assign_scalar(message.scalar, value)
@@ -184,7 +197,7 @@ def assign_op_attr(message, value):
     elif isinstance(value, Axis):
         message.axis.CopyFrom(axis_to_protobuf(value))
     elif isinstance(value, np.ndarray):
-        message.tensor.CopyFrom(tensor_to_protobuf(value))
+        message.tensor.CopyFrom(tensor_to_protobuf(value, data_file))
     elif isinstance(value, Iterable):
         if len(value) > 0:
             for item in value:
@@ -200,11 +213,11 @@ def assign_op_attr(message, value):
         raise unhandled_scalar_value(value)
 
 
-def op_to_protobuf(op):
+def op_to_protobuf(op, data_file=None):
     """
     Converts all attributes of an op into protobuf values and returns it. Skips over the
     properties of `args`, `ops`, `control_deps`, and `forward` since those are added as
-    edges separately.
+    edges separately. Tensor values are written to data_file if it is given.
     """
     pb_op = ops_pb.Op(name=op.name, op_type=op.__class__.__name__)
     if hasattr(op, 'dtype'):
@@ -228,7 +241,7 @@ def op_to_protobuf(op):
     # issus tracker for gory details)
     if hasattr(op, 'valfun'):
         pb_op.attrs['valfun_value'].tensor.CopyFrom(
-            tensor_to_protobuf(op.valfun(op.tensor_description())))
+            tensor_to_protobuf(op.valfun(op.tensor_description()), data_file))
 
     # These are handled above
     ignored_keys = {'valfun', 'uuid', 'dtype', 'metadata', 'layout_view', 'in_view', 'out_view',
@@ -245,7 +258,7 @@ def op_to_protobuf(op):
              all(map(lambda x: isinstance(x, Op), val))):
             # These will be handled in `add_edges`
             continue
-        assign_op_attr(pb_op.attrs[key], getattr(op, key))
+        assign_op_attr(pb_op.attrs[key], getattr(op, key), data_file)
     return pb_op
 
 
@@ -292,17 +305,18 @@ def add_edges(pb_edges, pb_ops, op):
             # TODO(jknight): assert that ALL values of this list are op references
 
 
-def _serialize_graph(ops):
+def _serialize_graph(ops, data_file=None):
     """
     Serializes a graph and returns the actual protobuf python object (rather than serialized
-    byte string as done by `serialize_graph`).
+    byte string as done by `serialize_graph`). Tensor values are written to data_file if it
+    is given.
     """
     assert isinstance(ops, Iterable), "Ops passed into `serialize_graph` must be an iterable"
     ops = Op.all_op_references(ops)
     pb_ops = []
     pb_edges = []
     for op in ops:
-        pb_ops.append(op_to_protobuf(op))
+        pb_ops.append(op_to_protobuf(op, data_file))
         add_edges(pb_edges, pb_ops, op)
 
     graph_def = ops_pb.GraphDef()
@@ -315,7 +329,7 @@ def _serialize_graph(ops):
     return graph_def
 
 
-def serialize_graph(ops, only_return_handle_ops=False):
+def serialize_graph(ops, only_return_handle_ops=False, data_path=None):
     """
     Dumps ngraph graph to serialized protobuf byte string
 
@@ -323,11 +337,16 @@ def serialize_graph(ops, only_return_handle_ops=False):
       only_return_handle_ops <bool>: If false, this will return ALL ops upon deserialization. If
           true, then only the ops passed in to be serialized will be returned upon deserialization
           (with links to upstream ops intact).
+      data_path <string>: If given, tensor values are written to a data file at this path
+          instead of the byte string, and the same path must be given to `deserialize_graph`.
     """
     if only_return_handle_ops:
         for op in ops:
             op._ngraph_ser_handle = True
-    return _serialize_graph(ops).SerializeToString()
+    if data_path is None:
+        return _serialize_graph(ops).SerializeToString()
+    with open(data_path, 'wb') as data_file:
+        return _serialize_graph(ops, data_file).SerializeToString()
 
 
 ##################
@@ -344,18 +363,42 @@ def pb_to_dict(map_val):
             if key != '_ngraph_map_sentinel_'}
 
 
-def pb_to_tensor(pb_tensor):
+def pb_to_tensor(pb_tensor, data=None):
+    """
+    Converts a Tensor protobuf to a numpy array, or a numpy scalar if it has no axes. Arrays
+    are views of the protobuf's bytes, which are read-only, or of data.
+
+    Args:
+        pb_tensor <protobuf Tensor>: The tensor.
+        data <np.ndarray>: The bytes of the data file, for tensors stored in one.
+    """
     np_dtype = pb_to_dtype(pb_tensor.dtype)
-    if np_dtype == np.float64:
-        data = pb_tensor.double_data
-    elif np_dtype == np.float32 or np_dtype == np.float16:
-        data = pb_tensor.float_data
-    elif np_dtype == np.int64:
-        data = pb_tensor.int_data
+    if pb_tensor.HasField('external_data'):
+        if data is None:
+            raise ValueError("Tensor data is stored in a data file, but no data file was given")
+        offset = pb_tensor.external_data.offset
+        tensor = np.asarray(data[offset:offset + pb_tensor.external_data.nbytes])\
+            .view(np_dtype.newbyteorder('<'))
+    elif pb_tensor.raw_data:
+        tensor = np.frombuffer(pb_tensor.raw_data, dtype=np_dtype.newbyteorder('<'))
+    else:
+        # Empty, or written as a list of values
+        values = ()
+        if np_dtype == np.float64:
+            values = pb_tensor.double_data
+        elif np_dtype == np.float32 or np_dtype == np.float16:
+            values = pb_tensor.float_data
+        elif np_dtype == np.int64:
+            values = pb_tensor.int_data
+        elif np_dtype == np.uint64:
+            values = pb_tensor.uint_data
+        tensor = np.array(values, dtype=np_dtype)
+    if not tensor.dtype.isnative:
+        tensor = tensor.astype(np_dtype)
     if len(pb_tensor.shape) == 0:
-        return np_dtype.type(data[0])
+        return np_dtype.type(tensor[0])
     else:
-        return np.array(data, dtype=np_dtype).reshape(pb_tensor.shape)
+        return tensor.reshape(pb_tensor.shape)
 
 
 def protobuf_scalar_to_python(val):
@@ -387,11 +430,11 @@ def protobuf_to_axes(msg):
     return axes
 
 
-def protobuf_attr_to_python(val):
+def protobuf_attr_to_python(val, data=None):
     if val.HasField('scalar'):
         return protobuf_scalar_to_python(val.scalar)
     if val.HasField('tensor'):
-        return pb_to_tensor(val.tensor)
+        return pb_to_tensor(val.tensor, data)
     elif val.HasField('repeated_scalar'):
         if len(val.repeated_scalar.val) == 1 and \
                 val.repeated_scalar.val[0].string_val == '_ngraph_iter_sentinel_':
@@ -431,13 +474,13 @@ def get_ngraph_op_cls(op_type):
     raise ValueError("Cannot find op_type of {} in any ngraph.op_graph modules.".format(op_type))
 
 
-def protobuf_to_op(pb_op):
+def protobuf_to_op(pb_op, data=None):
     """
     This will convert a protobuf Op object into its corresponding Python object. But this cannot
     setup links to other ops (such as args, control_deps) since those ops may not
     exist yet.
     We have to wait until all ops are created before connecting them back up together in a second
-    pass, so args, etc will be uninitialized.
+    pass, so args, etc will be uninitialized. Tensors stored in a data file are views of data.
     """
     cls = get_ngraph_op_cls(pb_op.op_type)
 
@@ -448,11 +491,13 @@ def protobuf_to_op(pb_op):
     py_op.name = pb_op.name
 
     if 'valfun_value' in pb_op.attrs:
-        valfun_value = pb_to_tensor(pb_op.attrs['valfun_value'].tensor)
+        valfun_value = pb_to_tensor(pb_op.attrs['valfun_value'].tensor, data)
         py_op.valfun = lambda x: valfun_value
 
     # op.uuid
     py_op.uuid = uuid.UUID(bytes=pb_op.uuid.uuid)
+    # Where the op was created is not serialized
+    py_op._debug_location = None
 
     # op.metadata and remaining keys
     ignored_keys = {'valfun_value', 'dtype', 'metadata'}
@@ -462,27 +507,27 @@ def protobuf_to_op(pb_op):
             py_op._ngraph_ser_handle = True
         if key.startswith('_ngraph_metadata_'):
             value = pb_op.attrs[key]
-            py_op.metadata[key[17:]] = protobuf_attr_to_python(value)
+            py_op.metadata[key[17:]] = protobuf_attr_to_python(value, data)
         elif not key.startswith('_is_') and key not in EXCEPTION_ATTRIBUTES and \
                 key.startswith('_'):
             continue
         else:
             value = pb_op.attrs[key]
-            setattr(py_op, key, protobuf_attr_to_python(value))
+            setattr(py_op, key, protobuf_attr_to_python(value, data))
     return py_op
 
 
-def _deserialize_graph(graph_pb):
+def _deserialize_graph(graph_pb, data=None):
     """
     Will deserialize a graph and return the list of all ops in that graph. Does not bother
     filtering down to only the original set of ops the user passed in for serialization
     (if that's what the user desired upon serializing with the serialization
-    only_return_handle_ops parameter).
+    only_return_handle_ops parameter). data holds the bytes of the data file, if any.
     """
     # For safety we clear this registry
     GLOBAL_AXIS_REGISTRY.clear()
 
-    ops = list(map(protobuf_to_op, graph_pb.ops))
+    ops = [protobuf_to_op(pb_op, data) for pb_op in graph_pb.ops]
     uuid_lookup = {op.uuid.bytes: op for op in ops}
     for edge in graph_pb.edges:
         head_op = uuid_lookup[edge.from_uuid.uuid]
@@ -533,9 +578,17 @@ def _deserialize_graph(graph_pb):
         return ops
 
 
-def deserialize_graph(graph_msg):
+def deserialize_graph(graph_msg, data_path=None):
     """
     Given a serialized protobuf `GraphDef` bytestring, this will deserialize it and return
     the Ops of the graph.
+
+    Params:
+      data_path <string>: The data file written by `serialize_graph`, if one was. It is
+          memory-mapped copy-on-write, so tensors read from it are loaded lazily and can be
+          modified without changing the file.
     """
-    return _deserialize_graph(ops_pb.GraphDef.FromString(graph_msg))
+    data = None
+    if data_path is not None and os.path.getsize(data_path) > 0:
+        data = np.memmap(data_path, dtype=np.uint8, mode='c')
+    return _deserialize_graph(ops_pb.GraphDef.FromString(graph_msg), data)
@@ -18,11 +18,15 @@ import collections
 import weakref
 
 import abc
+import numpy as np
 from builtins import object
 from future.utils import with_metaclass
 
 from ngraph.op_graph.op_graph import Op, computation
+from ngraph.op_graph.scan import ScanOp
+from ngraph.util.checkpoint import ArchiveWriter, read_archive, write_archive
 from ngraph.util.names import NameableValue
+from ngraph.transformers.passes.passes import GraphPassManager
 from orderedset import OrderedSet
 
 
@@ -85,7 +89,31 @@ class Computation(NameableValue):
     def __call__(self, *args, **kwargs):
         """
         Executes the computation passing args in to the function.
+
+        Arguments:
+            *args: The values of the parameters.
+            feed_dict (dict, optional): The values of the parameters, by parameter, instead
+                of args.
+            bind_inputs (bool, optional): If True, the value of a parameter is used in place,
+                without copying, when the device can use it as the storage of the parameter,
+                as a CPU transformer can for a writeable C-contiguous array of the parameter's
+                dtype and shape. The value then stays the storage of the parameter until the
+                parameter is given another value, so it must not be modified while later
+                computations should see the value it had. Other values are copied.
+            out (optional): Arrays to write the returned values into, structured like the
+                returned values, with None for any value to return as usual. When the device
+                can, the returned value is computed directly in the array.
+            copy (bool, optional): If True, return copies of the values, which stay valid
+                after the next computation. Otherwise a value may be the device tensor itself,
+                which the next computation overwrites. Values written to out are not copied.
+
+        Returns:
+            The values of the returns of the computation: a value for an Op, a tuple of
+            values for a sequence of Ops, and a dict of values by Op for a set of Ops.
         """
+        bind_inputs = kwargs.pop('bind_inputs', False)
+        out = kwargs.pop('out', None)
+        copy = kwargs.pop('copy', False)
         args = self.unpack_args_or_feed_dict(args, kwargs)
 
         # TODO Should this be automatic?
@@ -93,35 +121,68 @@ class Computation(NameableValue):
 
         # Get the parameters to the device
         for param, arg in zip(self.computation.parameters, args):
-            param.value[()] = arg
-
-        self.executor()
-
-        # TODO Should copy this out of the device to a destination when it is not scalar
-        def value(op):
+            if not (bind_inputs and param.value.bind(arg)):
+                param.value.unbind()
+                param.value[()] = arg
+
+        returns = self.computation.returns
+        if isinstance(returns, Op):
+            outs = [(returns, out)]
+        elif isinstance(returns, (collections.Sequence, OrderedSet)):
+            outs = list(zip(returns, out if out is not None else [None] * len(returns)))
+        elif isinstance(returns, collections.Set):
+            outs = [(op, out.get(op) if out is not None else None) for op in returns]
+        else:
+            outs = []
+        # Compute the returned values in place where possible. The storage of persistent
+        # tensors holds their values between computations, so it is never replaced here.
+        bound = dict()
+        for op, array in outs:
+            if (array is not None and op not in bound and op.is_tensor_op and
+                    op.value is not None and
+                    not op.value.tensor_description.is_persistent and
+                    op.value.bind(array)):
+                bound[op] = array
+
+        def value(op, array):
             """
             Returns the computed value of op, or None if it has no value.
 
             :param op:
+            :param array: The array to write the value into, or None.
             :return: Return value for op.
             """
             if op.is_tensor_op:
                 if op.value is not None:
+                    if array is not None:
+                        if bound.get(op) is not array:
+                            op.value.get(array)
+                        return array
+                    if copy:
+                        return np.array(op.value.get(None))
                     return op.value.get(None)
             else:
                 return None
 
-        if isinstance(self.computation.returns, Op):
-            return value(self.computation.returns)
-        elif isinstance(self.computation.returns, (collections.Sequence, OrderedSet)):
-            return tuple(value(op) for op in self.computation.returns)
-        elif isinstance(self.computation.returns, collections.Set):
-            result = dict()
-            for op in self.computation.returns:
-                result[op] = value(op)
-            return result
-        else:
-            return None
+        try:
+            self.executor()
+
+            if isinstance(returns, Op):
+                return value(*outs[0])
+            elif isinstance(returns, (collections.Sequence, OrderedSet)):
+                return tuple(value(op, array) for op, array in outs)
+            elif isinstance(returns, collections.Set):
+                result = dict()
+                for op, array in outs:
+                    result[op] = value(op, array)
+                return result
+            else:
+                return None
+        finally:
+            # The values are read before the storage of the returns is given back, since
+            # other returns may be views of it
+            for op in bound:
+                op.value.unbind()
 
 
 class DeviceBuffer(with_metaclass(abc.ABCMeta, NameableValue)):
@@ -279,6 +340,21 @@ class DeviceTensor(with_metaclass(abc.ABCMeta, NameableValue)):
         :param value: Tensor with same size as index/slice
         """
 
+    def bind(self, value):
+        """
+        Makes value the storage of the device tensor, if the device can use it in place.
+
+        :param value: An array with the shape and dtype of the device tensor.
+        :return: True if value is now the storage; otherwise nothing was done.
+        """
+        return False
+
+    def unbind(self):
+        """
+        Gives the device tensor its own storage again after bind. The values of the
+        device tensor are then undefined.
+        """
+
 
 class Transformer_ABC_Meta(abc.ABCMeta):
     """
@@ -316,6 +392,10 @@ class Transformer(with_metaclass(Transformer_ABC_Meta, object)):
         initialized (bool): True when variables have been initialized/restored.
         fusion (bool): True when fusion was enabled.
         device_buffers (set): Set of handles for storage allocations.
+        step_computations (dict): The computations of the steps of ScanOps, by the
+            ComputationOp of the step.
+        graph_pass_manager (GraphPassManager): Runs the graph passes and keeps their timings
+            and rewrite counts.
     """
     def __init__(self, **kwargs):
         super(Transformer, self).__init__(**kwargs)
@@ -324,7 +404,9 @@ class Transformer(with_metaclass(Transformer_ABC_Meta, object)):
         self.allocated = False
         self.initialized = False
         self.device_buffers = OrderedSet()
+        self.step_computations = dict()
         self.graph_passes = None
+        self.graph_pass_manager = GraphPassManager()
 
     def register_graph_pass(self, graph_pass, position=None):
         """
@@ -340,8 +422,7 @@ class Transformer(with_metaclass(Transformer_ABC_Meta, object)):
             self.graph_passes.append(graph_pass)
 
     def run_registered_graph_passes(self, ops):
-        for graph_pass in self.graph_passes:
-            graph_pass.do_pass(ops, self)
+        self.graph_pass_manager.run(self.graph_passes, ops, self)
         return ops
 
     def _transform_computations(self):
@@ -521,9 +602,25 @@ class Transformer(with_metaclass(Transformer_ABC_Meta, object)):
                 'Cannot create computations from a finalized transformer'
             )
         result = self.make_computation(computation)
+        self.add_step_computations(computation)
         self.computations.add(result)
         return result
 
+    def add_step_computations(self, computation):
+        """
+        Adds the computations of the steps of the ScanOps computation uses, before the
+        computations that call them.
+
+        Arguments:
+            computation: A computation Op.
+        """
+        for op in Op.ordered_ops([computation]):
+            if isinstance(op, ScanOp) and op.body not in self.step_computations:
+                self.add_step_computations(op.body)
+                step = self.make_computation(op.body)
+                self.step_computations[op.body] = step
+                self.computations.add(step)
+
     def make_computation(self, computation):
         """
         Wrap in Computation or a transformer-specific subclass.
@@ -572,6 +669,85 @@ class Transformer(with_metaclass(Transformer_ABC_Meta, object)):
         # try to initialize.
         self.initialized = True
 
+    def persistent_tensors(self):
+        """
+        Returns the persistent tensors, such as variables, used by the computations. These
+        are the state saved in a checkpoint.
+
+        Will finalize if not already done.
+
+        Returns:
+            An OrderedDict from tensor names to AssignableTensorOps.
+        """
+        if not self.finalized:
+            self._transform_computations()
+
+        tensors = collections.OrderedDict()
+        for op in self.ops:
+            for state in op.states_read | op.states_written:
+                if state.is_persistent and not (state.is_constant or state.is_placeholder):
+                    tensors[state.name] = state
+        return tensors
+
+    def save_checkpoint(self, path, background=False, tensors=None):
+        """
+        Saves the values of persistent tensors to an archive, which can be restored with
+        restore_checkpoint.
+
+        Arguments:
+            path: The file name of the archive.
+            background: If True, the values are copied from the device and written to the
+                file on a background thread, so computations can continue to run.
+            tensors: A mapping from names in the archive to the tensors to save. Defaults to
+                persistent_tensors().
+
+        Returns:
+            If background is True, an ArchiveWriter whose wait method waits for the write to
+            finish.
+        """
+        self.initialize()
+        if tensors is None:
+            tensors = self.persistent_tensors()
+        arrays = collections.OrderedDict()
+        for name, tensor in tensors.items():
+            value = tensor.tensor_description().value.get(None)
+            # The computations may update the device tensors while the file is written
+            arrays[name] = np.array(value) if background else value
+        if background:
+            return ArchiveWriter(path, arrays)
+        write_archive(path, arrays)
+
+    def restore_checkpoint(self, path, strict=True, tensors=None):
+        """
+        Sets persistent tensors to the values in an archive written by save_checkpoint. The
+        archive is memory-mapped, and each value is copied from it straight to its device
+        tensor.
+
+        Arguments:
+            path: The file name of the archive.
+            strict: If True, every tensor must have a value in the archive.
+            tensors: A mapping from names in the archive to the tensors to restore. Defaults
+                to persistent_tensors().
+        """
+        self.initialize()
+        if tensors is None:
+            tensors = self.persistent_tensors()
+        arrays = read_archive(path)
+        # Check every value before writing any, so that a bad archive changes nothing
+        restored = []
+        for name, tensor in tensors.items():
+            if name not in arrays:
+                if strict:
+                    raise ValueError("Checkpoint {} has no value for {}".format(path, name))
+                continue
+            value = arrays[name]
+            if value.shape != tuple(tensor.axes.lengths):
+                raise ValueError("Checkpoint value for {} has shape {}, expected {}"
+                                 .format(name, value.shape, tuple(tensor.axes.lengths)))
+            restored.append((tensor, value))
+        for tensor, value in restored:
+            tensor.tensor_description().value[()] = value
+
     def close(self):
         pass
 
@@ -0,0 +1,335 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+"""
+A persistent cache of the code generated by the CPU transformer.
+
+Entries are keyed by graph_digest, a hash of the graph as given to the transformer, before
+any passes are run, and of the transformer options. Ops are numbered in the order in which
+they are reached from the roots, and are referred to by that number, so the digest does not
+depend on op names or uuids, and an entry can be bound to the ops of an identical graph built
+by another process.
+"""
+from __future__ import division
+import hashlib
+import logging
+import os
+import pickle
+import re
+import sys
+import tempfile
+from collections import deque
+
+import numpy as np
+import six
+from orderedset import OrderedSet
+
+import ngraph
+from ngraph.op_graph.axes import Axes, Axis, FlattenedAxis
+from ngraph.op_graph.op_graph import Op
+
+
+CACHE_DIR_ENV = 'NGRAPH_CPU_CACHE_DIR'
+CACHE_SIZE_ENV = 'NGRAPH_CPU_CACHE_SIZE'
+
+# Op attributes that do not affect the generated code
+IGNORED_ATTRIBUTES = {'graph_label_type', '_uuid', '__doc__', '_debug_location', '_tdcache',
+                      '_adjoints', '_one', 'all_deps'}
+
+# Names given to axes created without a name
+GENERATED_AXIS_NAME = re.compile(r'^\w*Axis_\d+$')
+
+
+class Uncacheable(Exception):
+    """
+    Raised when a graph contains values that graph_digest cannot hash.
+    """
+
+
+def package_digest():
+    """
+    A hash of the ngraph sources, so that entries made by another version of ngraph or of
+    Python are not used.
+
+    Returns:
+        The digest as a hex string.
+    """
+    if package_digest.value is None:
+        digest = hashlib.sha256(sys.version.encode('utf-8'))
+        root = os.path.dirname(ngraph.__file__)
+        for path, dirs, files in sorted(os.walk(root)):
+            dirs.sort()
+            for name in sorted(files):
+                if name.endswith('.py'):
+                    with open(os.path.join(path, name), 'rb') as f:
+                        digest.update(f.read())
+        package_digest.value = digest.hexdigest()
+    return package_digest.value
+
+
+package_digest.value = None
+
+
+class GraphEncoder(object):
+    """
+    Encodes ops and the values of their attributes as nested tuples of strings and numbers.
+
+    Generated axis names depend on how many axes were created before, so they are replaced
+    by the order in which the encoder first sees them.
+
+    Arguments:
+        roots: The ops to encode.
+
+    Attributes:
+        ops: The ops reached from the roots, in the order they were numbered.
+    """
+    def __init__(self, roots):
+        self.ops = []
+        self.index = dict()
+        self.queue = deque()
+        self.axis_names = dict()
+        self.roots = tuple(self.encode(root) for root in roots)
+
+    def encode_graph(self):
+        """
+        Returns:
+            The encoding of every op reached from the roots.
+        """
+        encoded = [self.roots]
+        while self.queue:
+            encoded.append(self.encode_op(self.queue.popleft()))
+        return tuple(encoded)
+
+    def encode_op(self, op):
+        attributes = []
+        for key in sorted(op.__dict__):
+            if key in IGNORED_ATTRIBUTES:
+                continue
+            if key == 'initial_value' and not op.is_constant:
+                # The values of variables are set when storage is allocated
+                continue
+            attributes.append((key, self.encode(op.__dict__[key])))
+        return (type(op).__module__, type(op).__name__, tuple(attributes))
+
+    def encode(self, value):
+        """
+        Arguments:
+            value: An attribute value.
+
+        Returns:
+            The encoding of value.
+        """
+        if isinstance(value, Op):
+            if value not in self.index:
+                self.index[value] = len(self.ops)
+                self.ops.append(value)
+                self.queue.append(value)
+            return ('op', self.index[value])
+        if value is None or isinstance(value, (bool, float, str, six.text_type)
+                                       + six.integer_types):
+            return (type(value).__name__, repr(value))
+        if isinstance(value, np.generic):
+            return (value.dtype.str, repr(value.item()))
+        if isinstance(value, np.dtype):
+            return ('dtype', value.str)
+        if isinstance(value, np.ndarray):
+            data = np.ascontiguousarray(value).tobytes()
+            return ('ndarray', value.dtype.str, value.shape, hashlib.sha256(data).hexdigest())
+        if isinstance(value, FlattenedAxis):
+            return ('FlattenedAxis', self.encode(value.axes))
+        if isinstance(value, Axis):
+            name = value.name
+            if GENERATED_AXIS_NAME.match(name):
+                name = self.axis_names.setdefault(name, len(self.axis_names))
+            return ('Axis', name, value.length, type(value).__name__)
+        if isinstance(value, Axes):
+            return ('Axes', tuple(self.encode(axis) for axis in value))
+        if isinstance(value, slice):
+            return ('slice', self.encode(value.start), self.encode(value.stop),
+                    self.encode(value.step))
+        if isinstance(value, dict):
+            items = sorted((self.encode(key), value[key]) for key in value)
+            return ('dict', tuple((key, self.encode(item)) for key, item in items))
+        if isinstance(value, (list, tuple, OrderedSet)):
+            return (type(value).__name__, tuple(self.encode(item) for item in value))
+        if isinstance(value, (set, frozenset)):
+            return ('set', tuple(sorted(self.encode(item) for item in value)))
+        raise Uncacheable("Cannot hash a {}".format(type(value).__name__))
+
+
+def graph_digest(roots, options):
+    """
+    Hashes a graph and the options it is compiled with.
+
+    Arguments:
+        roots: The ops to compute, usually ComputationOps.
+        options: A dict of the options that affect the generated code. The values are hashed
+            like op attributes.
+
+    Returns:
+        A tuple of the digest, as a hex string, and the ops of the graph in the order that
+        entries refer to them.
+
+    Raises:
+        Uncacheable: If the graph or options contain values that cannot be hashed.
+    """
+    encoder = GraphEncoder(roots)
+    graph = encoder.encode_graph()
+    encoded_options = encoder.encode(options)
+    digest = hashlib.sha256(package_digest().encode('utf-8'))
+    digest.update(repr((graph, encoded_options)).encode('utf-8'))
+    return digest.hexdigest(), encoder.ops
+
+
+class CompilationCache(object):
+    """
+    A directory of compiled CPU computations, evicting the least recently used entries when
+    it holds more than max_bytes.
+
+    Entries are pickles, so the directory is created readable only by its owner, and entries
+    that are not owned by the current user, or that other users may write, are not loaded.
+
+    Arguments:
+        directory: The cache directory, created if needed. Defaults to the value of the
+            NGRAPH_CPU_CACHE_DIR environment variable.
+        max_bytes: The size limit. Defaults to the value of the NGRAPH_CPU_CACHE_SIZE
+            environment variable, or 1GB.
+
+    Attributes:
+        hits: Number of entries found.
+        misses: Number of entries not found.
+    """
+    suffix = '.ngc'
+
+    def __init__(self, directory=None, max_bytes=None):
+        if directory is None:
+            directory = os.environ[CACHE_DIR_ENV]
+        if max_bytes is None:
+            max_bytes = int(os.environ.get(CACHE_SIZE_ENV, 1 << 30))
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        if not os.path.isdir(directory):
+            os.makedirs(directory, 0o700)
+
+    def filename(self, key):
+        return os.path.join(self.directory, key + self.suffix)
+
+    def get(self, key):
+        """
+        Arguments:
+            key: A digest from graph_digest.
+
+        Returns:
+            The entry stored for key, or None.
+        """
+        filename = self.filename(key)
+        try:
+            with open(filename, 'rb') as f:
+                if not self.trusted(os.fstat(f.fileno())):
+                    logging.warning("Ignoring compilation cache entry {}, which is not owned "
+                                    "by the current user or may be written by other users"
+                                    .format(filename))
+                    self.misses += 1
+                    return None
+                entry = pickle.load(f)
+            # The modification time orders entries for eviction
+            os.utime(filename, None)
+        except (IOError, OSError):
+            self.misses += 1
+            return None
+        except Exception as e:
+            logging.warning("Discarding unreadable compilation cache entry {}: {}"
+                            .format(filename, e))
+            self.discard(filename)
+            self.misses += 1
+            return None
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        """
+        Stores an entry, then evicts entries if the cache is too large.
+
+        Arguments:
+            key: A digest from graph_digest.
+            entry: A picklable value.
+        """
+        handle, temporary = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'wb') as f:
+                pickle.dump(entry, f, protocol=pickle.HIGHEST_PROTOCOL)
+            # Readers in other processes only ever see complete entries
+            os.rename(temporary, self.filename(key))
+        except Exception:
+            self.discard(temporary)
+            raise
+        self.evict()
+
+    def entries(self):
+        """
+        Returns:
+            A list of (modification time, size, filename) of the entries, oldest first.
+        """
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(self.suffix):
+                continue
+            filename = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(filename)
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, filename))
+        return sorted(entries)
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache holds at most max_bytes.
+        """
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        for _, size, filename in entries:
+            if total <= self.max_bytes:
+                break
+            self.discard(filename)
+            total -= size
+
+    def clear(self):
+        """
+        Removes all entries.
+        """
+        for _, _, filename in self.entries():
+            self.discard(filename)
+
+    @staticmethod
+    def trusted(stat):
+        """
+        Arguments:
+            stat: The os.stat result of an entry.
+
+        Returns:
+            True if the entry is owned by the current user and only the owner may write it.
+        """
+        if not hasattr(os, 'getuid'):
+            return True
+        return stat.st_uid == os.getuid() and not stat.st_mode & 0o022
+
+    @staticmethod
+    def discard(filename):
+        try:
+            os.remove(filename)
+        except OSError:
+            pass
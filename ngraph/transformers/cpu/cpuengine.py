@@ -19,15 +19,123 @@ import ctypes
 import os
 import sys
 import itertools as itt
+import threading
+from multiprocessing.pool import ThreadPool
 import numpy as np
 
 
+class BatchSplitter(object):
+    """
+    Splits the work of a kernel along an axis, such as the batch axis, into parts that run
+    at the same time on a pool of threads. Each part writes its own slice of the output in
+    place.
+
+    Arguments:
+        workers: The number of parts. With one worker, kernels run whole on the calling
+            thread.
+        min_size: Kernels that compute fewer elements run whole, since the parts would not
+            make up for the cost of handing them to the threads.
+    """
+    def __init__(self, workers=1, min_size=65536):
+        if workers < 1:
+            raise ValueError("The number of workers must be positive, not {}".format(workers))
+        self.workers = workers
+        self.min_size = min_size
+        self.pool = None
+        self.lock = threading.Lock()
+
+    def close(self):
+        """
+        Stops the threads.
+        """
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+
+    def parts(self, length, size):
+        """
+        Returns:
+            Slices that partition range(length), one for each part.
+        """
+        parts = min(self.workers, length) if size >= self.min_size else 1
+        bounds = [length * part // parts for part in range(parts + 1)] if parts else [0, 0]
+        return [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+
+    def split(self, kernel, length, size):
+        """
+        Calls kernel for each part of an axis.
+
+        Arguments:
+            kernel: A function of the slice of the axis to compute.
+            length: The length of the axis.
+            size: The number of elements the kernel computes, to compare with min_size.
+        """
+        parts = self.parts(length, size)
+        if len(parts) == 1:
+            kernel(parts[0])
+            return
+        with self.lock:
+            if self.pool is None:
+                self.pool = ThreadPool(self.workers)
+        self.pool.map(kernel, parts, chunksize=1)
+
+    def elementwise(self, function, out, *args):
+        """
+        Computes function(*args, out=out) in parts along the longest axis of out. The args
+        are broadcast against out as by a numpy ufunc.
+        """
+        # Parts of an output that overlaps an argument differently could read each other
+        if out.ndim == 0 or any(isinstance(arg, np.ndarray) and np.may_share_memory(arg, out)
+                                and not (arg.shape == out.shape and arg.strides == out.strides
+                                         and arg.ctypes.data == out.ctypes.data)
+                                for arg in args):
+            function(*args, out=out)
+            return
+        axis = int(np.argmax(out.shape))
+
+        def part(rows):
+            def split_arg(arg):
+                arg_axis = axis - out.ndim + np.ndim(arg)
+                if arg_axis < 0 or np.shape(arg)[arg_axis] == 1:
+                    return arg
+                return arg[(slice(None),) * arg_axis + (rows,)]
+            function(*[split_arg(arg) for arg in args],
+                     out=out[(slice(None),) * axis + (rows,)])
+        self.split(part, out.shape[axis], out.size)
+
+    def reduce(self, function, x, axis, out):
+        """
+        Computes function(x, axis=axis, out=out), a reduction such as np.sum, in parts along
+        the longest axis of x that is not reduced.
+        """
+        axes = axis if isinstance(axis, tuple) else (axis,)
+        kept = [index for index in range(x.ndim) if index not in axes]
+        if not kept or out.ndim != len(kept):
+            function(x, axis=axis, out=out)
+            return
+        split_axis = max(kept, key=lambda index: x.shape[index])
+        out_axis = kept.index(split_axis)
+
+        def part(rows):
+            function(x[(slice(None),) * split_axis + (rows,)], axis=axis,
+                     out=out[(slice(None),) * out_axis + (rows,)])
+        self.split(part, x.shape[split_axis], x.size)
+
+
+# Runs kernels whole, for kernels that are not given a BatchSplitter
+serial_splitter = BatchSplitter()
+
+
 class Mkldnn(object):
     def __init__(self, engine_path):
         self.mkldnn_enabled = False
         self.mkldnn_engine_initialized = False
         self.mkldnn_verbose = False
         self.kernels = dict()
+        # Splits the numpy kernels that stand in for missing MKL-DNN kernels along the
+        # batch axis
+        self.splitter = serial_splitter
         try:
             self.mkldnn_engine_dll = ctypes.CDLL(engine_path)
             self.mkldnn_enabled = True
@@ -190,18 +298,14 @@ class Mkldnn(object):
         if (self.mkldnn_enabled and name in self.kernels):
             self.run_mkldnn_netlist_fn(self.kernels[name])
         else:
-            mSlice, pSlice, qSlice, _, _, _ = conv_slices
-            K, M, P, Q, N = O.shape
-
-            for (m, mS), (p, pS), (q, qS) in itt.product(enumerate(mSlice),
-                                                         enumerate(pSlice),
-                                                         enumerate(qSlice)):
-                sliceT, sliceD, _ = mS
-                sliceR, sliceH, _ = pS
-                sliceS, sliceW, _ = qS
-                slicedF = F[:, sliceT, sliceR, sliceS, :].reshape((-1, K))
-                slicedI = I[:, sliceD, sliceH, sliceW, :].reshape((-1, N))
-                O[:, m, p, q, :] = np.dot(slicedF.T, slicedI)
+            K = F.shape[-1]
+
+            def part(n):
+                out = O[..., n]
+                cols = im2col(I[..., n], conv_slices, O.shape[1:4])
+                out[()] = np.dot(F.reshape((-1, K)).T,
+                                 cols.reshape((F.size // K, -1))).reshape(out.shape)
+            self.splitter.split(part, O.shape[-1], O.size)
 
     def init_conv_bprop(self, name, E, F, gI, pad, stride):
         if (self.mkldnn_enabled):
@@ -244,19 +348,13 @@ class Mkldnn(object):
         if (self.mkldnn_enabled and name in self.kernels):
             self.run_mkldnn_netlist_fn(self.kernels[name])
         else:
-            _, _, _, mSlice, pSlice, qSlice = conv_slices
-            F = np.transpose(F[:, ::-1, ::-1, ::-1, :], (4, 1, 2, 3, 0)).copy()
-            K, M, P, Q, N = gI.shape
-
-            for (m, mS), (p, pS), (q, qS) in itt.product(enumerate(mSlice),
-                                                         enumerate(pSlice),
-                                                         enumerate(qSlice)):
-                sliceT, sliceD, _ = mS
-                sliceR, sliceH, _ = pS
-                sliceS, sliceW, _ = qS
-                slicedF = F[:, sliceT, sliceR, sliceS, :].reshape((-1, K))
-                slicedI = E[:, sliceD, sliceH, sliceW, :].reshape((-1, N))
-                gI[:, m, p, q, :] = np.dot(slicedF.T, slicedI)
+            K = F.shape[-1]
+
+            def part(n):
+                delta = E[..., n]
+                cols = np.dot(F.reshape((-1, K)), delta.reshape((K, -1)))
+                col2im(cols.reshape(F.shape[:-1] + delta.shape[1:]), conv_slices, gI[..., n])
+            self.splitter.split(part, gI.shape[-1], gI.size)
 
     def init_update_conv(self, name, arrI, arrE, arrO, pad, stride):
         if (self.mkldnn_enabled):
@@ -294,21 +392,10 @@ class Mkldnn(object):
         if (self.mkldnn_enabled and name in self.kernels):
             self.run_mkldnn_netlist_fn(self.kernels[name])
         else:
-            mSlice, pSlice, qSlice, _, _, _ = conv_slices
-            K, M, P, Q, N = E.shape
-            C, _, _, _, K = U.shape
-            U.fill(0.0)
-
-            for (m, mS), (p, pS), (q, qS) in itt.product(enumerate(mSlice),
-                                                         enumerate(pSlice),
-                                                         enumerate(qSlice)):
-                sliceT, sliceD, tlen = mS
-                sliceR, sliceH, rlen = pS
-                sliceS, sliceW, slen = qS
-                slicedI = I[:, sliceD, sliceH, sliceW, :].reshape((-1, N))
-                slicedE = E[:, m, p, q, :]
-                update = np.dot(slicedI, slicedE.T).reshape((C, tlen, rlen, slen, K))
-                U[:, sliceT, sliceR, sliceS, :] += update
+            K = E.shape[0]
+            cols = im2col(I, conv_slices, E.shape[1:4])
+            U[()] = np.dot(cols.reshape((U.size // K, -1)),
+                           E.reshape((K, -1)).T).reshape(U.shape)
 
     def init_pool_fprop(self, pool_type, name, arrI, arrO, kernel, pad, stride):
         if (self.mkldnn_enabled):
@@ -341,25 +428,34 @@ class Mkldnn(object):
         if (self.mkldnn_enabled and name in self.kernels):
             self.run_mkldnn_netlist_fn(self.kernels[name])
         else:
-            kSlice, mSlice, pSlice, qSlice, op, arrA = pool_slices
-            K, M, P, Q, N = arrO.shape
-            for (k, kS), (m, mS), (p, pS), (q, qS) in itt.product(enumerate(kSlice),
-                                                                  enumerate(mSlice),
-                                                                  enumerate(pSlice),
-                                                                  enumerate(qSlice)):
-                sliceC, _ = kS
-                sliceD, _ = mS
-                sliceH, _ = pS
-                sliceW, _ = qS
-
-                sliceI = arrI[sliceC, sliceD, sliceH, sliceW, :].reshape(-1, N)
+            kernel, strides, pads, counts, op, arrA = pool_slices
+            if op == "max":
+                if np.issubdtype(arrI.dtype, np.floating):
+                    fill = -np.inf
+                else:
+                    fill = np.iinfo(arrI.dtype).min
+            else:
+                fill = 0
+            window_axes = (4, 5, 6, 7)
+
+            def part(n):
+                I, O = arrI[..., n], arrO[..., n]
+                A = None if arrA is None else arrA[..., n]
+                K, M, P, Q, N = O.shape
+                windows = pool_windows(pad_pool_input(I, pads, fill), kernel, strides, O.shape)
                 if op == "max":
-                    arrA[k, m, p, q, :] = np.argmax(sliceI, axis=0)
-                    arrO[k, m, p, q, :] = np.max(sliceI, axis=0)
+                    cols = windows.reshape((K, M, P, Q, -1, N))
+                    A[()] = np.argmax(cols, axis=4)
+                    O[()] = np.max(cols, axis=4)
                 elif op == "avg":
-                    arrO[k, m, p, q, :] = np.mean(sliceI, axis=0)
+                    O[()] = np.sum(windows, axis=window_axes) / counts
                 elif op == "l2":
-                    arrO[k, m, p, q, :] = np.sqrt(np.sum(np.square(sliceI), axis=0))
+                    O[()] = np.sqrt(np.sum(np.square(windows), axis=window_axes))
+                    norm = O.reshape((K, M, P, Q, 1, N))
+                    with np.errstate(divide='ignore', invalid='ignore'):
+                        np.divide(windows.reshape((K, M, P, Q, -1, N)), norm, out=A)
+                    A[np.broadcast_to(norm == 0, A.shape)] = 0
+            self.splitter.split(part, arrO.shape[-1], arrO.size)
 
     def init_pool_bprop(self, pool_type, name, fprop_name, arrE, arrD, kernel, pad, stride):
         if (self.mkldnn_enabled):
@@ -388,29 +484,47 @@ class Mkldnn(object):
         if (self.mkldnn_enabled and name in self.kernels):
             self.run_mkldnn_netlist_fn(self.kernels[name])
         else:
-            kSlice, mSlice, pSlice, qSlice, op, arrA = pool_slices
-            arrD[:] = 0
-            K, M, P, Q, N = arrE.shape
-            for (k, kS), (m, mS), (p, pS), (q, qS) in itt.product(enumerate(kSlice),
-                                                                  enumerate(mSlice),
-                                                                  enumerate(pSlice),
-                                                                  enumerate(qSlice)):
-                sliceC, clen = kS
-                sliceD, dlen = mS
-                sliceH, hlen = pS
-                sliceW, wlen = qS
-
-                patch_in = (sliceC, sliceD, sliceH, sliceW, slice(None))
-                patch_out = (k, m, p, q, slice(None))
-                sliceB = arrD[patch_in].reshape((-1, N))
+            kernel, strides, pads, counts, op, arrA = pool_slices
+            if op not in ("max", "avg", "l2"):
+                raise NotImplementedError
+
+            def part(n):
+                E, D = arrE[..., n], arrD[..., n]
+                A = None if arrA is None else arrA[..., n]
+                K, M, P, Q, N = E.shape
+                padded_shape = tuple(x + sum(pad) for x, pad in zip(D.shape[:4], pads)) + (N,)
                 if op == "max":
-                    max_n = arrA[patch_out]
-                    sliceB[max_n, list(range(N))] += arrE[patch_out]
-                elif op == "avg":
-                    sliceB += arrE[patch_out] * (1.0 / sliceB.shape[0])
+                    # scatter each error to the flat position of its window's maximum
+                    element_strides = np.cumprod((1,) + padded_shape[:0:-1])[::-1]
+                    window_index = sum(np.arange(length).reshape((-1,) + (1,) * (3 - axis)) *
+                                       stride * element_stride
+                                       for axis, (length, stride, element_stride)
+                                       in enumerate(zip((K, M, P, Q), strides,
+                                                        element_strides)))
+                    tap_index = sum(np.arange(length).reshape((-1,) + (1,) * (3 - axis)) *
+                                    element_stride
+                                    for axis, (length, element_stride)
+                                    in enumerate(zip(kernel, element_strides))).ravel()
+                    index = window_index[..., np.newaxis] + tap_index[A] + np.arange(N)
+                    padded = np.bincount(index.ravel(), weights=E.ravel(),
+                                         minlength=int(np.prod(padded_shape)))
+                    padded = padded.reshape(padded_shape)
                 else:
-                    raise NotImplementedError
-                arrD[patch_in] = sliceB.reshape((clen, dlen, hlen, wlen, N))
+                    if op == "avg":
+                        cols = np.broadcast_to((E / counts)[:, :, :, :, np.newaxis],
+                                               (K, M, P, Q, int(np.prod(kernel)), N))
+                    else:
+                        cols = A * E[:, :, :, :, np.newaxis]
+                    cols = cols.reshape((K, M, P, Q) + tuple(kernel) + (N,))
+                    padded = np.zeros(padded_shape, dtype=D.dtype)
+                    # accumulate one tap of every window at a time
+                    for tap in itt.product(*(range(length) for length in kernel)):
+                        window = tuple(slice(t, t + (length - 1) * stride + 1, stride)
+                                       for t, length, stride in zip(tap, (K, M, P, Q), strides))
+                        padded[window] += cols[(Ellipsis,) + tap + (slice(None),)]
+                D[()] = padded[tuple(slice(pad, pad + x)
+                                     for (pad, _), x in zip(pads, D.shape[:4]))]
+            self.splitter.split(part, arrD.shape[-1], arrD.size)
 
     def init_innerproduct_fprop(self, name, out, x, y):
         if (self.mkldnn_enabled):
@@ -462,7 +576,7 @@ class Mkldnn(object):
         if (self.mkldnn_enabled and name in self.kernels):
             self.run_mkldnn_netlist_fn(self.kernels[name])
         else:
-            np.add(I_array1, I_array2, out=O_array)
+            self.splitter.elementwise(np.add, O_array, I_array1, I_array2)
 
     def init_relu_fprop(self, name, inputs, out, slope):
         if (self.mkldnn_enabled):
@@ -482,7 +596,9 @@ class Mkldnn(object):
         if (self.mkldnn_enabled and name in self.kernels):
             self.run_mkldnn_netlist_fn(self.kernels[name])
         else:
-            np.add(np.maximum(inputs, 0), slope * np.minimum(0, inputs), out=out)
+            def relu(inputs, out):
+                np.add(np.maximum(inputs, 0), slope * np.minimum(0, inputs), out=out)
+            self.splitter.elementwise(relu, out, inputs)
 
     def init_relu_bprop(self, name, arrE, arrD, slope, inputs):
         if (self.mkldnn_enabled):
@@ -502,25 +618,285 @@ class Mkldnn(object):
         if (self.mkldnn_enabled and name in self.kernels):
             self.run_mkldnn_netlist_fn(self.kernels[name])
         else:
-            np.add(delta * np.greater(inputs, 0),
-                   delta * slope * np.less(inputs, 0), out=out)
-
-
-def fprop_lut(lut, idx, axis, output):
-    output[:] = lut.take(idx.astype(int), axis)
+            def bprop_relu(delta, inputs, out):
+                np.add(delta * np.greater(inputs, 0),
+                       delta * slope * np.less(inputs, 0), out=out)
+            self.splitter.elementwise(bprop_relu, out, delta, inputs)
+
+
+def im2col(I, conv_slices, out_shape):
+    """
+    Gathers the input pixels read by every filter tap at every output position.
+
+    Arguments:
+        I: Input of shape (C, D, H, W, N).
+        conv_slices: Tap slices and padding from CPUConvEngine.get_slices.
+        out_shape: The output spatial shape (M, P, Q).
+
+    Returns:
+        Array of shape (C, T, R, S, M, P, Q, N).
+    """
+    tSlice, rSlice, sSlice, pads = conv_slices
+    C, N = I.shape[0], I.shape[-1]
+    if any(pad != (0, 0) for pad in pads):
+        I = np.pad(I, ((0, 0),) + tuple(pads) + ((0, 0),), mode='constant')
+    cols = np.empty((C, len(tSlice), len(rSlice), len(sSlice)) + tuple(out_shape) + (N,),
+                    dtype=I.dtype)
+    for (t, tS), (r, rS), (s, sS) in itt.product(enumerate(tSlice),
+                                                 enumerate(rSlice),
+                                                 enumerate(sSlice)):
+        cols[:, t, r, s] = I[:, tS, rS, sS, :]
+    return cols
+
+
+def col2im(cols, conv_slices, I):
+    """
+    Scatters per-tap contributions back to the input pixels they were gathered from, the
+    inverse of im2col.
+
+    Arguments:
+        cols: Array of shape (C, T, R, S, M, P, Q, N).
+        conv_slices: Tap slices and padding from CPUConvEngine.get_slices.
+        I: Output of shape (C, D, H, W, N), overwritten.
+    """
+    tSlice, rSlice, sSlice, pads = conv_slices
+    padded_shape = (I.shape[0],) + tuple(x + sum(pad) for x, pad in zip(I.shape[1:4], pads)) + \
+        (I.shape[-1],)
+    padded = np.zeros(padded_shape, dtype=I.dtype)
+    for (t, tS), (r, rS), (s, sS) in itt.product(enumerate(tSlice),
+                                                 enumerate(rSlice),
+                                                 enumerate(sSlice)):
+        padded[:, tS, rS, sS, :] += cols[:, t, r, s]
+    (d0, _), (h0, _), (w0, _) = pads
+    D, H, W = I.shape[1:4]
+    I[()] = padded[:, d0:d0 + D, h0:h0 + H, w0:w0 + W, :]
+
+
+def pad_pool_input(I, pads, fill):
+    """
+    Pads the channel and spatial axes of a pooling input.
+
+    Arguments:
+        I: Input of shape (C, D, H, W, N).
+        pads: (before, after) padding of each of the C, D, H and W axes.
+        fill: The value of the padding.
+
+    Returns:
+        A padded copy of I.
+    """
+    padded = np.full(tuple(x + sum(pad) for x, pad in zip(I.shape[:4], pads)) + I.shape[4:],
+                     fill, dtype=I.dtype)
+    padded[tuple(slice(pad, pad + x) for (pad, _), x in zip(pads, I.shape[:4]))] = I
+    return padded
+
+
+def pool_windows(padded, kernel, strides, out_shape):
+    """
+    A read-only view of all pooling windows of a padded input.
+
+    Arguments:
+        padded: Padded input of shape (C, D, H, W, N), C-contiguous.
+        kernel: Window lengths (J, T, R, S).
+        strides: Window strides along C, D, H and W.
+        out_shape: Output shape (K, M, P, Q, N).
+
+    Returns:
+        A view of shape (K, M, P, Q, J, T, R, S, N).
+    """
+    element_strides = padded.strides
+    window_strides = tuple(stride * element_stride
+                           for stride, element_stride in zip(strides, element_strides[:4]))
+    windows = np.lib.stride_tricks.as_strided(
+        padded, shape=tuple(out_shape[:4]) + tuple(kernel) + tuple(out_shape[4:]),
+        strides=window_strides + element_strides)
+    windows.flags.writeable = False
+    return windows
+
+
+def fprop_lut(lut, idx, axis, output, splitter=serial_splitter):
+    if idx.ndim == 0:
+        output[...] = lut.take(idx.astype(int), axis)
+        return
+
+    def part(rows):
+        output[(slice(None),) * axis + (rows,)] = lut.take(idx[rows].astype(int), axis)
+    splitter.split(part, len(idx), output.size)
+
+
+def one_hot(x, out, splitter=serial_splitter):
+    """
+    Computes a OneHotOp, with the one-hot axis first.
+    """
+    if x.ndim == 0:
+        out[...] = np.eye(out.shape[0])[:, x.astype(np.int32)]
+        return
+
+    def part(rows):
+        out[:, rows] = np.eye(out.shape[0])[:, x[rows].astype(np.int32)]
+    splitter.split(part, len(x), out.size)
+
+
+def lut_segment_sum(error, idx, axis):
+    """
+    Sums the slices of error along axis that have the same index.
+
+    Arguments:
+        error: The error, with one slice along axis for each index.
+        idx: The indices.
+        axis: The lookup axis.
+
+    Returns:
+        The unique indices, the sums of the slices for each unique index along axis, and for
+        each index, the position of its unique index.
+    """
+    idx = idx.astype(int).reshape(-1)
+    order = np.argsort(idx, kind='mergesort')
+    sorted_idx = idx[order]
+    starts = np.ones(len(idx), dtype=bool)
+    np.not_equal(sorted_idx[1:], sorted_idx[:-1], out=starts[1:])
+    segments = np.cumsum(starts) - 1
+    inverse = np.empty_like(segments)
+    inverse[order] = segments
+    sums = np.add.reduceat(error.take(order, axis), np.flatnonzero(starts), axis)
+    return sorted_idx[starts], sums, inverse
 
 
 def update_lut(error, idx, pad_idx, axis, dW):
     dW[:] = 0
-    idx = idx.astype(int)
-    unqidx, inv = np.unique(idx, return_inverse=True)
-    groups = [np.where(inv == i) for i in range(len(unqidx))]
-    for (wrd_id, group) in zip(unqidx, groups):
-        if wrd_id != pad_idx:
-            if axis == 0:
-                dW[wrd_id, :] = np.sum(error.take(group[0], axis=axis), axis=axis)
-            else:
-                dW[:, wrd_id] = np.sum(error.take(group[0], axis=axis), axis=axis)
+    if idx.size == 0:
+        return
+    unique, sums, _ = lut_segment_sum(error, idx, axis)
+    if pad_idx is not None:
+        keep = unique != pad_idx
+        unique = unique[keep]
+        sums = sums.compress(keep, axis)
+    if axis == 0:
+        dW[unique] = sums
+    else:
+        dW[:, unique] = sums
+
+
+def update_lut_rows(error, idx, pad_idx, axis, rows):
+    if idx.size == 0:
+        return
+    unique, sums, inverse = lut_segment_sum(error, idx, axis)
+    if pad_idx is not None:
+        if axis == 0:
+            sums[unique == pad_idx] = 0
+        else:
+            sums[:, unique == pad_idx] = 0
+    sums.take(inverse, axis, out=rows)
+
+
+def assign_lut(lut, idx, rows, axis):
+    if axis == 0:
+        lut[idx.astype(int)] = rows
+    else:
+        lut[:, idx.astype(int)] = rows
+
+
+def fprop_lstm_cell(ifog, c_prev, out):
+    h, c, i, f, o, g, tanh_c = out
+    gates = out[2:5]
+    np.negative(ifog[:3], out=gates)
+    np.exp(gates, out=gates)
+    gates += 1
+    np.reciprocal(gates, out=gates)
+    np.tanh(ifog[3], out=g)
+    np.multiply(f, c_prev, out=c)
+    np.multiply(i, g, out=h)
+    c += h
+    np.tanh(c, out=tanh_c)
+    np.multiply(o, tanh_c, out=h)
+
+
+def lstm_cell_state_delta(delta, cell):
+    """
+    The derivative of an LSTM step with respect to its cell state, including the part
+    from its hidden state.
+    """
+    d_c = np.square(cell[6])
+    np.subtract(1, d_c, out=d_c)
+    d_c *= cell[4]
+    d_c *= delta[0]
+    d_c += delta[1]
+    return d_c
+
+
+def bprop_lstm_cell(delta, cell, c_prev, out):
+    h, c, i, f, o, g, tanh_c = cell
+    d_c = lstm_cell_state_delta(delta, cell)
+    np.multiply(d_c, g, out=out[0])
+    np.multiply(d_c, c_prev, out=out[1])
+    np.multiply(delta[0], tanh_c, out=out[2])
+    gates = cell[2:5]
+    out[:3] *= gates
+    out[:3] *= 1 - gates
+    np.multiply(d_c, i, out=out[3])
+    out[3] *= 1 - np.square(g)
+
+
+def bprop_lstm_cell_state(delta, cell, out):
+    np.multiply(lstm_cell_state_delta(delta, cell), cell[3], out=out)
+
+
+def run_scan(step, length, reverse, sequences, initial_states, non_sequences, params,
+             results, outputs, final_states, state_history):
+    """
+    Computes a ScanOp.
+
+    Arguments:
+        step: Computes one step, from params into results.
+        length: The number of steps.
+        reverse: Step from the last position to the first.
+        sequences: An (array, axis) pair for each sequence.
+        initial_states: An array for each state.
+        non_sequences: An array for each non-sequence.
+        params: The arrays of the slices of the sequences, the states and the non-sequences
+            that step reads.
+        results: The arrays of the new states, and then the outputs, that step writes.
+        outputs: An (array, axis) pair for each output, to collect it in, or None.
+        final_states: An array for each state, for its value after the last step, or None.
+        state_history: An (array, axis) pair for each state, to collect its value before
+            every step in, or None.
+    """
+    n_sequences = len(sequences)
+    n_states = len(initial_states)
+    sequence_params = params[:n_sequences]
+    state_params = params[n_sequences:n_sequences + n_states]
+    state_results = results[:n_states]
+    output_results = results[n_states:]
+    for param, value in zip(params[n_sequences:], initial_states + non_sequences):
+        param[...] = value
+
+    # New states that are views of states are copied before the states are overwritten
+    copy_results = [any(np.may_share_memory(result, param) for param in state_params)
+                    for result in state_results]
+
+    def at(axis, position):
+        return (slice(None),) * axis + (position,)
+
+    positions = range(length - 1, -1, -1) if reverse else range(length)
+    for position in positions:
+        for (sequence, axis), param in zip(sequences, sequence_params):
+            param[...] = sequence[at(axis, position)]
+        for history, param in zip(state_history, state_params):
+            if history is not None:
+                array, axis = history
+                array[at(axis, position)] = param
+        step()
+        for output, result in zip(outputs, output_results):
+            if output is not None:
+                array, axis = output
+                array[at(axis, position)] = result
+        new_states = [np.copy(result) if copy else result
+                      for result, copy in zip(state_results, copy_results)]
+        for param, new_state in zip(state_params, new_states):
+            param[...] = new_state
+
+    for final_state, param in zip(final_states, state_params):
+        if final_state is not None:
+            final_state[...] = param
 
 
 class ConvLocals(object):
@@ -13,7 +13,6 @@
 # limitations under the License.
 # ----------------------------------------------------------------------------
 from __future__ import division
-from functools import reduce
 
 
 class HetrLocals(object):
@@ -41,11 +40,9 @@ class HetrLocals(object):
         x_nparr = x_devicetensor.get(None)
         q.put(x_nparr)
 
-    def recv_from_queue_send(self, recv_id):
+    def recv_from_queue_send(self, recv_id, out):
         recv_op = self.recv_nodes[recv_id]
-        q = recv_op.queue
-        x = q.get()
-        return x
+        recv_op.queue.get(out)
 
     def queue_gather_send(self, gather_send_id):
         gather_send_op = self.gather_send_nodes[gather_send_id]
@@ -57,15 +54,11 @@ class HetrLocals(object):
         x_nparr = x_devicetensor.get(None)
         q.put(x_nparr)
 
-    def gather_recv_from_queue_gather_send(self, gather_recv_id):
+    def gather_recv_from_queue_gather_send(self, gather_recv_id, out):
         gather_recv_op = self.gather_recv_nodes[gather_recv_id]
-        x_devicetensor = gather_recv_op.value
-        x_nparr = x_devicetensor.get(None)
         for i in range(len(gather_recv_op.from_id)):
             q = gather_recv_op.shared_queues[i]
-            x = q.get()
-            x_nparr[gather_recv_op.slices[i]] = x
-        return x_nparr
+            q.get(out[tuple(gather_recv_op.slices[i])])
 
     def queue_scatter_send(self, scatter_send_id):
         scatter_send_op = self.scatter_send_nodes[scatter_send_id]
@@ -76,35 +69,16 @@ class HetrLocals(object):
         x_nparr = x_devicetensor.get(None)
         for i in range(len(scatter_send_op.to_id)):
             q = scatter_send_op.shared_queues[i]
-            q.put(x_nparr[scatter_send_op.slices[i]])
+            q.put(x_nparr[tuple(scatter_send_op.slices[i])])
 
-    def scatter_recv_from_queue_scatter_send(self, scatter_recv_id):
+    def scatter_recv_from_queue_scatter_send(self, scatter_recv_id, out):
         scatter_recv_op = self.scatter_recv_nodes[scatter_recv_id]
         q = scatter_recv_op.shared_queues[scatter_recv_op.idx]
-        x = q.get()
-        return x
+        q.get(out)
 
-    def queue_allreduce(self, allreduce_id):
+    def queue_allreduce(self, allreduce_id, out):
         allreduce_op = self.allreduce_nodes[allreduce_id]
         x_devicetensor = allreduce_op.args[0].value
         x_nparr = x_devicetensor.get(None)
-        recv_buf = list()
-
-        # Send to all devices
-        for i, q in enumerate(allreduce_op.shared_queues):
-            if i != allreduce_op.idx:
-                q.put(x_nparr)
-
-        # Receive from all devices
-        recv_buf.append(x_nparr)
-        q = allreduce_op.shared_queues[allreduce_op.idx]
-        for i in range(len(allreduce_op.shared_queues) - 1):
-            recv_buf.append(q.get())
-
-        # Apply reduce function
-        if allreduce_op.reduce_func is 'sum':
-            result = reduce(lambda x, y: x + y, recv_buf)
-        elif allreduce_op.reduce_func is 'mean':
-            result = reduce(lambda x, y: x + y, recv_buf) / len(recv_buf)
-
-        return result
+        allreduce_op.exchange.allreduce(allreduce_op.idx, x_nparr, out,
+                                        allreduce_op.reduce_func)
@@ -0,0 +1,215 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+from __future__ import division
+from collections import namedtuple, OrderedDict
+import json
+import os
+from timeit import default_timer
+
+
+ProfileKey = namedtuple('ProfileKey', ['computation', 'name', 'op_type', 'layer_type',
+                                       'recurrent_step'])
+
+ProfileStats = namedtuple('ProfileStats', ['key', 'calls', 'total', 'min', 'max'])
+
+
+class OpProfiler(object):
+    """
+    Collects the time spent in each op of the generated CPU executors.
+
+    When a CPUTransformer is created with profile=True, every op invocation in the generated
+    code is bracketed by start() and stop(), with the index returned by register() for the op.
+
+    Arguments:
+        max_trace_events: Maximum number of individual op invocations kept for
+            chrome_trace; aggregate statistics are always kept.
+
+    Attributes:
+        keys: The ProfileKey of each registered op invocation, by index.
+    """
+    def __init__(self, max_trace_events=1000000):
+        self.max_trace_events = max_trace_events
+        self.keys = []
+        self.reset()
+
+    def reset(self):
+        """
+        Discards the measurements, keeping the registered ops.
+        """
+        self.calls = [0] * len(self.keys)
+        self.totals = [0.0] * len(self.keys)
+        self.mins = [float('inf')] * len(self.keys)
+        self.maxs = [0.0] * len(self.keys)
+        self.events = []
+        self.epoch = default_timer()
+
+    def register(self, op, computation=None, op_type=None):
+        """
+        Registers the invocation of an op in generated code.
+
+        Arguments:
+            op: The op.
+            computation: Name of the generated computation the op belongs to.
+            op_type: The op type to report, if not the class name of op.
+
+        Returns:
+            The index to pass to stop().
+        """
+        self.keys.append(ProfileKey(computation=computation,
+                                    name=op.name,
+                                    op_type=op_type or type(op).__name__,
+                                    layer_type=op.metadata.get('layer_type'),
+                                    recurrent_step=op.metadata.get('recurrent_step')))
+        self.calls.append(0)
+        self.totals.append(0.0)
+        self.mins.append(float('inf'))
+        self.maxs.append(0.0)
+        return len(self.keys) - 1
+
+    def start(self):
+        """
+        Returns:
+            The current time, to pass to stop().
+        """
+        return default_timer()
+
+    def stop(self, index, start):
+        """
+        Records one invocation of a registered op.
+
+        Arguments:
+            index: The index returned by register().
+            start: The time returned by start().
+        """
+        elapsed = default_timer() - start
+        self.calls[index] += 1
+        self.totals[index] += elapsed
+        if elapsed < self.mins[index]:
+            self.mins[index] = elapsed
+        if elapsed > self.maxs[index]:
+            self.maxs[index] = elapsed
+        if len(self.events) < self.max_trace_events:
+            self.events.append((index, start, elapsed))
+
+    def summary(self, group_by=None):
+        """
+        Aggregates the measurements.
+
+        Arguments:
+            group_by: None to report each op invocation separately, or a ProfileKey field
+                name, such as 'op_type' or 'layer_type', to add up all invocations that have
+                the same value of that field.
+
+        Returns:
+            A list of ProfileStats with times in seconds, sorted by decreasing total time.
+            When grouping, the key of each entry is the value of the group_by field.
+        """
+        groups = OrderedDict()
+        for index, key in enumerate(self.keys):
+            if self.calls[index] == 0:
+                continue
+            if group_by is not None:
+                key = getattr(key, group_by)
+            if key in groups:
+                stats = groups[key]
+                groups[key] = ProfileStats(key=key,
+                                           calls=stats.calls + self.calls[index],
+                                           total=stats.total + self.totals[index],
+                                           min=min(stats.min, self.mins[index]),
+                                           max=max(stats.max, self.maxs[index]))
+            else:
+                groups[key] = ProfileStats(key=key,
+                                           calls=self.calls[index],
+                                           total=self.totals[index],
+                                           min=self.mins[index],
+                                           max=self.maxs[index])
+        return sorted(groups.values(), key=lambda stats: -stats.total)
+
+    def table(self, group_by=None, limit=None):
+        """
+        Formats the summary as a text table.
+
+        Arguments:
+            group_by: See summary().
+            limit: If not None, the maximum number of rows.
+
+        Returns:
+            The table as a string, with times in milliseconds.
+        """
+        summary = self.summary(group_by)
+        grand_total = sum(stats.total for stats in summary) or 1.0
+        rows = [('key', 'calls', 'total ms', '%', 'mean ms', 'min ms', 'max ms')]
+        for stats in summary[:limit]:
+            if group_by is None:
+                key = stats.key
+                label = '{} ({})'.format(key.name, key.op_type)
+                if key.layer_type is not None:
+                    label += ' [{}]'.format(key.layer_type)
+                if key.recurrent_step is not None:
+                    label += ' step {}'.format(key.recurrent_step)
+            else:
+                label = str(stats.key)
+            rows.append((label,
+                         str(stats.calls),
+                         '{:.3f}'.format(stats.total * 1e3),
+                         '{:.1f}'.format(100 * stats.total / grand_total),
+                         '{:.3f}'.format(stats.total * 1e3 / stats.calls),
+                         '{:.3f}'.format(stats.min * 1e3),
+                         '{:.3f}'.format(stats.max * 1e3)))
+        widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+        lines = []
+        for row in rows:
+            cells = [row[0].ljust(widths[0])]
+            cells.extend(cell.rjust(width) for cell, width in zip(row[1:], widths[1:]))
+            lines.append('  '.join(cells))
+        return '\n'.join(lines)
+
+    def chrome_trace(self):
+        """
+        The recorded op invocations in the Chrome trace event format, viewable in
+        chrome://tracing. Each computation is shown as a separate thread.
+
+        Returns:
+            A dict that can be serialized with json.
+        """
+        pid = os.getpid()
+        threads = OrderedDict()
+        for key in self.keys:
+            threads.setdefault(key.computation, len(threads))
+        events = []
+        for computation, tid in threads.items():
+            events.append(dict(name='thread_name', ph='M', pid=pid, tid=tid,
+                               args=dict(name=str(computation))))
+        for index, start, elapsed in self.events:
+            key = self.keys[index]
+            args = dict((field, value) for field, value in
+                        (('layer_type', key.layer_type),
+                         ('recurrent_step', key.recurrent_step))
+                        if value is not None)
+            events.append(dict(name=key.name, cat=key.op_type, ph='X', pid=pid,
+                               tid=threads[key.computation],
+                               ts=(start - self.epoch) * 1e6, dur=elapsed * 1e6,
+                               args=args))
+        return dict(traceEvents=events, displayTimeUnit='ms')
+
+    def save_chrome_trace(self, filename):
+        """
+        Writes chrome_trace() to a JSON file.
+
+        Arguments:
+            filename: Name of the file.
+        """
+        with open(filename, 'w') as f:
+            json.dump(self.chrome_trace(), f)
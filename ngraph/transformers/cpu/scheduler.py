@@ -0,0 +1,254 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+from __future__ import division
+import sys
+import threading
+
+import six
+from six.moves import queue
+
+from ngraph.op_graph.op_graph import TensorDescription
+from ngraph.transformers.passes.cpufusion import ElementwiseFusionPass
+
+
+def storage_accesses(op):
+    """
+    The storage an op reads and writes.
+
+    Besides the tensor of a TensorOp, an op writes its states_written, and an op that is not
+    a TensorOp, such as an AssignOp, writes its first argument.
+
+    Arguments:
+        op: An op of a computation, after the graph passes and allocation.
+
+    Returns:
+        A list of ((buffer, low, high), written), where low and high bound the bytes of
+        buffer that are accessed.
+    """
+    def storage(td):
+        if td.buffer is None:
+            return td.base, 0, float('inf')
+        low, high = ElementwiseFusionPass.byte_range(td)
+        return td.buffer, low, high
+
+    reads = [td for td in op.call_info() if isinstance(td, TensorDescription)]
+    writes = [state.tensor_description().base for state in op.states_written]
+    if op.is_tensor_op:
+        writes.append(op.tensor_description())
+    elif reads:
+        writes.append(reads[0])
+    return [(storage(td), False) for td in reads] + [(storage(td), True) for td in writes]
+
+
+def task_dependencies(ordered_ops, tasks, barrier_types):
+    """
+    Finds the order the tasks of a computation must keep, from the dependencies of their ops
+    and the storage the ops access.
+
+    A task must follow the tasks that compute the ops it depends on, through the arguments,
+    control dependencies and fprop ops of its ops, and the earlier tasks that write storage it
+    accesses or read storage it writes. Temporaries that the MemoryPlanningPass placed in the
+    same buffer are only ordered when their bytes overlap. A task with an op of one of
+    barrier_types follows all earlier tasks and precedes all later tasks.
+
+    Arguments:
+        ordered_ops: The ordered ops of the computation.
+        tasks: A list of lists of ops, in the order of ordered_ops. Ops without code, such
+            as views, are not in a task.
+        barrier_types: Op types that must not run concurrently with any other op.
+
+    Returns:
+        The number of tasks each task must follow, and the indices of the tasks that must
+        follow each task.
+    """
+    def op_deps(op):
+        deps = [dep.forwarded for dep in op.all_deps]
+        # Derivative ops such as BpropPoolOp read results that their fprop op keeps outside
+        # of its tensor
+        fprop = getattr(op, 'fprop', None)
+        if fprop is not None:
+            deps.append(fprop.forwarded)
+        return deps
+
+    task_of = dict()
+    for index, ops in enumerate(tasks):
+        for op in ops:
+            task_of[op] = index
+
+    # The tasks that compute an op, or the ops an op without a task depends on
+    producers = dict()
+    for op in ordered_ops:
+        if op in task_of:
+            producers[op] = (task_of[op],)
+        else:
+            producers[op] = set()
+            for dep in op_deps(op):
+                producers[op].update(producers.get(dep, ()))
+
+    predecessors = [set() for _ in tasks]
+    accesses = dict()
+    barrier = None
+    since_barrier = []
+    for index, ops in enumerate(tasks):
+        preds = predecessors[index]
+        for op in ops:
+            for dep in op_deps(op):
+                preds.update(producers.get(dep, ()))
+
+        task_accesses = []
+        for op in ops:
+            task_accesses.extend(storage_accesses(op))
+        for (buffer, low, high), written in task_accesses:
+            for other, other_low, other_high, other_written in accesses.get(buffer, ()):
+                if (written or other_written) and low < other_high and other_low < high:
+                    preds.add(other)
+        # Later accesses that overlap an access covered by a write of this task will follow
+        # this task, so the covered access can be forgotten
+        for (buffer, low, high), written in task_accesses:
+            if written and buffer in accesses:
+                accesses[buffer] = [access for access in accesses[buffer]
+                                    if not low <= access[1] <= access[2] <= high]
+        for (buffer, low, high), written in task_accesses:
+            accesses.setdefault(buffer, []).append((index, low, high, written))
+
+        if barrier is not None:
+            preds.add(barrier)
+        if any(isinstance(op, barrier_types) for op in ops):
+            preds.update(since_barrier)
+            barrier = index
+            since_barrier = []
+        else:
+            since_barrier.append(index)
+        preds.discard(index)
+
+    successors = [[] for _ in tasks]
+    for index, preds in enumerate(predecessors):
+        for pred in sorted(preds):
+            successors[pred].append(index)
+    return tuple(len(preds) for preds in predecessors), tuple(tuple(s) for s in successors)
+
+
+class OpScheduler(object):
+    """
+    Runs the tasks of a generated CPU executor on a pool of threads, starting each task when
+    the tasks it follows have finished. The numpy functions and MKL-DNN kernels that do the
+    work release the GIL, so independent ops can run at the same time.
+
+    The thread that calls run() also runs tasks, so workers - 1 threads are started, when
+    they are first needed.
+
+    Arguments:
+        workers: The number of tasks that may run at the same time.
+    """
+    def __init__(self, workers):
+        if workers < 1:
+            raise ValueError("The number of workers must be positive, not {}".format(workers))
+        self.workers = workers
+        self.tasks = None
+        self.threads = []
+
+    def start(self):
+        """
+        Starts the threads.
+        """
+        self.tasks = queue.Queue()
+        for _ in range(self.workers - 1):
+            thread = threading.Thread(target=self.work)
+            thread.daemon = True
+            thread.start()
+            self.threads.append(thread)
+
+    def close(self):
+        """
+        Stops the threads.
+        """
+        for _ in self.threads:
+            self.tasks.put(None)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        self.tasks = None
+
+    def work(self):
+        while True:
+            item = self.tasks.get()
+            if item is None:
+                return
+            task, executor, index, done = item
+            done.put((index, self.call(task, executor)))
+
+    @staticmethod
+    def call(task, executor):
+        try:
+            task(executor)
+        except BaseException:
+            return sys.exc_info()
+        return None
+
+    def run(self, executor, tasks, counts, successors):
+        """
+        Runs the tasks of an executor.
+
+        Arguments:
+            executor: The executor, which is passed to each task.
+            tasks: The tasks.
+            counts: The number of tasks each task must follow.
+            successors: The indices of the tasks that must follow each task.
+        """
+        if self.tasks is None and self.workers > 1:
+            self.start()
+        remaining = list(counts)
+        ready = [index for index, count in enumerate(counts) if count == 0]
+        # Each run has its own queue, so that tasks can run computations, as ScanOps do
+        done = queue.Queue()
+        pending = len(tasks)
+        running = 0
+        error = None
+        while pending:
+            if ready:
+                index = ready.pop()
+                if self.threads:
+                    for other in ready:
+                        self.tasks.put((tasks[other], executor, other, done))
+                    running += len(ready)
+                    del ready[:]
+                finished = [(index, self.call(tasks[index], executor))]
+            else:
+                finished = [done.get()]
+                running -= 1
+            while running:
+                try:
+                    finished.append(done.get_nowait())
+                except queue.Empty:
+                    break
+                running -= 1
+
+            for index, exc_info in finished:
+                if exc_info is not None:
+                    error = error or exc_info
+                    continue
+                pending -= 1
+                for successor in successors[index]:
+                    remaining[successor] -= 1
+                    if remaining[successor] == 0:
+                        ready.append(successor)
+            if error is not None:
+                break
+
+        while running:
+            done.get()
+            running -= 1
+        if error is not None:
+            six.reraise(*error)
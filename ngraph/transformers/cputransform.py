@@ -16,8 +16,13 @@
 from __future__ import division
 from __future__ import print_function
 
+from collections import OrderedDict
 from functools import wraps
+from orderedset import OrderedSet
 from operator import itemgetter
+import logging
+import marshal
+import pickle
 # These are indirectly used by the generated code
 import numpy as np
 import os
@@ -31,17 +36,28 @@ from ngraph.op_graph.op_graph import AbsoluteOp, Add, Argmax, Argmin, \
     LogOp, Max, Maximum, Min, Minimum, Multiply, NegativeOp, NotEqual, OneHotOp, \
     ReciprocalOp, Power, AssignOp, SignOp, SinOp, SqrtOp, SquareOp, RngOp, \
     Subtract, Sum, Prod, TanhOp, TensorSizeOp, Fill, TensorDescription, \
-    SetItemOp, ReductionOp
+    SetItemOp, ReductionOp, AssignableTensorOp
 from ngraph.op_graph.convolution import ConvolutionOp, update_conv, bprop_conv
 from ngraph.op_graph.pooling import PoolingOp, BpropPoolOp
 from ngraph.transformers.cpu.relu import ReluOp, BpropReluOp
-from ngraph.op_graph.lookuptable import LookupTableOp, update_lut
+from ngraph.op_graph.lookuptable import LookupTableOp, update_lut, update_lut_rows, \
+    LookupTableAssignOp
 from ngraph.op_graph.ctc import CTCOp
+from ngraph.op_graph.lstm import LSTMCellOp, bprop_lstm_cell, bprop_lstm_cell_state
+from ngraph.op_graph.scan import ScanOp, ScanOutputOp
 from ngraph.op_graph.debug import PrintOp
 from ngraph.transformers.passes.passes import RequiredTensorShaping, \
     CPUTensorShaping, SimplePrune
 from ngraph.transformers.passes.cpulayout import CPUTensorLayout
-from ngraph.transformers.passes.cpufusion import FusionPass
+from ngraph.transformers.passes.cpufusion import FusionPass, ElementwiseFusionPass
+from ngraph.transformers.passes.liveness import MemoryPlanningPass
+from ngraph.transformers.passes.constfold import ConstantFoldingPass
+from ngraph.transformers.passes.cse import CSEPass
+from ngraph.transformers.cpu.profiler import OpProfiler
+from ngraph.transformers.cpu.scheduler import OpScheduler, task_dependencies
+from ngraph.transformers.cpu.cpuengine import BatchSplitter
+from ngraph.transformers.cpu.codecache import CompilationCache, Uncacheable, graph_digest, \
+    CACHE_DIR_ENV
 
 from ngraph.transformers.base import Transformer, DeviceBufferStorage, \
     DeviceBufferReference, DeviceTensor, make_transformer_factory, \
@@ -62,53 +78,33 @@ class CPUConvEngine(object):
         pad_d, pad_h, pad_w = itemgetter(*('pad_' + s for s in ('d', 'h', 'w')))(conv_params)
         str_d, str_h, str_w = itemgetter(*('str_' + s for s in ('d', 'h', 'w')))(conv_params)
         dil_d, dil_h, dil_w = itemgetter(*('dil_' + s for s in ('d', 'h', 'w')))(conv_params)
-        mSlice = [CPUConvEngine.fprop_slice(m, T, D, pad_d, str_d, dil_d) for m in range(M)]
-        pSlice = [CPUConvEngine.fprop_slice(p, R, H, pad_h, str_h, dil_h) for p in range(P)]
-        qSlice = [CPUConvEngine.fprop_slice(q, S, W, pad_w, str_w, dil_w) for q in range(Q)]
-        dSlice = [CPUConvEngine.bprop_slice(d, T, M, pad_d, str_d, dil_d) for d in range(D)]
-        hSlice = [CPUConvEngine.bprop_slice(h, R, P, pad_h, str_h, dil_h) for h in range(H)]
-        wSlice = [CPUConvEngine.bprop_slice(w, S, Q, pad_w, str_w, dil_w) for w in range(W)]
+        dPad, tSlice = CPUConvEngine.tap_slices(T, D, M, pad_d, str_d, dil_d)
+        hPad, rSlice = CPUConvEngine.tap_slices(R, H, P, pad_h, str_h, dil_h)
+        wPad, sSlice = CPUConvEngine.tap_slices(S, W, Q, pad_w, str_w, dil_w)
 
-        return (mSlice, pSlice, qSlice, dSlice, hSlice, wSlice)
+        return (tSlice, rSlice, sSlice, (dPad, hPad, wPad))
 
     @staticmethod
-    def fprop_slice(q, S, X, padding, stride, dilation):
-        f1 = None
-        qs = q * stride - padding
-        for s in range(S):
-            x = qs + s * dilation
-            if f1 is None and x >= 0 and x < X:
-                x1 = x
-                f1 = s
-            if x < X:
-                x2 = x
-                f2 = s
-        if f1 is None:
-            return (slice(0, 0, 1), slice(0, 0, 1), 0)
-        return (slice(f1, f2 + 1), slice(x1, x2 + 1, dilation), f2 - f1 + 1)
+    def tap_slices(S, X, Q, padding, stride, dilation):
+        """
+        Computes the padding of an input dimension and, for each filter tap, the slice of
+        the padded input that is read by all Q outputs.
 
-    @staticmethod
-    def bprop_slice(x, S, Q, padding, stride, dilation):
-        qs = x - (dilation * (S - 1) - padding)
-        f1 = None
-        for s in range(S):
-            q = qs + s * dilation
-            if q % stride == 0:
-                q //= stride
-                if q >= 0 and q < Q:
-                    if f1 is None:
-                        f1 = s
-                        x1 = q
-                    f2 = s
-                    x2 = q
-        if f1 is None:
-            return (slice(0, 0, 1), slice(0, 0, 1), 0)
-
-        f_step = 1
-        while ((f_step * dilation) % stride) != 0:
-            f_step += 1
-        x_step = (f_step * dilation) // stride
-        return (slice(f1, f2 + 1, f_step), slice(x1, x2 + 1, x_step), 0)
+        Arguments:
+            S: Filter length.
+            X: Input length.
+            Q: Output length.
+            padding: Padding before the input.
+            stride: Convolution stride.
+            dilation: Filter dilation.
+
+        Returns:
+            ((pad_before, pad_after), [slice for each tap]).
+        """
+        pad_after = max(0, (Q - 1) * stride + (S - 1) * dilation + 1 - padding - X)
+        slices = [slice(s * dilation, s * dilation + (Q - 1) * stride + 1, stride)
+                  for s in range(S)]
+        return ((padding, pad_after), slices)
 
 
 class CPUPoolEngine(object):
@@ -122,13 +118,49 @@ class CPUPoolEngine(object):
         p_c, p_d, p_h, p_w = itemgetter(*('pad_' + s for s in ('c', 'd', 'h', 'w')))(pool_params)
         s_c, s_d, s_h, s_w = itemgetter(*('str_' + s for s in ('c', 'd', 'h', 'w')))(pool_params)
 
-        kSlice = [CPUPoolEngine.pool_slice(k, J, C, p_c, s_c) for k in range(K)]
-        mSlice = [CPUPoolEngine.pool_slice(m, T, D, p_d, s_d) for m in range(M)]
-        pSlice = [CPUPoolEngine.pool_slice(p, R, H, p_h, s_h) for p in range(P)]
-        qSlice = [CPUPoolEngine.pool_slice(q, S, W, p_w, s_w) for q in range(Q)]
-        array_argmax = np.empty((K, M, P, Q, N), dtype=np.uint32) if op == "max" else None
+        pads = tuple(CPUPoolEngine.pool_padding(*args) for args in ((K, J, C, p_c, s_c),
+                                                                    (M, T, D, p_d, s_d),
+                                                                    (P, R, H, p_h, s_h),
+                                                                    (Q, S, W, p_w, s_w)))
+
+        # number of input elements in each window, excluding padding
+        kLen = [CPUPoolEngine.pool_slice(k, J, C, p_c, s_c)[1] for k in range(K)]
+        mLen = [CPUPoolEngine.pool_slice(m, T, D, p_d, s_d)[1] for m in range(M)]
+        pLen = [CPUPoolEngine.pool_slice(p, R, H, p_h, s_h)[1] for p in range(P)]
+        qLen = [CPUPoolEngine.pool_slice(q, S, W, p_w, s_w)[1] for q in range(Q)]
+        counts = np.einsum('k,m,p,q->kmpq', *(np.array(lengths, dtype=np.float32)
+                                              for lengths in (kLen, mLen, pLen, qLen)))
+
+        # max pooling keeps the position of the maximum within its window, l2 pooling the
+        # gradient of the norm with respect to every element of its window
+        if op == "max":
+            array_argmax = np.empty((K, M, P, Q, N), dtype=np.min_scalar_type(J * T * R * S))
+        elif op == "l2":
+            array_argmax = np.empty((K, M, P, Q, J * T * R * S, N),
+                                    dtype=O.tensor_description.dtype)
+        else:
+            array_argmax = None
 
-        return (kSlice, mSlice, pSlice, qSlice, op, array_argmax)
+        return ((J, T, R, S), (s_c, s_d, s_h, s_w), pads, counts[..., np.newaxis], op,
+                array_argmax)
+
+    @staticmethod
+    def pool_padding(Q, S, X, padding, strides):
+        """
+        The padding needed so that every one of the Q windows of length S lies in the padded
+        input.
+
+        Arguments:
+            Q: Number of windows.
+            S: Window length.
+            X: Input length.
+            padding: Padding before the input.
+            strides: Distance between consecutive windows.
+
+        Returns:
+            The padding before and after the input.
+        """
+        return (padding, max(0, (Q - 1) * strides + S - padding - X))
 
     @staticmethod
     def pool_slice(q, S, X, padding, strides):
@@ -143,6 +175,19 @@ class CPUPoolEngine(object):
         return (slice(firstI, lastI + 1), lastI - firstI + 1)
 
 
+def is_c_contiguous(shape, strides, itemsize):
+    """
+    Returns True if an array with shape and strides has its elements in C order without gaps,
+    as numpy's c_contiguous flag.
+    """
+    stride = itemsize
+    for length, array_stride in reversed(list(zip(shape, strides))):
+        if length != 1 and array_stride != stride:
+            return False
+        stride *= length
+    return True
+
+
 class CPUComputation(Computation):
     def __init__(self, transformer, computation, **kwargs):
         super(CPUComputation, self).__init__(transformer, computation, **kwargs)
@@ -152,11 +197,106 @@ class CPUComputation(Computation):
         self.conv_slices = dict()
 
 
+class CPUArena(object):
+    """
+    A single aligned allocation that provides the storage for all device buffers of a
+    transformer.
+
+    Arguments:
+        alignment: Alignment in bytes of the arena and of every buffer in it.
+
+    Attributes:
+        offsets: Byte offset of each device buffer in the arena.
+        bytes: Size of the arena.
+        storage: The arena as a uint8 array, once allocated.
+    """
+    def __init__(self, alignment=64):
+        self.alignment = alignment
+        self.offsets = OrderedDict()
+        self.bytes = 0
+        self.storage = None
+
+    def add(self, device_buffer):
+        """
+        Reserves aligned space for device_buffer at the end of the arena.
+
+        Arguments:
+            device_buffer: A CPUDeviceBufferStorage.
+        """
+        offset = -(-self.bytes // self.alignment) * self.alignment
+        self.offsets[device_buffer] = offset
+        self.bytes = offset + device_buffer.bytes
+
+    def allocate(self):
+        """
+        Allocates the arena, aligned to self.alignment.
+
+        Returns:
+            The arena storage.
+        """
+        raw = np.empty(self.bytes + self.alignment, dtype=np.uint8)
+        start = -raw.ctypes.data % self.alignment
+        self.storage = raw[start:start + self.bytes]
+        return self.storage
+
+    def buffer(self, device_buffer):
+        """
+        Returns the arena storage of device_buffer as an array of the buffer's dtype.
+
+        Arguments:
+            device_buffer: A CPUDeviceBufferStorage that was added to the arena.
+        """
+        offset = self.offsets[device_buffer]
+        return self.storage[offset:offset + device_buffer.bytes].view(device_buffer.dtype)
+
+    def layout(self):
+        """
+        Describes where the device buffers and their views are in the arena, so that the
+        arena can be allocated again with allocate_layout without the device buffers.
+
+        Returns:
+            A list with a (name, offset, bytes, dtype, views) tuple for each device buffer,
+            where views is a list of (name, shape, dtype, offset, strides) tuples.
+        """
+        layout = []
+        for device_buffer, offset in self.offsets.items():
+            views = []
+            for view in device_buffer.views:
+                td = view.tensor_description
+                views.append((view.ref_str, td.shape, td.dtype.str,
+                              td.buffer_offset + td.offset, td.strides))
+            layout.append((device_buffer.ref_str, offset, device_buffer.bytes,
+                           device_buffer.dtype.str, views))
+        return layout
+
+    def allocate_layout(self, layout, environment):
+        """
+        Allocates the arena and adds the device buffers and views of a layout to an
+        environment.
+
+        Arguments:
+            layout: A layout from layout().
+            environment: The globals of the generated code.
+        """
+        self.bytes = max([offset + size for _, offset, size, _, _ in layout] + [0])
+        self.allocate()
+        for name, offset, size, dtype, views in layout:
+            buffer = self.storage[offset:offset + size].view(np.dtype(dtype))
+            environment[name] = buffer
+            for view_name, shape, view_dtype, view_offset, strides in views:
+                environment[view_name] = np.ndarray(shape=shape, dtype=np.dtype(view_dtype),
+                                                    buffer=buffer, offset=view_offset,
+                                                    strides=strides)
+
+
 class CPUDeviceBufferStorage(DeviceBufferStorage):
 
     def __init__(self, transformer, bytes, dtype, **kwargs):
         super(CPUDeviceBufferStorage, self).__init__(transformer, bytes, dtype, **kwargs)
         self.storage = None
+        # The storage of the buffer while it is bound to the memory of bound_array
+        self.own_storage = None
+        self.bound_array = None
 
     def create_device_tensor(self, tensor_description):
         shape_str = "_".join((str(_) for _ in tensor_description.shape))
@@ -187,6 +327,11 @@ class CPUDeviceBufferStorage(DeviceBufferStorage):
         return self.name
 
     def transform_allocate(self):
+        if self.transformer.arena is not None:
+            # Storage and views are created when the arena is allocated
+            self.transformer.arena.add(self)
+            return
+
         self.transformer.init_code.append("{} = None", self.ref_str)
         self.transformer.allocate_storage_code.append("def {}():", self.alloc_name)
         with indenting(self.transformer.allocate_storage_code):
@@ -206,6 +351,47 @@ class CPUDeviceBufferStorage(DeviceBufferStorage):
 
         self.transformer.allocate_code.append("{}()", self.alloc_name)
 
+    def allocate_arena_views(self):
+        """
+        Makes this buffer and its views available to the generated code as views of the
+        transformer's arena.
+        """
+        self.set_storage(self.transformer.arena.buffer(self))
+
+    def set_storage(self, storage):
+        """
+        Makes storage the storage of this buffer and its views in the generated code.
+
+        Arguments:
+            storage: A flat array of the buffer's dtype and size.
+        """
+        self.transformer.globals[self.ref_str] = storage
+        for view in self.views:
+            view.allocate_view(storage)
+
+    def bind(self, array):
+        """
+        Uses the memory of array instead of the buffer's own storage, until unbind.
+
+        Arguments:
+            array: A C-contiguous array of the buffer's size.
+        """
+        if array is self.bound_array:
+            return
+        if self.own_storage is None:
+            self.own_storage = self.transformer.globals[self.ref_str]
+        self.set_storage(array.reshape(-1).view(self.dtype))
+        self.bound_array = array
+
+    def unbind(self):
+        """
+        Gives the buffer its own storage again, if it was bound.
+        """
+        if self.own_storage is not None:
+            self.set_storage(self.own_storage)
+            self.own_storage = None
+            self.bound_array = None
+
 
 class CPUDeviceBufferReference(DeviceBufferReference):
 
@@ -214,16 +400,22 @@ class CPUDeviceBufferReference(DeviceBufferReference):
 
 
 class CPUDeviceTensor(DeviceTensor):
-
-    def __init__(self, transformer, device_buffer, tensor_description, **kwargs):
+    """
+    Arguments:
+        ref_str: The name of the variable of generated code that holds the tensor, if
+            not the name of the device tensor, as for tensors of cached code.
+    """
+    def __init__(self, transformer, device_buffer, tensor_description, ref_str=None,
+                 **kwargs):
         super(CPUDeviceTensor, self).__init__(transformer, device_buffer, tensor_description,
                                               **kwargs)
         self.__tensor = None
+        self.__ref_str = ref_str
 
     @property
     def tensor(self):
         if self.__tensor is None:
-            self.__tensor = self.transformer.globals.get(self.name)
+            self.__tensor = self.transformer.globals.get(self.ref_str)
         return self.__tensor
 
     @property
@@ -231,6 +423,8 @@ class CPUDeviceTensor(DeviceTensor):
         """
         :return: name to reference variable.
         """
+        if self.__ref_str is not None:
+            return self.__ref_str
         return self.name
 
     def transform_allocate(self):
@@ -247,13 +441,30 @@ class CPUDeviceTensor(DeviceTensor):
             ref=self.ref_str,
             shape=tensor_description.shape,
             dtype=tensor_description.dtype,
-            offset=tensor_description.offset,
+            offset=tensor_description.buffer_offset + tensor_description.offset,
+            strides=tensor_description.strides)
+
+    def allocate_view(self, buffer):
+        """
+        Makes the device tensor available to the generated code as a view of buffer.
+
+        Arguments:
+            buffer: The storage of the device buffer.
+        """
+        self.__tensor = None
+        tensor_description = self.tensor_description
+        self.transformer.globals[self.ref_str] = np.ndarray(
+            shape=tensor_description.shape,
+            dtype=tensor_description.dtype,
+            buffer=buffer,
+            offset=tensor_description.buffer_offset + tensor_description.offset,
             strides=tensor_description.strides)
 
     def get(self, tensor):
         if tensor is None:
             return self.tensor
-        tensor[:] = self.tensor
+        tensor[...] = self.tensor
+        return tensor
 
     def __getitem__(self, key):
         return self.tensor.__getitem__(key)
@@ -264,6 +475,29 @@ class CPUDeviceTensor(DeviceTensor):
             value = value._tensor
         self.tensor.__setitem__(key, value)
 
+    def bind(self, value):
+        device_buffer = self.device_buffer
+        td = self.tensor_description
+        if not isinstance(device_buffer, CPUDeviceBufferStorage):
+            # Tensors of cached code have no device buffer
+            return False
+        mkldnn = self.transformer.globals.get('mkldnn')
+        if mkldnn is not None and mkldnn.mkldnn_enabled:
+            # The MKL-DNN kernels keep the addresses of their tensors
+            return False
+        if not (isinstance(value, np.ndarray) and value.dtype == td.dtype and
+                value.shape == tuple(td.shape) and value.nbytes == device_buffer.bytes and
+                td.buffer_offset + td.offset == 0 and
+                value.flags.c_contiguous and value.flags.aligned and value.flags.writeable and
+                is_c_contiguous(td.shape, td.strides, td.dtype.itemsize)):
+            return False
+        device_buffer.bind(value)
+        return True
+
+    def unbind(self):
+        if isinstance(self.device_buffer, CPUDeviceBufferStorage):
+            self.device_buffer.unbind()
+
 
 def get_tensors(f):
     def tensor(x):
@@ -308,6 +542,102 @@ class CPUCodeGenerator(PyGen):
         np_axis = tuple([input_axes.index(axis) for axis in reduction_axes])
         return np_axis[0] if len(np_axis) == 1 else np_axis
 
+    def generate_split_op(self, op, out, *args):
+        """
+        Generates the code of a large elementwise op or reduction that the BatchSplitter of
+        the transformer computes in parts.
+
+        Arguments:
+            op: The op.
+            out: The output of the op.
+            args: The arguments of the op.
+
+        Returns:
+            True if the code was generated, False if the op is not split.
+        """
+        splitter = self.transformer.splitter
+        # Add goes through Mkldnn.elementwise_add, which splits itself
+        if splitter.workers == 1 or type(op) is Add:
+            return False
+        fusion = ElementwiseFusionPass
+        if fusion.ufuncs.get(type(op)) is not None:
+            if int(np.prod(op.tensor_description().shape)) < splitter.min_size:
+                return False
+            self.append("op_splitter.elementwise(np.{}" + ", {}" * (len(args) + 1) + ")",
+                        fusion.ufuncs[type(op)], out, *args)
+            return True
+        if type(op) in fusion.reductions:
+            if int(np.prod(op.call_info()[0].shape)) < splitter.min_size:
+                return False
+            self.append("op_splitter.reduce(np.{}, {}, {}, {})", fusion.reductions[type(op)],
+                        args[0], self.np_reduction_axis(op), out)
+            return True
+        return False
+
+    def generate_fused_ops(self, fusion, ops):
+        """
+        Generates a loop over tiles of rows that computes a run of ops one tile at a time.
+        Large runs are split into parts of rows for the BatchSplitter of the transformer,
+        each with its own loop.
+
+        Arguments:
+            fusion: The ElementwiseFusionPass that formed the run.
+            ops: The run of ops, from fusion.fused_groups.
+        """
+        shape = ops[0].tensor_description().shape
+        tile_rows = fusion.tile_rows(ops)
+        splitter = self.transformer.splitter
+        split = splitter.workers > 1 and int(np.prod(shape)) >= splitter.min_size
+        if split:
+            self.append("def _fused_part(_part):")
+            with indenting(self):
+                self.generate_fused_loop(fusion, ops, tile_rows, split)
+            self.append("op_splitter.split(_fused_part, {}, {})",
+                        shape[0], int(np.prod(shape)))
+        else:
+            self.generate_fused_loop(fusion, ops, tile_rows, split)
+
+    def generate_fused_loop(self, fusion, ops, tile_rows, split):
+        """
+        Generates the loop of generate_fused_ops, over all rows, or over the rows of the
+        slice _part when split.
+        """
+        shape = ops[0].tensor_description().shape
+        start, stop = ("_part.start", "_part.stop") if split else (0, shape[0])
+        scratch = OrderedDict()
+        for td in fusion.scratch_tensor_descriptions(ops):
+            scratch[(td.base, fusion.view_key(td))] = "_tile_{}".format(len(scratch))
+            self.append("_fused_{} = np.empty({}, dtype=np.{})",
+                        len(scratch) - 1, (tile_rows,) + shape[1:], td.dtype)
+
+        def tile(td):
+            key = (td.base, fusion.view_key(td))
+            if key in scratch:
+                return scratch[key]
+            if td.shape == ():
+                return td.value.ref_str
+            return "{}[_rows]".format(td.value.ref_str)
+
+        self.append("for _row in range({}, {}, {}):", start, stop, tile_rows)
+        with indenting(self):
+            if split:
+                self.append("_rows = slice(_row, min(_row + {}, {}))", tile_rows, stop)
+            else:
+                self.append("_rows = slice(_row, _row + {})", tile_rows)
+            for index in range(len(scratch)):
+                self.append("_tile_{i} = _fused_{i}[:{rows} - _row]", i=index, rows=stop)
+            for op in ops:
+                out = tile(op.tensor_description())
+                args = [tile(td) for td in op.call_info()]
+                if type(op) in fusion.reductions:
+                    self.append("np.{}({}, axis={}, out={})", fusion.reductions[type(op)],
+                                args[0], self.np_reduction_axis(op), out)
+                elif fusion.ufuncs[type(op)] is None:
+                    self.append("{}[()] = {}", out, args[0])
+                else:
+                    self.append("np.{}({}, out={})", fusion.ufuncs[type(op)],
+                                ", ".join(args), out)
+
     @property
     def pool_params(self):
         return self.transformer.current_computation.pool_params
@@ -495,7 +825,7 @@ class CPUCodeGenerator(PyGen):
 
     @generate_op.on_type(LookupTableOp)
     def generate_op(self, op, outputs, lut, idx):
-        self.append("fprop_lut(lut={}, idx={}, axis={}, output={})",
+        self.append("fprop_lut(lut={}, idx={}, axis={}, output={}, splitter=op_splitter)",
                     lut, idx, op.lut_axis, outputs)
 
     @generate_op.on_type(update_lut)
@@ -504,11 +834,73 @@ class CPUCodeGenerator(PyGen):
             self.append("update_lut(error={}, idx={}, pad_idx={}, axis={}, dW={})",
                         delta, idx, op.pad_idx, op.lut_axis, outputs)
 
+    @generate_op.on_type(update_lut_rows)
+    def generate_op(self, op, outputs, delta, idx):
+        self.append("update_lut_rows(error={}, idx={}, pad_idx={}, axis={}, rows={})",
+                    delta, idx, op.pad_idx, op.lut_axis, outputs)
+
+    @generate_op.on_type(LookupTableAssignOp)
+    def generate_op(self, op, outputs, lut, idx, rows):
+        self.append("assign_lut(lut={}, idx={}, rows={}, axis={})", lut, idx, rows, op.lut_axis)
+
+    @generate_op.on_type(LSTMCellOp)
+    def generate_op(self, op, out, ifog, c_prev):
+        self.append("fprop_lstm_cell(ifog={}, c_prev={}, out={})", ifog, c_prev, out)
+
+    @generate_op.on_type(bprop_lstm_cell)
+    def generate_op(self, op, out, delta, cell, c_prev):
+        self.append("bprop_lstm_cell(delta={}, cell={}, c_prev={}, out={})",
+                    delta, cell, c_prev, out)
+
+    @generate_op.on_type(bprop_lstm_cell_state)
+    def generate_op(self, op, out, delta, cell):
+        self.append("bprop_lstm_cell_state(delta={}, cell={}, out={})", delta, cell, out)
+
     @generate_op.on_type(CTCOp)
     def generate_op(self, op, outputs, activations, lbls, utt_lens, lbl_lens, grads):
         self.append("ctc_cpu(acts={}, lbls={}, utt_lens={}, lbl_lens={}, grads={}, costs={})",
                     activations, lbls, utt_lens, lbl_lens, grads, outputs)
 
+    @generate_op.on_type(ScanOp)
+    def generate_op(self, op, out, *args):
+        sequences, initial_states, non_sequences, _ = op.split_args(args)
+        sequence_axes = [sequence.axes.index(op.axis)
+                         for sequence in op.split_args(op.args)[0]]
+
+        def value(x):
+            return self.name(x.forwarded.tensor_description().value)
+
+        def collected(output):
+            array = value(output)
+            if array is None:
+                return None
+            return '({}, {})'.format(array, output.axes.index(op.axis))
+
+        def listing(items):
+            return '[{}]'.format(', '.join(str(item) for item in items))
+
+        values = list(op.body.values)
+        step = self.transformer.step_computations[op.body]
+        self.append("""run_scan(computation_executors['{}'], length={}, reverse={},
+         sequences={}, initial_states={}, non_sequences={},
+         params={}, results={},
+         outputs={}, final_states={}, state_history={})""",
+                    step.computation_name, op.axis.length, op.reverse,
+                    listing('({}, {})'.format(self.name(sequence), axis)
+                            for sequence, axis in zip(sequences, sequence_axes)),
+                    listing(self.name(state) for state in initial_states),
+                    listing(self.name(tensor) for tensor in non_sequences),
+                    listing(value(param) for param in op.body.parameters),
+                    listing(value(values[index])
+                            for index in list(op.state_results) + list(op.output_results)),
+                    listing(collected(output) for output in op.outputs),
+                    listing(value(final_state) for final_state in op.final_states),
+                    listing(collected(history) for history in op.state_history))
+
+    @generate_op.on_type(ScanOutputOp)
+    def generate_op(self, op, out):
+        pass
+
     @generate_op.on_type(RngOp)
     def generate_op(self, op, out, x):
         if op.distribution == 'uniform':
@@ -614,7 +1006,7 @@ class CPUCodeGenerator(PyGen):
 
     @generate_op.on_type(OneHotOp)
     def generate_op(self, op, out, x):
-        self.append("{o}[:] = np.eye({o}.shape[0])[:, {x}.astype(np.int32)]", x=x, o=out)
+        self.append("one_hot(x={}, out={}, splitter=op_splitter)", x, out)
 
     @generate_op.on_type(Power)
     def generate_op(self, op, out, x, y):
@@ -687,7 +1079,7 @@ class CPUCodeGenerator(PyGen):
     def generate_op(self, op, out, *args):
         recv_id = len(self.recv_nodes)
         self.recv_nodes.append(op)
-        self.append("{}[...] = self.recv_from_queue_send({})", out, recv_id)
+        self.append("self.recv_from_queue_send({}, {})", recv_id, out)
 
     @generate_op.on_type(CPUQueueGatherSendOp)
     def generate_op(self, op, out, *args):
@@ -699,7 +1091,7 @@ class CPUCodeGenerator(PyGen):
     def generate_op(self, op, out, *args):
         gather_recv_id = len(self.gather_recv_nodes)
         self.gather_recv_nodes.append(op)
-        self.append("{}[...] = self.gather_recv_from_queue_gather_send({})", out, gather_recv_id)
+        self.append("self.gather_recv_from_queue_gather_send({}, {})", gather_recv_id, out)
 
     @generate_op.on_type(CPUQueueScatterSendOp)
     def generate_op(self, op, out, *args):
@@ -711,14 +1103,14 @@ class CPUCodeGenerator(PyGen):
     def generate_op(self, op, out, *args):
         scatter_recv_id = len(self.scatter_recv_nodes)
         self.scatter_recv_nodes.append(op)
-        self.append("{}[...] = self.scatter_recv_from_queue_scatter_send({})",
-                    out, scatter_recv_id)
+        self.append("self.scatter_recv_from_queue_scatter_send({}, {})",
+                    scatter_recv_id, out)
 
     @generate_op.on_type(CPUQueueAllReduceOp)
     def generate_op(self, op, out, *args):
         allreduce_id = len(self.allreduce_nodes)
         self.allreduce_nodes.append(op)
-        self.append("{}[...] = self.queue_allreduce({})", out, allreduce_id)
+        self.append("self.queue_allreduce({}, {})", allreduce_id, out)
 
 
 class CPUTransformer(Transformer):
@@ -728,13 +1120,48 @@ class CPUTransformer(Transformer):
     Given a list of ops you want to compute the results of, this transformer
     will compile the graph required to compute those results and exposes an
     evaluate method to execute the compiled graph.
+
+    Arguments:
+        memory_planning (bool): Share storage between temporaries whose live ranges do
+            not overlap.
+        arena_allocation (bool): Allocate the storage of all device buffers as views of a
+            single 64-byte aligned arena instead of one allocation per buffer.
+        elementwise_fusion (bool): Compute runs of elementwise ops together, one tile at a
+            time, see ElementwiseFusionPass.
+        cse (bool): Replace ops that compute the same value as another op, see CSEPass.
+        constant_folding (bool): Compute ops whose inputs are all constant when the graph is
+            compiled, see ConstantFoldingPass.
+        profile (bool): Time every op invocation in the generated code. The measurements
+            are collected in self.profiler, an OpProfiler.
+        compilation_cache: A CompilationCache, or the name of its directory, in which the
+            generated code is kept so that an identical graph compiled with the same options
+            skips the graph passes and code generation. By default the directory named by the
+            NGRAPH_CPU_CACHE_DIR environment variable is used if it is set. False disables
+            the cache. Graphs with communication ops are never cached, nor are computations
+            when profiling.
+        parallel_workers (int): Run ops that do not depend on each other concurrently, on
+            this many threads, see OpScheduler. By default the ops of a computation run one
+            after another on the calling thread.
+        intra_op_workers (int): Split large elementwise ops, reductions, runs of fused ops
+            and the numpy pooling, convolution, one-hot and lookup table kernels into this
+            many parts along an axis, such as the batch axis, that run on a pool of threads,
+            see BatchSplitter.
+        intra_op_min_size (int): Ops that compute fewer elements are not split.
     """
 
     transformer_name = "cpu"
     default_rtol = 1e-05
     default_atol = 1e-08
 
-    def __init__(self, **kwargs):
+    # Ops the OpScheduler runs when no other op is running
+    barrier_op_types = (ScanOp, ScanOutputOp, RngOp, PrintOp, CTCOp, CPUQueueSendOp,
+                        CPUQueueRecvOp, CPUQueueGatherSendOp, CPUQueueGatherRecvOp,
+                        CPUQueueScatterSendOp, CPUQueueScatterRecvOp, CPUQueueAllReduceOp)
+
+    def __init__(self, memory_planning=False, arena_allocation=False, profile=False,
+                 elementwise_fusion=False, cse=False, constant_folding=False,
+                 compilation_cache=None, parallel_workers=None, intra_op_workers=None,
+                 intra_op_min_size=65536, **kwargs):
         super(CPUTransformer, self).__init__(**kwargs)
         self.current_computation = None
         self.conv_engine = CPUConvEngine()
@@ -747,11 +1174,36 @@ class CPUTransformer(Transformer):
         self.n_computations = 0
         self.use_pinned_mem = False
         self.rng_seed = None
-        self.graph_passes = [FusionPass(),
-                             CPUTensorLayout(),
-                             SimplePrune(),
-                             RequiredTensorShaping(),
-                             CPUTensorShaping()]
+        self.graph_passes = []
+        if constant_folding:
+            self.graph_passes.append(ConstantFoldingPass())
+        self.graph_passes += [FusionPass(),
+                              CPUTensorLayout(),
+                              SimplePrune(),
+                              RequiredTensorShaping(),
+                              CPUTensorShaping()]
+        if cse:
+            self.graph_passes.append(CSEPass())
+        self.elementwise_fusion = None
+        if elementwise_fusion:
+            self.elementwise_fusion = ElementwiseFusionPass()
+            self.graph_passes.append(self.elementwise_fusion)
+        self.arena = CPUArena() if arena_allocation else None
+        self.memory_planner = None
+        if memory_planning:
+            self.memory_planner = MemoryPlanningPass()
+            self.graph_passes.append(self.memory_planner)
+        self.profiler = OpProfiler() if profile else None
+        self.scheduler = OpScheduler(parallel_workers) if parallel_workers else None
+        self.splitter = BatchSplitter(intra_op_workers or 1, intra_op_min_size)
+        if compilation_cache is None and os.environ.get(CACHE_DIR_ENV):
+            compilation_cache = CompilationCache()
+        elif compilation_cache is False:
+            compilation_cache = None
+        elif compilation_cache is not None and \
+                not isinstance(compilation_cache, CompilationCache):
+            compilation_cache = CompilationCache(compilation_cache)
+        self.compilation_cache = compilation_cache
 
     def device_buffer_storage(self, bytes, dtype, name):
         """
@@ -780,7 +1232,10 @@ import ctypes as ct
 import numpy.ctypeslib as npct
 import itertools as itt
 from ngraph.op_graph import axes
-from ngraph.transformers.cpu.cpuengine import fprop_lut, update_lut
+from ngraph.transformers.cpu.cpuengine import fprop_lut, update_lut, update_lut_rows, assign_lut
+from ngraph.transformers.cpu.cpuengine import run_scan, one_hot
+from ngraph.transformers.cpu.cpuengine import fprop_lstm_cell, bprop_lstm_cell, \\
+    bprop_lstm_cell_state
 from ngraph.transformers.cpu.cpuengine import Mkldnn
 from ngraph.transformers.cpu.cpuengine import ConvLocals
 from ngraph.transformers.cpu.hetr import HetrLocals
@@ -791,6 +1246,12 @@ from ngraph.transformers.cpu.ctc import ctc_cpu
         mkldnn_engine_path = os.path.join(mkldnn_path, 'mkldnn_engine.so')
         self.code.execute("mkldnn = Mkldnn('{}')".format(mkldnn_engine_path))
         self.code.execute("mkldnn.open()")
+        self.code.globals['op_splitter'] = self.splitter
+        self.code.execute("mkldnn.splitter = op_splitter")
+        if self.profiler is not None:
+            self.code.globals['op_profiler'] = self.profiler
+        if self.scheduler is not None:
+            self.code.globals['op_scheduler'] = self.scheduler
 
     def transform_allocate_ops(self, all_ops):
         def tensor_description_value(x):
@@ -820,25 +1281,112 @@ from ngraph.transformers.cpu.ctc import ctc_cpu
 
             self.compute_code.endl()
 
+            if self.elementwise_fusion is None:
+                groups = [[op] for op in ordered_ops]
+            else:
+                groups = self.elementwise_fusion.fused_groups(ordered_ops)
+
+            if self.scheduler is not None:
+                self.generate_tasks(name, ordered_ops, groups)
+                self.compute_code.endl()
+                self.name = name
+                return name
+
             self.compute_code.append("def __call__(self):")
             code_length = self.compute_code.code_length
 
-            def tensor_description_value(x):
-                if isinstance(x, TensorDescription):
-                    return x.value
-                return x
-
             with indenting(self.compute_code):
-                for op in ordered_ops:
-                    out = tensor_description_value(op.tensor_description())
-                    call_info = (tensor_description_value(_) for _ in op.call_info())
-                    self.compute_code.generate_op(op, out, *call_info)
+                for ops in groups:
+                    if self.profiler is None:
+                        self.generate_ops(self.compute_code, ops)
+                    else:
+                        self.generate_profiled_ops(self.compute_code, name, ops)
                 if code_length == self.compute_code.code_length:
                     self.compute_code.append("pass")
             self.compute_code.endl()
         self.name = name
         return name
 
+    def generate_ops(self, code, ops):
+        """
+        Generates the code for an op, or for a run of ops fused by the ElementwiseFusionPass.
+
+        Arguments:
+            code: The CPUCodeGenerator to generate into.
+            ops: A list of ops.
+        """
+        if len(ops) > 1:
+            code.generate_fused_ops(self.elementwise_fusion, ops)
+            return
+
+        def tensor_description_value(x):
+            if isinstance(x, TensorDescription):
+                return x.value
+            return x
+
+        op, = ops
+        out = tensor_description_value(op.tensor_description())
+        call_info = [tensor_description_value(_) for _ in op.call_info()]
+        if not code.generate_split_op(op, out, *call_info):
+            code.generate_op(op, out, *call_info)
+
+    def generate_tasks(self, computation_name, ordered_ops, groups):
+        """
+        Generates the code of a computation for the OpScheduler: a method for each op, or
+        run of fused ops, and a __call__ that runs the methods in the order of their
+        dependencies.
+
+        Arguments:
+            computation_name: Name of the generated computation.
+            ordered_ops: The ordered ops of the computation.
+            groups: The ops of the computation, split into lists of ops for generate_ops.
+        """
+        tasks = []
+        for ops in groups:
+            op_code = CPUCodeGenerator(self)
+            if self.profiler is None:
+                self.generate_ops(op_code, ops)
+            else:
+                self.generate_profiled_ops(op_code, computation_name, ops)
+            if not op_code.code:
+                continue
+            self.compute_code.append("def task_{}(self):", len(tasks))
+            with indenting(self.compute_code):
+                self.compute_code.append("{}", op_code.code)
+            self.compute_code.endl()
+            tasks.append(ops)
+
+        counts, successors = task_dependencies(ordered_ops, tasks, self.barrier_op_types)
+        self.compute_code.append("tasks = [{}]",
+                                 ", ".join("task_{}".format(index) for index in range(len(tasks))))
+        self.compute_code.endl()
+        self.compute_code.append("def __call__(self):")
+        with indenting(self.compute_code):
+            self.compute_code.append("op_scheduler.run(self, self.tasks, {}, {})",
+                                     counts, successors)
+
+    def generate_profiled_ops(self, code, computation_name, ops):
+        """
+        Generates the code for ops, bracketed by calls to the profiler.
+
+        Arguments:
+            code: The CPUCodeGenerator to generate into.
+            computation_name: Name of the generated computation.
+            ops: A list of ops, see generate_ops.
+        """
+        op_code = CPUCodeGenerator(self)
+        self.generate_ops(op_code, ops)
+        if not op_code.code:
+            return
+        if len(ops) > 1:
+            index = self.profiler.register(ops[-1], computation_name,
+                                           op_type='FusedElementwise')
+        else:
+            index = self.profiler.register(ops[0], computation_name)
+        code.append("_start = op_profiler.start()")
+        code.append("{}", op_code.code)
+        code.append("op_profiler.stop({}, _start)", index)
+
     def finish_transform(self):
         self.code.append(self.init_code.code)
         self.code.endl()
@@ -858,8 +1406,19 @@ from ngraph.transformers.cpu.ctc import ctc_cpu
         # print(self.code.code)
         self.globals = self.code.compile()
 
+        if self.arena is not None:
+            self.arena.allocate()
+            for device_buffer in self.device_buffers:
+                device_buffer.allocate_arena_views()
+
+        self.make_executors()
+
+    def make_executors(self):
+        """
+        Instantiates the generated class of each computation.
+        """
         for computation in self.computations:
-            cls = self.globals[computation.name]
+            cls = self.globals[computation.computation_name]
             executor = cls(conv_params=computation.conv_params,
                            pool_params=computation.pool_params,
                            conv_slices=computation.conv_slices,
@@ -872,6 +1431,151 @@ from ngraph.transformers.cpu.ctc import ctc_cpu
                            gather_recv_nodes=computation.gather_recv_nodes,
                            allreduce_nodes=computation.allreduce_nodes)
             computation.executor = executor
+        # ScanOps call the computations of their steps
+        self.globals['computation_executors'] = dict(
+            (computation.computation_name, computation.executor)
+            for computation in self.computations)
+
+    def _transform_computations(self):
+        if self.compilation_cache is None or self.profiler is not None:
+            super(CPUTransformer, self)._transform_computations()
+            return
+
+        try:
+            key, graph_ops = graph_digest([comp.computation for comp in self.computations],
+                                          self.cache_options())
+        except Uncacheable as e:
+            logging.info("Not caching the CPU computations: {}".format(e))
+            super(CPUTransformer, self)._transform_computations()
+            return
+
+        entry = self.compilation_cache.get(key)
+        if entry is not None:
+            self.load_cache_entry(entry, graph_ops)
+            return
+
+        super(CPUTransformer, self)._transform_computations()
+        entry = self.cache_entry(graph_ops)
+        if entry is not None:
+            self.compilation_cache.put(key, entry)
+
+    def cache_options(self):
+        """
+        Returns:
+            The options that affect the generated code, for the compilation cache key.
+        """
+        return dict(passes=[(type(graph_pass).__module__, type(graph_pass).__name__)
+                            for graph_pass in self.graph_passes],
+                    arena_allocation=self.arena is not None,
+                    memory_planning=self.memory_planner is not None,
+                    parallel=self.scheduler is not None,
+                    intra_op_min_size=self.splitter.min_size if self.splitter.workers > 1
+                    else None,
+                    tile_size=getattr(self.elementwise_fusion, 'tile_size', None))
+
+    def cache_bindings(self, graph_ops):
+        """
+        The ops of the graph whose values the computations need: parameters, returned values
+        and tensors that are allocated when the graph passes have run.
+
+        Arguments:
+            graph_ops: The ops of the graph, from graph_digest.
+
+        Returns:
+            A list of (index in graph_ops, op).
+        """
+        needed = set()
+        for comp in self.computations:
+            needed.update(comp.computation.parameters)
+            needed.update(comp.computation.values)
+        return [(index, op) for index, op in enumerate(graph_ops)
+                if op.is_tensor_op and (op in needed or isinstance(op, AssignableTensorOp))]
+
+    def cache_entry(self, graph_ops):
+        """
+        Describes the compiled computations so that load_cache_entry can restore them.
+
+        Arguments:
+            graph_ops: The ops of the graph before the passes ran, from graph_digest.
+
+        Returns:
+            A picklable dict, or None if the computations cannot be cached.
+        """
+        computations = []
+        for comp in self.computations:
+            if any((comp.send_nodes, comp.recv_nodes, comp.scatter_send_nodes,
+                    comp.scatter_recv_nodes, comp.gather_send_nodes, comp.gather_recv_nodes,
+                    comp.allreduce_nodes)):
+                return None
+            computations.append((comp.computation_name, comp.conv_params, comp.pool_params,
+                                 comp.conv_slices, comp.pool_slices))
+
+        bindings = []
+        for index, op in self.cache_bindings(graph_ops):
+            value = op.forwarded.tensor_description().value
+            if isinstance(value, CPUDeviceTensor):
+                bindings.append((index, value.ref_str))
+
+        # The passes may have added constants, which are not bound to ops of the graph
+        graph_op_set = set(graph_ops)
+        initial_values = []
+        for op in OrderedSet(self.ops):
+            for state in op.states_read | op.states_written:
+                if state.initial_value is not None and state.tensor not in graph_op_set:
+                    value = state.tensor.tensor_description().value
+                    initial_values.append((value.ref_str, state.initial_value))
+
+        entry = dict(code=marshal.dumps(self.code.compiled),
+                     computations=computations,
+                     bindings=bindings,
+                     initial_values=initial_values,
+                     arena=self.arena.layout() if self.arena is not None else None)
+        try:
+            pickle.dumps(entry, protocol=pickle.HIGHEST_PROTOCOL)
+        except (pickle.PicklingError, TypeError, AttributeError) as e:
+            logging.info("Not caching the CPU computations: {}".format(e))
+            return None
+        return entry
+
+    def load_cache_entry(self, entry, graph_ops):
+        """
+        Restores computations compiled by another transformer for an identical graph,
+        instead of running the graph passes and generating code.
+
+        Arguments:
+            entry: A dict from cache_entry.
+            graph_ops: The ops of the graph, from graph_digest.
+        """
+        self.start_transform_allocate()
+        self.code.execute(marshal.loads(entry['code']))
+        self.globals = self.code.globals
+
+        if entry['arena'] is not None:
+            self.arena.allocate_layout(entry['arena'], self.globals)
+        for name, initial_value in entry['initial_values']:
+            self.globals[name][()] = initial_value
+
+        bound = set()
+        for index, name in entry['bindings']:
+            tensor_description = graph_ops[index].tensor_description()
+            tensor_description.value = CPUDeviceTensor(self, None, tensor_description,
+                                                       ref_str=name)
+            bound.add(graph_ops[index])
+
+        # Only initialize the state the compiled computations use
+        self.ops = [op for op in graph_ops
+                    if all(state.tensor in bound
+                           for state in op.states_read | op.states_written)]
+
+        for comp, (name, conv_params, pool_params, conv_slices, pool_slices) in \
+                zip(self.computations, entry['computations']):
+            comp.computation_name = name
+            comp.conv_params = conv_params
+            comp.pool_params = pool_params
+            comp.conv_slices = conv_slices
+            comp.pool_slices = pool_slices
+        self.make_executors()
+        self.finalized = True
 
     def allocate_storage(self):
         pass
@@ -883,6 +1587,9 @@ from ngraph.transformers.cpu.ctc import ctc_cpu
                     self.code.execute('mkldnn.close()')
             except TypeError:
                 pass
+        if self.scheduler is not None:
+            self.scheduler.close()
+        self.splitter.close()
         self.code = None
 
     def consume(self, buf_index, hostlist, devlist):
@@ -44,6 +44,8 @@ from ngraph.op_graph.ctc import CTCOp
 from ngraph.util.generics import generic_method
 
 from ngraph.transformers.passes.passes import SimplePrune
+from ngraph.transformers.passes.constfold import ConstantFoldingPass
+from ngraph.transformers.passes.cse import CSEPass
 from ngraph.transformers.passes.gpusimplification import GPUSubstitution
 from ngraph.transformers.passes.layout import GenerateLayoutDomains, GenerateLayoutConstraints, \
     AssignLayouts, AddLayoutConversions, PruneContiguousPass
@@ -588,14 +590,16 @@ class GPUTensorAllocator():
         dtype = self.transformer.storage_dtype(tensor_description.dtype)
 
         if layout:
-            gpudata = int(buffer_alloc) + (layout.offset * dtype.itemsize)
+            gpudata = int(buffer_alloc) + tensor_description.buffer_offset + \
+                (layout.offset * dtype.itemsize)
             strides = tuple([s * dtype.itemsize for s in layout.strides])
             new_tensor = GPUArray(layout.shape,
                                   dtype,
                                   gpudata=gpudata,
                                   strides=strides)
         else:
-            gpudata = int(buffer_alloc) + tensor_description.offset
+            gpudata = int(buffer_alloc) + tensor_description.buffer_offset + \
+                tensor_description.offset
             new_tensor = GPUArray(tensor_description.shape,
                                   dtype,
                                   gpudata=gpudata,
@@ -1019,6 +1023,12 @@ class GPUTransformer(Transformer):
 
     Given a list of ops you want to compute the results of, this transformer
     will generate allocators and kernels to execute the graph on a GPU.
+
+    Arguments:
+        device_id: The GPU to use.
+        cse (bool): Replace ops that compute the same value as another op, see CSEPass.
+        constant_folding (bool): Compute ops whose inputs are all constant when the graph is
+            compiled, see ConstantFoldingPass.
     """
     __runtime = None
 
@@ -1032,15 +1042,20 @@ class GPUTransformer(Transformer):
             GPUTransformer.__runtime.close()
             GPUTransformer.__runtime = None
 
-    def __init__(self, device_id=None, **kwargs):
+    def __init__(self, device_id=None, cse=False, constant_folding=False, **kwargs):
         super(GPUTransformer, self).__init__(**kwargs)
         layout_domain_pass = GenerateLayoutDomains(self)
         layout_constraints_pass = GenerateLayoutConstraints(self)
         layout_assign_pass = AssignLayouts(layout_domain_pass, layout_constraints_pass)
         layout_convert_pass = AddLayoutConversions(layout_assign_pass)
-        self.graph_passes = [SimplePrune(), PruneContiguousPass(), GPUSubstitution(),
-                             layout_domain_pass, layout_constraints_pass, layout_assign_pass,
-                             layout_convert_pass]  # , VizPass(show_metadata="layout")]
+        self.graph_passes = []
+        if constant_folding:
+            self.graph_passes.append(ConstantFoldingPass())
+        self.graph_passes += [SimplePrune(), PruneContiguousPass(), GPUSubstitution()]
+        if cse:
+            self.graph_passes.append(CSEPass())
+        self.graph_passes += [layout_domain_pass, layout_constraints_pass, layout_assign_pass,
+                              layout_convert_pass]  # , VizPass(show_metadata="layout")]
 
         self.buffer_allocators = []
         self.kernel_groups = dict()
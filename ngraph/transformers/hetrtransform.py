@@ -15,10 +15,11 @@
 import signal
 import sys
 import os
-import time
+import threading
+import traceback
 from six import itervalues, iteritems
-from multiprocessing import Process, Manager, Event
-from queue import Empty
+from multiprocessing import Process, Pipe
+from six.moves.queue import Queue
 import collections
 from orderedset import OrderedSet
 from ngraph.op_graph.op_graph import Op, TensorValueOp
@@ -55,24 +56,37 @@ def build_transformer(name):
 
 
 class AsyncTransformer(Process):
+    """
+    A child process running a transformer, for the computations placed on one device.
+
+    The parent and the child talk over a duplex pipe. The parent sends (comp_id, inputs)
+    requests and the child answers each with ('result', comp_id, outputs), in the order the
+    requests were sent, or with ('error', comp_id, traceback) before it exits. A thread in the
+    child reads the requests as they arrive, so the parent can send the inputs of the next
+    runs while the child is computing. The parent polls the pipe, with a timeout after which
+    it checks that the child is still alive.
+
+    The child is forked when the first input is fed, and builds all the computations created
+    before then.
+    """
 
-    SLEEP_S = 0.2
+    # seconds the parent waits for a result before checking that the child is alive
+    poll_interval = 0.1
 
     def __init__(self, transformer_type):
         super(AsyncTransformer, self).__init__()
         self.transformer_type = transformer_type
         self.init_id = id(self)
 
-        self.manager = Manager()
-        self.computation_q = self.manager.Queue()
-        self.work_q = self.manager.Queue()
-        self.results_qs = dict()
+        self.conn, self.child_conn = Pipe()
+        # results received by the parent and not yet collected, by computation
+        self.results = dict()
         self.computations = dict()
         self.computation_builds = dict()
         self.comp_id_ctr = 0
 
         self.started = False
-        self.exit = Event()
+        self.failure = None
         self.daemon = True
         self.my_pid = os.getpid()
 
@@ -93,101 +107,135 @@ class AsyncTransformer(Process):
                 self.comp_id = self.async_transformer.new_comp_id()
 
             def feed_input(self, values):
-                if not self.async_transformer.started:
-                    self.async_transformer.start()
-                    self.async_transformer.started = True
-
-                # Does this need to be thread safe? only one caller thread right?
-                # no- the caller is actually the mapper
-                self.async_transformer.work_q.put((self.comp_id, values))
+                self.async_transformer.send(self.comp_id, values)
 
             def get_results(self):
-                while True:
-                    try:
-                        q = self.async_transformer.results_qs[self.comp_id]
-                        return_list = q.get(timeout=AsyncTransformer.SLEEP_S)
-                        # TODO set self.returns somewhere cleaner
-                        return_dict = {op: return_list[mypos]
-                                       for (op, mypos) in iteritems(self.returns)}
-                        return return_dict
-
-                    except Exception as e:
-                        if isinstance(e, Empty):
-                            if not self.async_transformer.is_alive():
-                                ecode = self.async_transformer.exitcode
-                                if sys.platform == 'darwin' and ecode == -signal.SIGSEGV:
-                                    import pytest
-                                    pytest.xfail("Hetr: OSX blas fork-safety issue (#961)")
-                                elif ecode == PYCUDA_LOGIC_ERROR_CODE:
-                                    import pytest
-                                    pytest.xfail("Hetr: CUDA driver init in child issue (#1059)")
-                                raise RuntimeError("Child process unexpectedly exited with code ",
-                                                   ecode)
-                        else:
-                            raise
+                return_list = self.async_transformer.receive(self.comp_id)
+                # TODO set self.returns somewhere cleaner
+                return {op: return_list[mypos] for (op, mypos) in iteritems(self.returns)}
 
+        if self.started:
+            raise RuntimeError("Hetr computations must be created before the first one is run")
         update_comm_deps(returns)
         c = AsyncComputation(self)
-        self.results_qs[c.comp_id] = self.manager.Queue()
+        self.results[c.comp_id] = collections.deque()
         self.computation_builds[c.comp_id] = (returns, placeholders)
-        self.computation_q.put(c.comp_id)
         return c
 
+    def send(self, comp_id, values):
+        """
+        Requests a run of a computation, starting the child if needed.
+
+        Arguments:
+            comp_id: The id of the computation.
+            values: The values of its placeholders.
+        """
+        if self.failure is not None:
+            raise RuntimeError(self.failure)
+        if not self.started:
+            self.start()
+            self.started = True
+        try:
+            self.conn.send((comp_id, values))
+        except (IOError, OSError, EOFError):
+            # the reason is reported by receive
+            pass
+
+    def receive(self, comp_id):
+        """
+        Waits for the outputs of the oldest run of a computation not yet received.
+
+        Arguments:
+            comp_id: The id of the computation.
+
+        Returns:
+            The list of outputs.
+        """
+        pending = self.results[comp_id]
+        while not pending:
+            if self.failure is not None:
+                raise RuntimeError(self.failure)
+            # A result sent just before the child exited is still read
+            if self.conn.poll(self.poll_interval) or \
+                    (not self.is_alive() and self.conn.poll()):
+                try:
+                    kind, result_id, payload = self.conn.recv()
+                except EOFError:
+                    self.child_exited()
+                    continue
+                if kind == 'error':
+                    self.join()
+                    self.failure = "Child process {} failed:\n{}".format(self.transformer_type,
+                                                                         payload)
+                else:
+                    self.results[result_id].append(payload)
+            elif not self.is_alive():
+                self.child_exited()
+        return pending.popleft()
+
+    def child_exited(self):
+        self.join()
+        ecode = self.exitcode
+        if sys.platform == 'darwin' and ecode == -signal.SIGSEGV:
+            import pytest
+            pytest.xfail("Hetr: OSX blas fork-safety issue (#961)")
+        elif ecode == PYCUDA_LOGIC_ERROR_CODE:
+            import pytest
+            pytest.xfail("Hetr: CUDA driver init in child issue (#1059)")
+        self.failure = "Child process unexpectedly exited with code {}".format(ecode)
+
     def close(self):
         if self.my_pid != os.getpid():
             # Forked into another process
             return
 
-        # only join child thread if it has been started
+        # only join child process if it has been started
         if self.started:
             self.started = False
-            self.exit.set()
+            try:
+                self.conn.send(None)
+            except (IOError, OSError, EOFError):
+                pass
             self.join()
+        self.conn.close()
+        self.child_conn.close()
 
-        # safe to call manager shutdown more than once
-        self.manager.shutdown()
+    def read_requests(self, requests):
+        while True:
+            try:
+                request = self.child_conn.recv()
+            except (EOFError, OSError):
+                request = None
+            requests.put(request)
+            if request is None:
+                return
 
     def run(self):
-        # build the transformer first to catch any errors
-        transformer = build_transformer(self.transformer_type)
+        self.conn.close()
+        requests = Queue()
+        reader = threading.Thread(target=self.read_requests, args=(requests,))
+        reader.daemon = True
+        reader.start()
 
-        # collect requests to make computations, but do them all at once
-        while self.work_q.empty():
-            if self.exit.is_set():
-                return
-            time.sleep(AsyncTransformer.SLEEP_S)
+        comp_id = None
+        try:
+            transformer = build_transformer(self.transformer_type)
 
-        # build all the computations
-        while not self.computation_q.empty():
-            if self.exit.is_set():
-                return
             # comp_wrapper objects useful for caller, but only map into
-            # real computation objects stored here:
-            comp_id = self.computation_q.get()
-            returns, placeholders = self.computation_builds[comp_id]
-            computation = transformer.computation(returns, *placeholders)
-
-            self.computations[comp_id] = computation
-
-        # begin doing work; trigger transformer init on first call
-        while not self.exit.is_set():
-            try:
-                # shared work q serializes work requests
-                comp_id, inputs = self.work_q.get(timeout=AsyncTransformer.SLEEP_S)
-
-                # actual computation objects stored in this process, indexed
-                computation = self.computations[comp_id]
-                outputs = computation(*inputs)
-
-                # individual results q makes it easy for caller to find results
-                self.results_qs[comp_id].put(outputs)
-
-            except Exception as e:
-                if isinstance(e, Empty):
-                    pass
-                else:
-                    # TODO handle and exit gracefully
-                    raise
+            # real computation objects stored here
+            for comp_id, (returns, placeholders) in iteritems(self.computation_builds):
+                self.computations[comp_id] = transformer.computation(returns, *placeholders)
+
+            # begin doing work; trigger transformer init on first call
+            while True:
+                request = requests.get()
+                if request is None:
+                    return
+                comp_id, inputs = request
+                outputs = self.computations[comp_id](*inputs)
+                self.child_conn.send(('result', comp_id, outputs))
+        except Exception:
+            self.child_conn.send(('error', comp_id, traceback.format_exc()))
 
 
 class HetrComputation(Computation):
@@ -260,28 +308,93 @@ class HetrComputation(Computation):
         """
         Executes child computations in parallel.
 
+        The keyword arguments of Computation.__call__ are accepted. The inputs are always
+        sent to the children, so bind_inputs has no effect, and the values are always
+        received from the children, so they are always copies and copy has no effect.
+
         :arg args: list of values to the placeholders specified in __init__ *args
+        :arg out: arrays to write the returned values into, structured like the returned
+            values, with None for any value to return as usual.
 
         :return: tuple of return values, one per return specified in __init__ returns list.
         """
+        out = kwargs.pop('out', None)
+        kwargs.pop('copy', None)
+        self.submit(*args, **kwargs)
+        return self.collect(out=out)
+
+    def submit(self, *args, **kwargs):
+        """
+        Sends the inputs of a run to the child computations, without waiting for its results.
+
+        Runs are executed in the order they are submitted, and their results must be
+        collected in that order with collect.
+
+        :arg args: list of values to the placeholders specified in __init__ *args
+        """
+        kwargs.pop('bind_inputs', None)
         args = self.unpack_args_or_feed_dict(args, kwargs)
+        if kwargs:
+            raise TypeError("Unexpected arguments {} to a Hetr computation"
+                            .format(sorted(kwargs)))
 
         for child in itervalues(self.child_computations):
             child.feed_input([args[i] for i in child.param_idx])
 
+    def collect(self, out=None):
+        """
+        Waits for the results of the oldest submitted run.
+
+        :arg out: arrays to write the returned values into, as for __call__.
+
+        :return: tuple of return values, one per return specified in __init__ returns list.
+        """
         return_vals = dict()
         for child in itervalues(self.child_computations):
             return_vals.update(child.get_results())
 
-        if isinstance(self.computation.returns, Op):
-            return return_vals[self.computation.returns]
-        elif isinstance(self.computation.returns, collections.Set):
-            return return_vals
-        elif isinstance(self.computation.returns, collections.Sequence):
-            return tuple(return_vals[op] for op in self.computation.returns)
+        def value(op, array):
+            if array is None:
+                return return_vals[op]
+            array[...] = return_vals[op]
+            return array
+
+        returns = self.computation.returns
+        if isinstance(returns, Op):
+            return value(returns, out)
+        elif isinstance(returns, collections.Set):
+            return dict((op, value(op, out.get(op) if out is not None else None))
+                        for op in returns)
+        elif isinstance(returns, collections.Sequence):
+            if out is None:
+                out = [None] * len(returns)
+            return tuple(value(op, array) for op, array in zip(returns, out))
         else:
             return None
 
+    def pipeline(self, inputs, depth=2):
+        """
+        Runs the computation on a sequence of inputs, keeping up to depth runs in flight, so
+        that the inputs of the next runs are sent while the children compute.
+
+        :arg inputs: iterable of argument tuples, or of feed dicts.
+        :arg depth: the largest number of runs submitted and not yet collected.
+
+        :return: generator of the results, in the order of inputs.
+        """
+        in_flight = 0
+        for args in inputs:
+            if in_flight == depth:
+                yield self.collect()
+                in_flight -= 1
+            if isinstance(args, dict):
+                self.submit(feed_dict=args)
+            else:
+                self.submit(*args)
+            in_flight += 1
+        for _ in range(in_flight):
+            yield self.collect()
+
 
 class HetrTransformer(Transformer):
     """
@@ -359,6 +472,9 @@ class HetrTransformer(Transformer):
     def initialize(self):
         pass
 
+    def persistent_tensors(self):
+        raise NotImplementedError("Checkpoints are not supported by the hetr transformer")
+
     def device_buffer_storage(self, bytes, dtype, name):
         assert False, "Should not be used, TODO cleanup"
 
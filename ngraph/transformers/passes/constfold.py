@@ -0,0 +1,298 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+from __future__ import division
+import logging
+
+import numpy as np
+
+from ngraph.op_graph.op_graph import AbsoluteOp, Add, Argmax, Argmin, AssignableTensorOp, \
+    AxesCastOp, BroadcastOp, ContiguousOp, CosOp, Divide, DotOp, ElementWiseOp, Equal, \
+    ExpandDims, ExpOp, Flatten, FloorDivide, Greater, GreaterEqual, Less, LessEqual, LogOp, \
+    Max, Maximum, Min, Minimum, Mod, Multiply, NegativeOp, NotEqual, OneHotOp, Op, Power, \
+    Prod, ReciprocalOp, ReductionOp, ReorderAxes, ReshapeOp, SigmoidAtomicOp, SignOp, SinOp, \
+    SqrtOp, SquareOp, Subtract, Sum, TanhOp, TensorSizeOp, TensorSliceOp, TensorValueOp, \
+    Transpose, Unflatten, broadcast, constant, metadata
+from ngraph.transformers.passes.passes import PeepholeGraphPass
+from ngraph.util.generics import generic_method
+
+
+def is_uniform(value):
+    """
+    Returns:
+        True if value is a broadcast of a single element, so it can be kept as a scalar.
+    """
+    return value.size > 0 and all(stride == 0 or length == 1
+                                  for stride, length in zip(value.strides, value.shape))
+
+
+def first_element(value):
+    return value[(0,) * value.ndim]
+
+
+class ConstantEvaluator(object):
+    """
+    A NumPy reference evaluator for the ops constant folding can compute.
+
+    Values are NumPy arrays whose dimensions are the axes of their op, in order. Views, such
+    as broadcasts and reorders, are evaluated as NumPy views, and elementwise ops and
+    reductions of broadcast scalars are computed on the scalar, so a broadcast constant is
+    never expanded.
+
+    Arguments:
+        max_elements: The largest number of elements an evaluated op may materialize.
+    """
+    ufuncs = {AbsoluteOp: np.abs, Add: np.add, CosOp: np.cos, Divide: np.divide,
+              FloorDivide: np.floor_divide, Mod: np.mod, Equal: np.equal, ExpOp: np.exp,
+              Greater: np.greater, GreaterEqual: np.greater_equal, Less: np.less,
+              LessEqual: np.less_equal, LogOp: np.log, Maximum: np.maximum,
+              Minimum: np.minimum, Multiply: np.multiply, NegativeOp: np.negative,
+              NotEqual: np.not_equal, Power: np.power, ReciprocalOp: np.reciprocal,
+              SigmoidAtomicOp: lambda x: 1 / (1 + np.exp(-x)), SignOp: np.sign, SinOp: np.sin,
+              SqrtOp: np.sqrt, SquareOp: np.square, Subtract: np.subtract, TanhOp: np.tanh}
+
+    reductions = {Argmax: np.argmax, Argmin: np.argmin, Max: np.max, Min: np.min,
+                  Prod: np.prod, Sum: np.sum}
+
+    def __init__(self, max_elements=1 << 20):
+        self.max_elements = max_elements
+
+    def fits(self, *values):
+        return all(value.size <= self.max_elements for value in values)
+
+    def reshape(self, value, shape):
+        """
+        Reshapes value without expanding a broadcast scalar.
+
+        Returns:
+            The reshaped value, or None if that would materialize too many elements.
+        """
+        shape = tuple(shape)
+        if value.shape == shape:
+            return value
+        if value.size == int(np.prod(shape)) and is_uniform(value):
+            return np.broadcast_to(first_element(value), shape)
+        if not self.fits(value):
+            return None
+        return np.reshape(value, shape)
+
+    @generic_method(dispatch_base_type=Op)
+    def evaluate(self, op, *args):
+        """
+        Computes the value of an op from the values of its arguments.
+
+        Arguments:
+            op: The op.
+            args: The values of op.args.
+
+        Returns:
+            The value, or None if op cannot be evaluated.
+        """
+        return None
+
+    @evaluate.on_type(AssignableTensorOp)
+    def evaluate(self, op):
+        if not op.is_constant or op.initial_value is None:
+            return None
+        return self.reshape(np.asarray(op.initial_value, dtype=op.dtype), op.axes.lengths)
+
+    @evaluate.on_type(TensorValueOp)
+    def evaluate(self, op):
+        return self.evaluate(op.tensor)
+
+    @evaluate.on_type(BroadcastOp)
+    def evaluate(self, op, x):
+        x_axes = op.args[0].axes
+        # Order the dimensions of x as in the result, then add the new dimensions
+        x = np.transpose(x, [x_axes.index(axis) for axis in op.axes if axis in x_axes])
+        shape = [axis.length if axis in x_axes else 1 for axis in op.axes]
+        return np.broadcast_to(x.reshape(shape), op.axes.lengths)
+
+    @evaluate.on_type(ExpandDims)
+    def evaluate(self, op, x):
+        return np.broadcast_to(x.reshape([axis.length if axis in op.args[0].axes else 1
+                                          for axis in op.axes]), op.axes.lengths)
+
+    @evaluate.on_type(ReorderAxes)
+    def evaluate(self, op, x):
+        return np.transpose(x, [op.args[0].axes.index(axis) for axis in op.axes])
+
+    @evaluate.on_type(Transpose)
+    def evaluate(self, op, x):
+        return np.transpose(x)
+
+    @evaluate.on_type(AxesCastOp)
+    def evaluate(self, op, x):
+        return self.reshape(x, op.axes.lengths)
+
+    @evaluate.on_type(Flatten)
+    def evaluate(self, op, x):
+        return self.reshape(x, op.axes.lengths)
+
+    @evaluate.on_type(Unflatten)
+    def evaluate(self, op, x):
+        return self.reshape(x, op.axes.lengths)
+
+    @evaluate.on_type(TensorSliceOp)
+    def evaluate(self, op, x):
+        return self.reshape(x[op.slices], op.axes.lengths)
+
+    @evaluate.on_type(ContiguousOp)
+    def evaluate(self, op, x):
+        return x
+
+    @evaluate.on_type(ElementWiseOp)
+    def evaluate(self, op, *args):
+        ufunc = self.ufuncs.get(type(op))
+        if ufunc is None:
+            return None
+        shape = op.axes.lengths
+        if all(is_uniform(arg) for arg in args):
+            value = np.asarray(ufunc(*(first_element(arg) for arg in args)), dtype=op.dtype)
+            return np.broadcast_to(value, shape)
+        if not self.fits(*args):
+            return None
+        return self.reshape(np.asarray(ufunc(*args), dtype=op.dtype), shape)
+
+    @evaluate.on_type(ReductionOp)
+    def evaluate(self, op, x):
+        reduction = self.reductions.get(type(op))
+        if reduction is None:
+            return None
+        x_axes = op.args[0].axes
+        positions = tuple(x_axes.index(axis) for axis in op.reduction_axes)
+        if reduction in (np.argmax, np.argmin):
+            if len(positions) != 1:
+                return None
+            positions, = positions
+        if is_uniform(x):
+            # Only the number of elements reduced matters
+            element = first_element(x)
+            count = op.reduction_axes.size
+            value = {np.sum: lambda: element * count,
+                     np.prod: lambda: element ** count,
+                     np.max: lambda: element,
+                     np.min: lambda: element,
+                     np.argmax: lambda: 0,
+                     np.argmin: lambda: 0}[reduction]()
+            return np.broadcast_to(np.asarray(value, dtype=op.dtype), op.axes.lengths)
+        if not self.fits(x):
+            return None
+        value = np.asarray(reduction(x, axis=positions), dtype=op.dtype)
+        return self.reshape(value, op.axes.lengths)
+
+    @evaluate.on_type(DotOp)
+    def evaluate(self, op, x, y):
+        x_op, y_op = op.args
+        if not self.fits(x, y) or op.axes.size > self.max_elements:
+            return None
+        value = np.tensordot(x, y, axes=([x_op.axes.index(axis) for axis in op.reduction_axes],
+                                         [y_op.axes.index(axis) for axis in op.reduction_axes]))
+        return self.reshape(np.asarray(value, dtype=op.dtype), op.axes.lengths)
+
+    @evaluate.on_type(TensorSizeOp)
+    def evaluate(self, op):
+        return np.asarray(op.reduction_axes.size, dtype=op.dtype)
+
+    @evaluate.on_type(OneHotOp)
+    def evaluate(self, op, x):
+        if op.axes.size > self.max_elements or not self.fits(x):
+            return None
+        classes = np.arange(op.axis.length).reshape((-1,) + (1,) * x.ndim)
+        return np.asarray(classes == x, dtype=op.dtype)
+
+
+class ConstantFoldingPass(PeepholeGraphPass):
+    """
+    Replaces the ops whose inputs are all constant with constants computed at compile time.
+
+    Values are computed by a ConstantEvaluator, in one sweep over the graph. Only the ops on
+    the boundary of a constant subgraph, whose value is needed by an op that is not
+    constant, or that are roots, are replaced; the rest of the subgraph is then no longer
+    used. Views of constants cost nothing to compute, so they are not replaced unless they
+    view a value that has been computed.
+
+    A value that is a broadcast scalar is replaced by a broadcast of a scalar constant, and
+    other values with more than max_elements elements are neither computed nor created.
+
+    Arguments:
+        max_elements: The largest constant the pass may create, in elements.
+
+    Attributes:
+        folded: Number of ops replaced by constants.
+    """
+    # Ops whose values are views of their arguments
+    views = (AssignableTensorOp, ReshapeOp, TensorValueOp)
+
+    def __init__(self, max_elements=1 << 20):
+        super(ConstantFoldingPass, self).__init__()
+        self.evaluator = ConstantEvaluator(max_elements)
+        self.folded = 0
+        self.values = dict()
+        self.computed = set()
+
+    def run_on_graph(self, graph, transformer):
+        self.values = dict()
+        self.computed = set()
+        self.replacement_list = []
+        ops = graph.ordered_ops
+        for op in ops:
+            self.visit(op)
+        self.visits += len(ops)
+        self.rounds += 1
+
+        # Computed views of small values may be too large to materialize
+        folded = set(op for op in self.computed
+                     if is_uniform(self.values[op]) or self.evaluator.fits(self.values[op]))
+        roots = set(graph.roots)
+        for op in ops:
+            if op in folded and (op in roots or
+                                 any(user not in folded for user in graph.users.get(op, ()))):
+                self.replace_op(op, self.make_constant(op, self.values[op]))
+
+        for old, rep in self.replacement_list:
+            graph.replace(old, rep)
+        self.rewrites += len(self.replacement_list)
+        self.folded += len(self.replacement_list)
+        logging.info("ConstantFoldingPass: folded {} ops".format(len(self.replacement_list)))
+
+    def visit(self, op):
+        if op.states_written or any(arg not in self.values for arg in op.args):
+            return
+        try:
+            with np.errstate(all='ignore'):
+                value = self.evaluator.evaluate(op, *(self.values[arg] for arg in op.args))
+        except (ArithmeticError, IndexError, TypeError, ValueError):
+            return
+        if value is None or value.shape != tuple(op.axes.lengths):
+            return
+        self.values[op] = value
+        if not isinstance(op, self.views) or any(arg in self.computed for arg in op.args):
+            self.computed.add(op)
+
+    def make_constant(self, op, value):
+        """
+        Arguments:
+            op: A folded op.
+            value: Its value.
+
+        Returns:
+            A constant, or a broadcast constant, with the axes, value and metadata of op.
+        """
+        with metadata(**op.metadata):
+            if value.ndim > 0 and is_uniform(value):
+                rep = broadcast(constant(first_element(value), dtype=op.dtype), op.axes)
+            else:
+                rep = constant(np.array(value, order='C'), axes=op.axes, dtype=op.dtype)
+        return rep
@@ -1,6 +1,16 @@
-from ngraph.transformers.passes.passes import PeepholeGraphPass
+from collections import Iterable
+import logging
+
+import numpy as np
+
+from ngraph.transformers.passes.passes import GraphPass, PeepholeGraphPass
+from ngraph.transformers.passes.liveness import exempt_tensor_descriptions, \
+    op_tensor_descriptions
 from ngraph.util.generics import generic_method
-from ngraph.op_graph.op_graph import Add, Maximum, Multiply, Minimum, Greater, Less
+from ngraph.op_graph.op_graph import Add, Maximum, Multiply, Minimum, Greater, Less, \
+    AbsoluteOp, CosOp, Divide, FloorDivide, Mod, Equal, ExpOp, GreaterEqual, LessEqual, \
+    LogOp, NegativeOp, NotEqual, Power, ReciprocalOp, SinOp, SqrtOp, SquareOp, Subtract, \
+    TanhOp, Max, Min, Sum, Prod, Op, ContiguousOp
 from ngraph.transformers.cpu.relu import ReluOp, BpropReluOp
 
 
@@ -129,3 +139,203 @@ class FusionPass(PeepholeGraphPass):
                   isinstance(mul_arg2, Multiply) and isinstance(mul_arg1, Less)):
                 if (isinstance(mul_arg4, Greater) or isinstance(mul_arg3, Greater)):
                     self.check_arg_ordering_bprop_relu(input2, input1, op)
+
+
+class ElementwiseFusionPass(GraphPass):
+    """
+    Fuses runs of consecutive elementwise ops, optionally ending in a reduction that keeps
+    the first axis, into one loop over tiles of rows of their common shape.
+
+    Each fused op is computed with the same NumPy ufunc as when it is not fused, but on one
+    tile at a time, so the tile read by an op is still in cache when the next op in the run
+    reads it. Intermediate results that are only used inside the run are written to a
+    tile-sized scratch array instead of their full-sized buffer.
+
+    ContiguousOp, which has no ufunc, is computed by assignment.
+
+    The pass itself only records which ops use each tensor; runs are formed when code is
+    generated, once storage has been assigned, by fused_groups.
+
+    Arguments:
+        tile_size: Number of elements in a tile.
+
+    Attributes:
+        users: Maps base TensorDescriptions to the ops that use their storage.
+        exempt: Base TensorDescriptions that must keep their storage, such as returned
+            values and state.
+    """
+    ufuncs = {AbsoluteOp: 'abs', Add: 'add', CosOp: 'cos', Divide: 'divide',
+              FloorDivide: 'floor_divide', Mod: 'mod', Equal: 'equal', ExpOp: 'exp',
+              Greater: 'greater', GreaterEqual: 'greater_equal', Less: 'less',
+              LessEqual: 'less_equal', LogOp: 'log', Maximum: 'maximum', Minimum: 'minimum',
+              Multiply: 'multiply', NegativeOp: 'negative', NotEqual: 'not_equal',
+              Power: 'power', ReciprocalOp: 'reciprocal', SinOp: 'sin', SqrtOp: 'sqrt',
+              SquareOp: 'square', Subtract: 'subtract', TanhOp: 'tanh',
+              ContiguousOp: None}
+
+    reductions = {Max: 'max', Min: 'min', Sum: 'sum', Prod: 'prod'}
+
+    def __init__(self, tile_size=32768):
+        super(ElementwiseFusionPass, self).__init__()
+        self.tile_size = tile_size
+        self.users = dict()
+        self.exempt = set()
+
+    def do_pass(self, ops, transformer):
+        assert isinstance(ops, Iterable), "Ops passed into do_pass must be an iterable"
+        roots = list(ops)
+        self.exempt |= exempt_tensor_descriptions(roots)
+        for root in roots:
+            for op in Op.ordered_ops([root.forwarded]):
+                for td in op_tensor_descriptions(op):
+                    self.users.setdefault(td.base, set()).add(op)
+
+    def reduction_axis(self, op):
+        """
+        The axes of the input of a reduction op that are reduced, as NumPy axes.
+        """
+        input_axes = op.args[0].axes
+        return tuple(input_axes.index(axis) for axis in op.reduction_axes)
+
+    def fusible(self, op, shape):
+        """
+        Checks whether op can be computed one tile of rows of shape at a time.
+
+        Arguments:
+            op: The op.
+            shape: The common shape of the run, or None to use the shape of op.
+
+        Returns:
+            The shape of the run if op can be added to it, otherwise None.
+        """
+        out = op.tensor_description()
+        args = op.call_info()
+        if type(op) in self.reductions:
+            if shape is None or len(args) != 1 or args[0].shape != shape:
+                return None
+            axis = self.reduction_axis(op)
+            if len(axis) == 0 or 0 in axis or len(out.shape) == 0 or out.shape[0] != shape[0]:
+                return None
+            return shape
+        if type(op) not in self.ufuncs:
+            return None
+        if shape is None:
+            shape = out.shape
+        if len(shape) == 0 or out.shape != shape:
+            return None
+        if any(arg.shape not in (shape, ()) for arg in args):
+            return None
+        return shape
+
+    @staticmethod
+    def view_key(td):
+        return (td.buffer, td.buffer_offset + td.offset, td.shape, td.strides)
+
+    @staticmethod
+    def byte_range(td):
+        start = td.buffer_offset + td.offset
+        low = start + sum(min(0, (length - 1) * stride)
+                          for length, stride in zip(td.shape, td.strides))
+        high = start + sum(max(0, (length - 1) * stride)
+                           for length, stride in zip(td.shape, td.strides))
+        return low, high + td.dtype.itemsize
+
+    def conflicts(self, group, op):
+        """
+        Checks whether op would read or write storage that is accessed through a different
+        view by an op already in group, in which case tiles of op would not line up with
+        tiles of the other op.
+        """
+        writes = [op.tensor_description()]
+        reads = list(op.call_info())
+        accesses = [(td, True) for td in writes] + [(td, False) for td in reads]
+        for other in group:
+            other_accesses = [(other.tensor_description(), True)]
+            other_accesses.extend((td, False) for td in other.call_info())
+            for td, written in accesses:
+                for other_td, other_written in other_accesses:
+                    if not (written or other_written):
+                        continue
+                    if td.buffer is None or other_td.buffer is None:
+                        return True
+                    if td.buffer is not other_td.buffer:
+                        continue
+                    low, high = self.byte_range(td)
+                    other_low, other_high = self.byte_range(other_td)
+                    if high <= other_low or other_high <= low:
+                        continue
+                    if self.view_key(td) != self.view_key(other_td) or td.shape == ():
+                        return True
+        return False
+
+    def fused_groups(self, ordered_ops):
+        """
+        Splits ordered ops into runs to be computed together.
+
+        Arguments:
+            ordered_ops: The ops of a computation in execution order, with storage assigned.
+
+        Returns:
+            A list of lists of ops. Lists with more than one op are runs to fuse.
+        """
+        groups = []
+        group = []
+        shape = None
+        for op in ordered_ops:
+            op_shape = self.fusible(op, shape if group else None)
+            if group and (op_shape is None or self.conflicts(group, op)):
+                groups.append(group)
+                group = []
+                op_shape = self.fusible(op, None)
+            if op_shape is None:
+                groups.append([op])
+                continue
+            group.append(op)
+            shape = op_shape
+            if type(op) in self.reductions:
+                groups.append(group)
+                group = []
+        if group:
+            groups.append(group)
+
+        result = []
+        for group in groups:
+            if len(group) > 1 and self.tile_rows(group) < group[0].tensor_description().shape[0]:
+                result.append(group)
+            else:
+                result.extend([op] for op in group)
+        fused = [group for group in result if len(group) > 1]
+        if fused:
+            logging.info("ElementwiseFusionPass: fused {} ops into {} loops"
+                         .format(sum(len(group) for group in fused), len(fused)))
+        return result
+
+    def tile_rows(self, group):
+        """
+        The number of rows in a tile of the common shape of group.
+        """
+        shape = group[0].tensor_description().shape
+        return max(1, self.tile_size // int(np.prod(shape[1:])))
+
+    def scratch_tensor_descriptions(self, group):
+        """
+        The outputs of ops in group that are only used inside group.
+
+        Arguments:
+            group: A run of ops returned by fused_groups.
+
+        Returns:
+            A list of TensorDescriptions.
+        """
+        members = set(group)
+        scratch = []
+        for op in group:
+            out = op.tensor_description()
+            base = out.base
+            users = self.users.get(base)
+            if base in self.exempt or users is None or not users <= members:
+                continue
+            if base.is_persistent or base.is_input or base.is_placeholder:
+                continue
+            scratch.append(out)
+        return scratch
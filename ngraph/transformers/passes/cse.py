@@ -0,0 +1,188 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+import logging
+
+import numpy as np
+
+from ngraph.op_graph.axes import Axes, Axis, FlattenedAxis
+from ngraph.op_graph.comm_nodes import CommunicationOp
+from ngraph.op_graph.debug import PrintOp
+from ngraph.op_graph.op_graph import Add, AssignableTensorOp, ControlBlockOp, Equal, \
+    Maximum, Minimum, Multiply, NotEqual, Op, RngOp, TensorValueOp
+from ngraph.transformers.passes.passes import PeepholeGraphPass
+
+
+def written_tensors(ops):
+    """
+    The AssignableTensorOps that ops may write.
+
+    Writes through a view of a tensor, such as an assignment to a slice, do not show up in
+    states_written, so the first argument of every op that is not a TensorOp is followed
+    through views to the tensor it writes.
+
+    Arguments:
+        ops: Some ops.
+
+    Returns:
+        A set of AssignableTensorOps.
+    """
+    written = set()
+    for op in ops:
+        written.update(op.states_written)
+        if op.is_tensor_op or isinstance(op, ControlBlockOp) or not op.args:
+            continue
+        target = op.args[0].forwarded
+        while target.is_tensor_op:
+            if isinstance(target, TensorValueOp):
+                written.update(target.states_read)
+                break
+            if not target.args:
+                break
+            target = target.args[0].forwarded
+    return written
+
+
+class CSEPass(PeepholeGraphPass):
+    """
+    Common subexpression elimination.
+
+    Each op is reduced to a key made of its type, its arguments, control dependencies, axes,
+    dtype, metadata and other attributes. When an op has the same key as an op visited
+    earlier, it is replaced by that op. Arguments are keyed by the op that replaces them, so a
+    chain of duplicated ops is removed in one round.
+
+    Ops with side effects, such as assignments, random numbers, communication and printing,
+    are never replaced. Reads of a tensor are only merged when no op writes the tensor, since
+    reads on either side of a write see different values; reads of constants are merged when
+    the constants have the same value.
+
+    Attributes:
+        eliminated: Number of ops replaced.
+    """
+    commutative = (Add, Multiply, Maximum, Minimum, Equal, NotEqual)
+
+    # Attributes that are either keyed separately or do not affect the value of an op
+    ignored_attributes = {'graph_label_type', '_uuid', '__doc__', '_debug_location',
+                          '_tdcache', '_adjoints', '_one', 'all_deps', '_args',
+                          '_control_deps', '_forward', 'metadata', '_deriv_handler', 'style',
+                          'scope'}
+
+    # Metadata that only describes where an op came from
+    ignored_metadata = {'layer_type', 'recurrent_step', 'direction'}
+
+    def __init__(self):
+        super(CSEPass, self).__init__()
+        self.eliminated = 0
+        self.ops = dict()
+        self.representatives = dict()
+        self.written = set()
+
+    def run_on_graph(self, graph, transformer):
+        self.ops = dict()
+        self.representatives = dict()
+        self.written = written_tensors(graph.ordered_ops)
+        eliminated = self.rewrites
+        super(CSEPass, self).run_on_graph(graph, transformer)
+        self.eliminated += self.rewrites - eliminated
+        logging.info("CSEPass: eliminated {} ops".format(self.rewrites - eliminated))
+
+    def visit(self, op):
+        key = self.key(op)
+        if key is None:
+            return
+        existing = self.ops.get(key)
+        if existing is not None and existing is not op and existing.forward is None:
+            self.representatives[op] = existing
+            self.replace_op(op, existing)
+        else:
+            self.ops[key] = op
+
+    def representative(self, op):
+        op = op.forwarded
+        return self.representatives.get(op, op)
+
+    def key(self, op):
+        """
+        Arguments:
+            op: An op.
+
+        Returns:
+            A hashable key that is the same for ops that compute the same value, or None if
+            op must not be replaced.
+        """
+        if not op.is_tensor_op or op.states_written:
+            return None
+        if isinstance(op, (AssignableTensorOp, RngOp, CommunicationOp, PrintOp)):
+            return None
+        if isinstance(op, TensorValueOp):
+            tensor = op.value_tensor
+            if tensor.is_constant and tensor.initial_value is not None:
+                # Constants with the same value are interchangeable
+                tensor = ('constant', self.value_key(tensor.initial_value))
+            elif any(state in self.written for state in op.states_read):
+                return None
+            control_deps = frozenset(self.representative(dep) for dep in op.control_deps)
+            return (TensorValueOp, self.value_key(tensor), control_deps,
+                    self.value_key(op.axes), self.value_key(op.dtype), self.metadata_key(op))
+        if isinstance(op, ControlBlockOp):
+            return None
+
+        args = tuple(self.representative(arg) for arg in op.args)
+        if isinstance(op, self.commutative):
+            args = tuple(sorted(args, key=id))
+        control_deps = frozenset(self.representative(dep) for dep in op.control_deps)
+        attributes = tuple(sorted((key, self.value_key(value))
+                                  for key, value in op.__dict__.items()
+                                  if key not in self.ignored_attributes))
+        return (type(op), args, control_deps, attributes, self.metadata_key(op))
+
+    def metadata_key(self, op):
+        return tuple(sorted((key, self.value_key(value))
+                            for key, value in op.metadata.items()
+                            if key not in self.ignored_metadata))
+
+    def value_key(self, value):
+        """
+        Arguments:
+            value: An attribute value.
+
+        Returns:
+            A hashable value that is equal for equal attribute values.
+        """
+        if isinstance(value, Op):
+            return self.representative(value)
+        if isinstance(value, FlattenedAxis):
+            return ('FlattenedAxis', self.value_key(value.axes))
+        if isinstance(value, Axis):
+            return ('Axis', value.name, value.length)
+        if isinstance(value, Axes):
+            return ('Axes', tuple(self.value_key(axis) for axis in value))
+        if isinstance(value, np.ndarray):
+            return ('ndarray', value.dtype.str, value.shape, value.tobytes())
+        if isinstance(value, np.dtype):
+            return ('dtype', value.str)
+        if isinstance(value, dict):
+            return ('dict', tuple(sorted((key, self.value_key(item))
+                                         for key, item in value.items())))
+        if isinstance(value, (list, tuple)):
+            return (type(value).__name__, tuple(self.value_key(item) for item in value))
+        if isinstance(value, slice):
+            return ('slice', value.start, value.stop, value.step)
+        try:
+            hash(value)
+        except TypeError:
+            # Only identical objects are known to be equal
+            return ('id', id(value))
+        return (type(value).__name__, value)
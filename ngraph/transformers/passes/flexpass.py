@@ -31,5 +31,5 @@ class FlexDECPass(PeepholeGraphPass):
 
 class ClearTensorDescriptions(GraphPass):
     def do_pass(self, ops, inits):
-        tdcache.tensor_description_cache.clear()
+        tdcache.invalidate()
         return ops, inits
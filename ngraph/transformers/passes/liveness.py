@@ -0,0 +1,221 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+import logging
+from collections import Iterable, OrderedDict
+
+from ngraph.op_graph.axes import TensorDescription
+from ngraph.op_graph.op_graph import Op, AssignableTensorOp, ComputationOp
+from ngraph.op_graph.scan import ScanOp
+from ngraph.transformers.passes.passes import GraphPass
+
+
+def aligned_size(size, alignment):
+    """
+    Rounds size up to a multiple of alignment.
+
+    Arguments:
+        size: Size in bytes.
+        alignment: Alignment in bytes.
+
+    Returns:
+        The aligned size; never less than alignment.
+    """
+    size = max(size, 1)
+    return ((size + alignment - 1) // alignment) * alignment
+
+
+def op_tensor_descriptions(op):
+    """
+    The tensor descriptions whose storage is touched when op executes.
+
+    Ops that hold on to a forward op (e.g. bprop_conv, BpropPoolOp) may use the
+    storage of the forward op, so its storage is treated as touched as well. A ScanOp
+    touches its outputs and everything its step touches.
+
+    Arguments:
+        op: The op.
+
+    Returns:
+        A list of TensorDescriptions.
+    """
+    touched = []
+    for related in (op, getattr(op, 'fprop', None)):
+        if not isinstance(related, Op):
+            continue
+        related = related.forwarded
+        if related.is_tensor_op:
+            touched.append(related.tensor_description())
+        touched.extend(td for td in related.call_info() if isinstance(td, TensorDescription))
+    op = op.forwarded
+    if isinstance(op, ScanOp):
+        for output in list(op.final_states) + list(op.outputs) + list(op.state_history):
+            touched.append(output.forwarded.tensor_description())
+        for step_op in Op.ordered_ops([op.body]):
+            touched.extend(op_tensor_descriptions(step_op))
+    return touched
+
+
+def live_ranges(roots):
+    """
+    Computes the live range of the storage of every tensor used by roots.
+
+    Each root is ordered with Op.ordered_ops and the orders are concatenated, so an
+    instruction index is unique across all roots. A tensor used in several roots is live
+    from its first use in the first root to its last use in the last root.
+
+    Arguments:
+        roots: Ops (usually ComputationOps) in execution order.
+
+    Returns:
+        An OrderedDict mapping base TensorDescriptions to (first, last) instruction indices,
+        inclusive.
+    """
+    ranges = OrderedDict()
+    position = 0
+    for root in roots:
+        for op in Op.ordered_ops([root.forwarded]):
+            for td in op_tensor_descriptions(op):
+                base = td.base
+                if base in ranges:
+                    ranges[base] = (ranges[base][0], position)
+                else:
+                    ranges[base] = (position, position)
+            position += 1
+    return ranges
+
+
+def exempt_tensor_descriptions(roots):
+    """
+    Base tensor descriptions whose storage must not be shared: values returned from a
+    computation, state, and tensors of AssignableTensorOps.
+
+    Arguments:
+        roots: Ops (usually ComputationOps).
+
+    Returns:
+        A set of base TensorDescriptions.
+    """
+    exempt = set()
+    for root in roots:
+        root = root.forwarded
+        values = root.values if isinstance(root, ComputationOp) else [root]
+        for value in values:
+            value = value.forwarded
+            if value.is_tensor_op:
+                exempt.add(value.tensor_description().base)
+        for op in Op.ordered_ops([root]):
+            for state in op.states_read | op.states_written:
+                exempt.add(state.tensor_description().base)
+            if op.is_tensor_op and isinstance(op.tensor, AssignableTensorOp):
+                exempt.add(op.tensor_description().base)
+    return exempt
+
+
+def plan_offsets(intervals, alignment=64):
+    """
+    Assigns byte offsets so that tensors whose live ranges overlap do not overlap in memory.
+
+    Tensors are placed largest first; each one goes into the smallest gap between already
+    placed tensors with overlapping live ranges that is large enough to hold it, or after
+    the last of them when there is no such gap.
+
+    Arguments:
+        intervals: A sequence of (key, size, first, last) tuples, where first and last are
+            inclusive instruction indices.
+        alignment: Alignment in bytes of every offset.
+
+    Returns:
+        A tuple of a dict mapping key to offset and the total number of bytes needed.
+    """
+    order = sorted(range(len(intervals)),
+                   key=lambda i: (-intervals[i][1], intervals[i][2], i))
+    placed = []
+    offsets = dict()
+    total = 0
+    for i in order:
+        key, size, first, last = intervals[i]
+        size = aligned_size(size, alignment)
+        conflicts = sorted((p_offset, p_size) for p_offset, p_size, p_first, p_last in placed
+                           if not (p_last < first or last < p_first))
+        best_offset = None
+        best_gap = None
+        end = 0
+        for p_offset, p_size in conflicts:
+            gap = p_offset - end
+            if gap >= size and (best_gap is None or gap < best_gap):
+                best_offset, best_gap = end, gap
+            end = max(end, p_offset + p_size)
+        if best_offset is None:
+            best_offset = end
+        placed.append((best_offset, size, first, last))
+        offsets[key] = best_offset
+        total = max(total, best_offset + size)
+    return offsets, total
+
+
+class MemoryPlanningPass(GraphPass):
+    """
+    Lets temporary tensors whose live ranges never overlap share storage.
+
+    The live range of every temporary tensor is computed over the ordered ops of the
+    computations, and the temporaries are packed into one arena buffer per dtype. Persistent
+    tensors, inputs, placeholders, state, and values returned from a computation keep their
+    own storage.
+
+    The pass assigns buffers to tensor descriptions, so it must run after all passes that
+    modify the graph.
+
+    Arguments:
+        alignment: Alignment in bytes of each tensor within an arena.
+
+    Attributes:
+        unshared_bytes: Bytes the planned temporaries would need without sharing.
+        planned_bytes: Bytes allocated for the arenas.
+        arenas: The arena buffers, keyed by dtype.
+    """
+    def __init__(self, alignment=64):
+        super(MemoryPlanningPass, self).__init__()
+        self.alignment = alignment
+        self.unshared_bytes = 0
+        self.planned_bytes = 0
+        self.arenas = OrderedDict()
+
+    def do_pass(self, ops, transformer):
+        assert isinstance(ops, Iterable), "Ops passed into do_pass must be an iterable"
+        roots = list(ops)
+        exempt = exempt_tensor_descriptions(roots)
+
+        intervals = OrderedDict()
+        for td, (first, last) in live_ranges(roots).items():
+            if td in exempt or td.buffer is not None or td.register is not None:
+                continue
+            if td.is_persistent or td.is_input or td.is_placeholder:
+                continue
+            intervals.setdefault(td.dtype, []).append((td, td.tensor_size, first, last))
+
+        for dtype, dtype_intervals in intervals.items():
+            offsets, total = plan_offsets(dtype_intervals, self.alignment)
+            arena = transformer.device_buffer_storage(
+                total, dtype, "memory_plan_{}".format(dtype.name))
+            transformer.device_buffers.add(arena)
+            self.arenas[dtype] = arena
+            for td, size, _, _ in dtype_intervals:
+                td.buffer = arena
+                td.buffer_offset = offsets[td]
+                self.unshared_bytes += size
+            self.planned_bytes += total
+
+        logging.info("MemoryPlanningPass: {} bytes of temporaries planned into {} bytes"
+                     .format(self.unshared_bytes, self.planned_bytes))
@@ -13,9 +13,12 @@
 # limitations under the License.
 # ----------------------------------------------------------------------------
 import abc
+import logging
+from collections import Iterable, defaultdict, namedtuple
+from timeit import default_timer
 
 from future.utils import with_metaclass
-from collections import Iterable
+from orderedset import OrderedSet
 
 from ngraph.op_graph.axes import make_axis
 from ngraph.op_graph.op_graph import BroadcastOp, broadcast, DotOp, make_axes, \
@@ -34,11 +37,183 @@ class GraphPass(with_metaclass(abc.ABCMeta, object)):
         pass
 
 
+class OpGraph(object):
+    """
+    The ops reachable from a set of roots, in a topological order, with the users of each op.
+
+    The order and the user edges are updated incrementally when an op is replaced through
+    replace(), so that passes can share them instead of sorting the whole graph after every
+    change. When a replacement cannot be placed in the existing order, the order is
+    recomputed from the roots.
+
+    Arguments:
+        roots: The ops that must be computed.
+
+    Attributes:
+        users: Maps each op to the ops that have it in their all_deps.
+        rebuilds: Number of times the order was computed from the roots.
+    """
+    def __init__(self, roots):
+        self.roots = list(roots)
+        self.rebuilds = 0
+        self.keys = dict()
+        self.users = defaultdict(OrderedSet)
+        self.rebuild()
+
+    def rebuild(self):
+        """
+        Recomputes the order and user edges from the roots.
+        """
+        self.roots = [root.forwarded for root in self.roots]
+        ops = Op.ordered_ops(self.roots)
+        self.keys = dict((op, float(index)) for index, op in enumerate(ops))
+        self.users = defaultdict(OrderedSet)
+        for op in ops:
+            for dep in op.all_deps:
+                self.users[dep.forwarded].add(op)
+        self.rebuilds += 1
+
+    @property
+    def ordered_ops(self):
+        """
+        Returns:
+            The ops in the graph, in execution order.
+        """
+        return sorted(self.keys, key=self.keys.get)
+
+    def sorted(self, ops):
+        """
+        Arguments:
+            ops: Some ops.
+
+        Returns:
+            The ops of ops that are still in the graph, in execution order.
+        """
+        return sorted((op for op in OrderedSet(ops) if op in self.keys), key=self.keys.get)
+
+    def replace(self, old, rep):
+        """
+        Replaces old with rep, and updates the order and user edges.
+
+        Arguments:
+            old: The op being replaced.
+            rep: Its replacement.
+
+        Returns:
+            The ops whose dependencies changed: rep, any ops new to the graph, and the ops
+            that used old.
+        """
+        old = old.forwarded
+        rep = rep.forwarded
+        if old is rep:
+            return []
+        users = [user for user in self.users.pop(old, ()) if user in self.keys]
+        old.replace_self(rep)
+        rep = rep.forwarded
+        for user in users:
+            user.update_forwards()
+
+        new_ops = self.new_ops(rep)
+        if not self.place(old, rep, new_ops, users):
+            self.rebuild()
+            return [rep] + new_ops + users
+
+        for op in new_ops + [rep]:
+            for dep in op.all_deps:
+                self.users[dep.forwarded].add(op)
+        for user in users:
+            self.users[rep].add(user)
+        self.discard(old)
+        return [rep] + new_ops + users
+
+    def new_ops(self, op):
+        """
+        Returns:
+            The ops reachable from op that are not in the graph yet, in execution order.
+        """
+        new_ops = []
+        visited = set()
+        stack = [(op, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if expanded:
+                new_ops.append(node)
+                continue
+            if node in visited or node in self.keys:
+                continue
+            visited.add(node)
+            stack.append((node, True))
+            stack.extend((dep.forwarded, False) for dep in reversed(list(node.all_deps)))
+        return new_ops
+
+    def place(self, old, rep, new_ops, users):
+        """
+        Gives rep and new_ops positions in the order, just before old.
+
+        Returns:
+            False if that would not be a topological order.
+        """
+        if old not in self.keys:
+            return False
+        limit = self.keys[old]
+        if rep in self.keys:
+            return all(self.keys[rep] < self.keys[user] for user in users)
+        new = set(new_ops)
+        lower = max([self.keys[dep.forwarded]
+                     for op in new_ops for dep in op.all_deps
+                     if dep.forwarded not in new] + [limit - 1.0])
+        step = (limit - lower) / (len(new_ops) + 1)
+        if lower >= limit or step < 1e-6:
+            return False
+        for index, op in enumerate(new_ops):
+            self.keys[op] = lower + step * (index + 1)
+        return True
+
+    def discard(self, op):
+        """
+        Removes op from the graph, along with the ops that were only used by op.
+        """
+        roots = set(self.roots)
+        stack = [op]
+        while stack:
+            op = stack.pop()
+            if op not in self.keys:
+                continue
+            del self.keys[op]
+            self.users.pop(op, None)
+            for dep in op.all_deps:
+                dep_users = self.users.get(dep)
+                if dep_users is None:
+                    continue
+                dep_users.discard(op)
+                if not dep_users and dep not in roots:
+                    stack.append(dep)
+
+
 class GraphBuildingPass(GraphPass):
     """
     Base class for passes that build new graph, primarily derivatives
     and other macro-like things.
+
+    Ops are visited in execution order. After each round of visits the gathered
+    replacements are performed, and the next round only visits the ops affected by them: the
+    replacements, any new ops, and the users of replaced ops up to revisit_depth levels. When
+    such a round makes no replacements, all the ops are visited again, and the pass ends
+    after a round over all the ops that makes no replacements, so patterns spanning more
+    levels than revisit_depth are still found.
+
+    Attributes:
+        revisit_depth: How many levels of users of a replaced op are visited in the rounds
+            after a replacement.
+        rewrites: Number of replacements made.
+        visits: Number of ops visited.
+        rounds: Number of rounds of visits.
     """
+    revisit_depth = 2
+    rewrites = 0
+    visits = 0
+    rounds = 0
+
     def do_pass(self, min_ops, transformer):
         """
         Visit the ops until nothing changes.
@@ -49,24 +224,49 @@ class GraphBuildingPass(GraphPass):
 
         """
         assert isinstance(min_ops, Iterable), "Ops passed into do_pass must be an iterable"
-        has_work = True
-        while True:
-            if not has_work:
-                return
+        self.run_on_graph(OpGraph(min_ops), transformer)
 
+    def run_on_graph(self, graph, transformer):
+        """
+        Visit the ops of an OpGraph until nothing changes, keeping the graph up to date.
+
+        Args:
+            graph: The OpGraph.
+            transformer: An InitGraph object.
+        """
+        worklist = graph.ordered_ops
+        full_round = True
+        while True:
             self.replacement_list = []
 
             # pass through the ops in an execution order collecting things to do
-            ops = Op.ordered_ops(op.forwarded for op in min_ops)
-            for op in ops:
+            for op in worklist:
+                if op.forward is not None:
+                    continue
                 op.update_forwards()
                 self.visit(op)
+            self.visits += len(worklist)
+            self.rounds += 1
+
+            if not self.replacement_list:
+                if full_round:
+                    break
+                worklist = graph.ordered_ops
+                full_round = True
+                continue
 
             # Perform the gathered replacements
+            affected = OrderedSet()
             for old, rep in self.replacement_list:
-                old.forwarded.replace_self(rep.forwarded)
-            has_work = len(self.replacement_list) > 0
-            min_ops = list(op.forwarded for op in min_ops)
+                affected.update(graph.replace(old, rep))
+            self.rewrites += len(self.replacement_list)
+
+            revisit = OrderedSet(affected)
+            for _ in range(self.revisit_depth):
+                affected = OrderedSet(user for op in affected for user in graph.users.get(op, ()))
+                revisit.update(affected)
+            worklist = graph.sorted(revisit)
+            full_round = False
 
     def replace_op(self, op, replacement):
         """
@@ -80,6 +280,55 @@ class GraphBuildingPass(GraphPass):
         self.replacement_list.append((op, replacement))
 
 
+PassStats = namedtuple('PassStats', ['name', 'seconds', 'rewrites', 'visits', 'rounds'])
+
+
+class GraphPassManager(object):
+    """
+    Runs graph passes in order, and records the time taken and the rewrites made by each.
+
+    Consecutive GraphBuildingPasses that use the default do_pass share one OpGraph, so the
+    graph is only sorted again after a pass that may change it in other ways.
+
+    Attributes:
+        stats: A PassStats for each pass run. The rewrites, visits and rounds are None for
+            passes that are not GraphBuildingPasses.
+    """
+    def __init__(self):
+        self.stats = []
+
+    def run(self, graph_passes, ops, transformer):
+        """
+        Runs graph passes on ops.
+
+        Arguments:
+            graph_passes: The passes.
+            ops: The ops that must be computed.
+            transformer: The transformer.
+        """
+        graph = None
+        for graph_pass in graph_passes:
+            start = default_timer()
+            counts = (None, None, None)
+            if isinstance(graph_pass, GraphBuildingPass):
+                counts = (graph_pass.rewrites, graph_pass.visits, graph_pass.rounds)
+            if isinstance(graph_pass, GraphBuildingPass) and \
+                    type(graph_pass).do_pass == GraphBuildingPass.do_pass:
+                if graph is None:
+                    graph = OpGraph(ops)
+                graph_pass.run_on_graph(graph, transformer)
+            else:
+                graph_pass.do_pass(ops, transformer)
+                graph = None
+            if isinstance(graph_pass, GraphBuildingPass):
+                counts = (graph_pass.rewrites - counts[0], graph_pass.visits - counts[1],
+                          graph_pass.rounds - counts[2])
+            stats = PassStats(type(graph_pass).__name__, default_timer() - start, *counts)
+            self.stats.append(stats)
+            logging.info("{}: {:.3f}s, {} rewrites"
+                         .format(stats.name, stats.seconds, stats.rewrites))
+
+
 class PeepholeGraphPass(GraphBuildingPass):
     """
     Base class for passes that do not add to the graph.
@@ -0,0 +1,148 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+"""
+Archives of named arrays, used for transformer checkpoints.
+
+An archive is a single file holding a magic string, the length of a JSON index, the index,
+and the arrays. The index gives the name, dtype, shape and offset of each array. Arrays are
+stored little-endian in C order, each starting at a multiple of ALIGNMENT bytes, so the file
+can be memory-mapped and every array used in place.
+"""
+import json
+import os
+import struct
+import tempfile
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+MAGIC = b'NGRAPHCK'
+VERSION = 1
+ALIGNMENT = 64
+
+
+def align(offset):
+    return -(-offset // ALIGNMENT) * ALIGNMENT
+
+
+def write_archive(path, arrays):
+    """
+    Writes arrays to an archive.
+
+    The archive is written to a temporary file that then replaces path, so an interrupted
+    write leaves any previous archive at path intact.
+
+    Arguments:
+        path: The file name.
+        arrays: An ordered mapping from names to arrays.
+    """
+    index = []
+    offset = 0
+    for name, array in arrays.items():
+        array = np.asarray(array)
+        offset = align(offset)
+        index.append(dict(name=name,
+                          dtype=array.dtype.newbyteorder('<').str,
+                          shape=list(array.shape),
+                          offset=offset))
+        offset += array.nbytes
+    header = json.dumps(dict(version=VERSION, arrays=index)).encode('utf-8')
+    data_start = align(len(MAGIC) + 8 + len(header))
+
+    handle, temp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(path)),
+                                         suffix='.tmp')
+    try:
+        with os.fdopen(handle, 'wb') as f:
+            f.write(MAGIC)
+            f.write(struct.pack('<Q', len(header)))
+            f.write(header)
+            for entry, array in zip(index, arrays.values()):
+                array = np.array(array, dtype=entry['dtype'], order='C', copy=False)
+                f.seek(data_start + entry['offset'])
+                f.write(array.reshape(-1).data)
+            f.truncate(data_start + offset)
+        os.rename(temp_path, path)
+    except Exception:
+        os.remove(temp_path)
+        raise
+
+
+def read_archive(path):
+    """
+    Memory-maps an archive. No array data is read until the arrays are used.
+
+    Arguments:
+        path: The file name.
+
+    Returns:
+        An ordered mapping from names to read-only arrays.
+    """
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError("{} is not a checkpoint archive".format(path))
+        header_length, = struct.unpack('<Q', f.read(8))
+        header = json.loads(f.read(header_length).decode('utf-8'))
+    if header['version'] > VERSION:
+        raise ValueError("Checkpoint archive {} has unsupported version {}"
+                         .format(path, header['version']))
+    data = np.memmap(path, dtype=np.uint8, mode='r')
+    data_start = align(len(MAGIC) + 8 + header_length)
+
+    arrays = OrderedDict()
+    for entry in header['arrays']:
+        dtype = np.dtype(entry['dtype'])
+        shape = tuple(entry['shape'])
+        start = data_start + entry['offset']
+        stop = start + dtype.itemsize * int(np.prod(shape, dtype=np.int64))
+        arrays[entry['name']] = np.asarray(data[start:stop]).view(dtype).reshape(shape)
+    return arrays
+
+
+class ArchiveWriter(object):
+    """
+    Writes an archive on a background thread.
+
+    Arguments:
+        path: The file name.
+        arrays: An ordered mapping from names to arrays, which must not be modified until the
+            write is done.
+    """
+    def __init__(self, path, arrays):
+        self.path = path
+        self.error = None
+        self.thread = threading.Thread(target=self.write, args=(path, arrays))
+        self.thread.start()
+
+    def write(self, path, arrays):
+        try:
+            write_archive(path, arrays)
+        except Exception as e:
+            self.error = e
+
+    def done(self):
+        """
+        Returns:
+            True if the write has finished.
+        """
+        return not self.thread.is_alive()
+
+    def wait(self):
+        """
+        Waits for the write to finish, and raises any error it had.
+        """
+        self.thread.join()
+        if self.error is not None:
+            raise self.error
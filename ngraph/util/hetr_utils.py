@@ -156,7 +156,7 @@ def clone_graph(root, clone_id, shared_queues_idx, parallel_axis, num_clones):
             new_send_nodes.add(send_op)
             replaced_send_nodes.add(orig_ops[op.uuid].send_node())
         elif isinstance(op, AllReduceOp):
-            op._shared_queues = orig_ops[op.uuid]._shared_queues
+            op._exchange = orig_ops[op.uuid]._exchange
             op.idx = shared_queues_idx
         if hasattr(op, '_axes') and parallel_axis in op._axes:
             op._axes = calculate_scatter_axes(op.axes, parallel_axis, num_clones)
@@ -12,9 +12,63 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ----------------------------------------------------------------------------
+import itertools
+import multiprocessing.util
+import os
+import uuid
 from weakref import WeakValueDictionary
 from builtins import object
 
+# uuids are made of a random prefix chosen once per process and a counter, which is much
+# cheaper than uuid4 and as unique in practice
+_uuid_prefix = None
+_uuid_counter = None
+
+
+def reseed_uuids():
+    """
+    Chooses a new uuid prefix, so that a forked process, such as a Hetr child transformer,
+    does not make the uuids its parent makes. It is called in every process forked by
+    multiprocessing, or by os.fork under Python 3.7 and later.
+    """
+    global _uuid_prefix, _uuid_counter
+    _uuid_prefix = uuid.uuid4().int >> 64 << 64
+    _uuid_counter = itertools.count()
+
+
+reseed_uuids()
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=reseed_uuids)
+else:
+    multiprocessing.util.register_after_fork(reseed_uuids, lambda reseed: reseed())
+
+
+def next_uuid_int():
+    """
+    Returns:
+        The integer value of a new uuid.
+    """
+    return _uuid_prefix | next(_uuid_counter)
+
+
+class LazyUUID(object):
+    """
+    A descriptor for a uuid attribute that is cheap to create.
+
+    The instance keeps the integer from next_uuid_int in _uuid, and it is made into a
+    uuid.UUID when the attribute is first read. A uuid.UUID may also be assigned.
+    """
+    def __get__(self, instance, owner):
+        if instance is None:
+            return self
+        value = instance._uuid
+        if not isinstance(value, uuid.UUID):
+            value = instance._uuid = uuid.UUID(int=value)
+        return value
+
+    def __set__(self, instance, value):
+        instance._uuid = value
+
 
 class NameableValue(object):
     """
@@ -30,6 +84,7 @@ class NameableValue(object):
         graph_label_type: A label that should be used when drawing the graph.
         id: Unique id for this object.
     """
+    __slots__ = ('__name', '__weakref__')
     __counter = 0
     __all_names = WeakValueDictionary()
 
@@ -13,9 +13,13 @@
 # limitations under the License.
 # ----------------------------------------------------------------------------
 from __future__ import print_function
+import collections
+import gzip
+import json
 import os
 import posixpath
 import sys
+import numpy as np
 import requests
 from tqdm import tqdm
 
@@ -124,3 +128,94 @@ def fetch_file(url, sourcefile, destfile, totalsz):
         for data in tqdm(req.iter_content(chunksz), total=nchunks):
             f.write(data)
     print("Download Complete")
+
+
+def save_dataset(directory, dataset):
+    """
+    Saves a dataset as .npy files that load_dataset can memory-map.
+
+    Each array is saved to <directory>/<name>.npy. The axes of the arrays given with axes are
+    saved to <directory>/axes.json.
+
+    Arguments:
+        directory (str): The directory to save to. It is created if needed.
+        dataset (dict): A mapping from names to arrays, to dicts with the keys 'data' and
+                        'axes' as ArrayIterator takes, or to datasets, which are saved to
+                        subdirectories. Values that are not arrays are converted to arrays.
+
+    Raises:
+        ValueError: if a value can only be converted to an array of Python objects, which
+                    could not be memory-mapped.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    axes = {}
+    for name, value in dataset.items():
+        name = str(name)
+        path = os.path.join(directory, name)
+        if isinstance(value, collections.Mapping) and set(value.keys()) == {'data', 'axes'}:
+            axes[name] = list(value['axes'])
+            value = value['data']
+        elif isinstance(value, collections.Mapping):
+            save_dataset(path, value)
+            continue
+        array = np.asarray(value)
+        if array.dtype.hasobject:
+            raise ValueError("{} can not be saved as an array of numbers or strings"
+                             .format(path))
+        np.save(path + '.npy', array, allow_pickle=False)
+    if axes:
+        with open(os.path.join(directory, 'axes.json'), 'w') as f:
+            json.dump(axes, f)
+
+
+def load_dataset(directory, mmap_mode='r'):
+    """
+    Loads a dataset saved by save_dataset. The arrays are memory-mapped, so only the parts of
+    them that are used are read.
+
+    Arguments:
+        directory (str): The directory the dataset was saved to.
+        mmap_mode (str, optional): The mode of np.load used to memory-map the arrays, or None
+                                   to read them into memory.
+
+    Returns:
+        dict: The dataset, with the arrays saved with axes as dicts with the keys 'data' and
+              'axes'.
+    """
+    axes_path = os.path.join(directory, 'axes.json')
+    axes = {}
+    if os.path.exists(axes_path):
+        with open(axes_path) as f:
+            axes = json.load(f)
+    dataset = {}
+    for filename in sorted(os.listdir(directory)):
+        path = os.path.join(directory, filename)
+        if os.path.isdir(path):
+            dataset[filename] = load_dataset(path, mmap_mode=mmap_mode)
+        elif filename.endswith('.npy'):
+            name = filename[:-len('.npy')]
+            array = np.load(path, mmap_mode=mmap_mode, allow_pickle=False)
+            if name in axes:
+                dataset[name] = {'data': array, 'axes': tuple(axes[name])}
+            else:
+                dataset[name] = array
+    return dataset
+
+
+def convert_pickle_dataset(pickle_path, directory):
+    """
+    Converts a pickled dataset, optionally gzipped, to a directory that load_dataset can
+    memory-map.
+
+    Arguments:
+        pickle_path (str): The pickle file, ending in .gz if it is gzipped. It must hold a
+                           dataset as described in save_dataset.
+        directory (str): The directory to save to.
+    """
+    opener = gzip.open if pickle_path.endswith('.gz') else open
+    with opener(pickle_path, 'rb') as f:
+        dataset = pickle_load(f)
+    if not isinstance(dataset, collections.Mapping):
+        raise ValueError("{} does not hold a mapping of names to arrays".format(pickle_path))
+    save_dataset(directory, dataset)
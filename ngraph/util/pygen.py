@@ -19,6 +19,20 @@ import atexit
 import os
 from contextlib import contextmanager
 
+# Generated files, deleted on exit. They are kept here rather than by registering each PyGen
+# with atexit, which would keep every PyGen and everything it refers to alive.
+generated_files = set()
+
+
+@atexit.register
+def remove_generated_files():
+    for filename in generated_files:
+        try:
+            os.unlink(filename)
+        except OSError:
+            pass
+    generated_files.clear()
+
 
 @contextmanager
 def indenting(code_writer):
@@ -43,6 +57,7 @@ class PyGen(object):
         globals: The current environment.
         filenames: List of files to be deleted on exit.
         filename: Name of last generated file.
+        compiled: The code object of the last compiled code.
 
     """
     def __init__(self, indentation=0, prefix="", **kwargs):
@@ -53,8 +68,7 @@ class PyGen(object):
         self.filenames = []
         self.__code = list()
         self.filename = None
-        self.indent_strings = ['', '    ', '        ', '            ']
-        atexit.register(self.__exit_handler)
+        self.compiled = None
 
     def indent(self, indentation):
         """
@@ -85,7 +99,7 @@ class PyGen(object):
         namekwargs = {k: self.name(v) for k, v in kwargs.items()}
 
         fcode = code.format(*nameargs, **namekwargs)
-        indent_string = self.indent_strings[self.indentation]
+        indent_string = '    ' * self.indentation
         for line in iter(fcode.splitlines()):
             self.__code.append(indent_string)
             self.__code.append(line)
@@ -101,11 +115,6 @@ class PyGen(object):
         """
         self.__code.extend(["\n"] * n)
 
-    def __exit_handler(self):
-        for filename in self.filenames:
-            os.unlink(filename)
-        self.filenames = []
-
     @property
     def code(self):
         """
@@ -177,12 +186,14 @@ class PyGen(object):
                                            delete=False)
         self.filename = file.name
         self.filenames.append(self.filename)
+        generated_files.add(self.filename)
         self.write_to_file(file)
         file.close()
 
         with open(self.filename, 'r') as file:
             source = file.read()
             code = compile(source, self.filename, "exec")
+            self.compiled = code
             exec_(code, self.globals, self.globals)
 
         return self.globals
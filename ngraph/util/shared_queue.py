@@ -0,0 +1,263 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+from __future__ import division
+import mmap
+import multiprocessing
+from contextlib import contextmanager
+
+import numpy as np
+
+
+class SharedArrayQueue(object):
+    """
+    A queue of NumPy arrays between processes, backed by a ring of preallocated slots in
+    shared memory.
+
+    Arrays are copied into a slot by put and out of it by get, without being pickled or
+    sent through a pipe. The memory is an anonymous shared mapping and the slots are
+    signalled with semaphores, so the queue must be created before the processes that use it
+    are forked, as the Hetr child transformers are.
+
+    Any number of processes may put; only one may get. put blocks while all the slots are
+    full.
+
+    Arguments:
+        max_shape: The largest array shape that will be sent; smaller arrays, such as
+            slices, can be sent too.
+        dtype: The dtype of the arrays.
+        slots: Number of arrays that may be queued.
+    """
+    max_dims = 15
+    alignment = 64
+
+    def __init__(self, max_shape, dtype, slots=2):
+        self.dtype = np.dtype(dtype)
+        self.slots = slots
+        self.max_size = int(np.prod(max_shape, dtype=np.int64))
+        header_bytes = (self.max_dims + 1) * 8
+        data_bytes = -(-self.max_size * self.dtype.itemsize // self.alignment) * self.alignment
+        slot_bytes = header_bytes + data_bytes
+        self.buffer = mmap.mmap(-1, max(1, slot_bytes * slots))
+        self.headers = [np.frombuffer(self.buffer, dtype=np.int64, count=self.max_dims + 1,
+                                      offset=slot * slot_bytes)
+                        for slot in range(slots)]
+        self.data = [np.frombuffer(self.buffer, dtype=self.dtype, count=self.max_size,
+                                   offset=slot * slot_bytes + header_bytes)
+                     for slot in range(slots)]
+        self.head = multiprocessing.RawValue('l', 0)
+        self.tail = multiprocessing.RawValue('l', 0)
+        self.items = multiprocessing.Semaphore(0)
+        self.spaces = multiprocessing.Semaphore(slots)
+        self.put_lock = multiprocessing.Lock()
+
+    def put(self, x):
+        """
+        Copies an array into the queue.
+
+        Arguments:
+            x: The array.
+        """
+        x = np.asarray(x)
+        if x.size > self.max_size or x.ndim > self.max_dims:
+            raise ValueError("Array of shape {} does not fit a queue of {} elements"
+                             .format(x.shape, self.max_size))
+        self.spaces.acquire()
+        # Slots are filled in order, so only one producer can be writing at a time
+        with self.put_lock:
+            slot = self.tail.value
+            self.tail.value = (slot + 1) % self.slots
+            header = self.headers[slot]
+            header[0] = x.ndim
+            header[1:1 + x.ndim] = x.shape
+            np.copyto(self.data[slot][:x.size].reshape(x.shape), x, casting='unsafe')
+        self.items.release()
+
+    @contextmanager
+    def receive(self):
+        """
+        Waits for the next array and gives a view of it in shared memory. The slot is
+        released when the block exits.
+
+        Yields:
+            The array.
+        """
+        self.items.acquire()
+        slot = self.head.value
+        self.head.value = (slot + 1) % self.slots
+        try:
+            header = self.headers[slot]
+            shape = tuple(int(length) for length in header[1:1 + header[0]])
+            size = int(np.prod(shape, dtype=np.int64))
+            yield self.data[slot][:size].reshape(shape)
+        finally:
+            self.spaces.release()
+
+    def get(self, out=None):
+        """
+        Removes the next array from the queue.
+
+        Arguments:
+            out: If not None, an array the value is copied to.
+
+        Returns:
+            The array, out if given.
+        """
+        with self.receive() as x:
+            if out is None:
+                return np.array(x)
+            out[...] = x
+            return out
+
+
+class SharedBarrier(object):
+    """
+    A reusable barrier between processes, which multiprocessing only provides on Python 3.
+
+    Passing the barrier takes two phases, each a counter and a turnstile semaphore, so that
+    a process which leaves the barrier and calls wait again cannot pass the processes still
+    leaving it. Like the other objects here, the barrier must be created before the processes
+    are forked.
+
+    Arguments:
+        parties: Number of processes that must call wait before any of them returns.
+    """
+    def __init__(self, parties):
+        self.parties = parties
+        self.count = multiprocessing.RawValue('l', 0)
+        self.lock = multiprocessing.Lock()
+        self.arrive = multiprocessing.Semaphore(0)
+        self.leave = multiprocessing.Semaphore(0)
+
+    def phase(self, step, turnstile, last):
+        with self.lock:
+            self.count.value += step
+            if self.count.value == last:
+                for _ in range(self.parties):
+                    turnstile.release()
+        turnstile.acquire()
+
+    def wait(self):
+        """
+        Blocks until all the processes have called wait.
+        """
+        self.phase(1, self.arrive, self.parties)
+        self.phase(-1, self.leave, 0)
+
+
+class SharedArrayExchange(object):
+    """
+    Shared memory in which each of a fixed group of processes publishes an array, used for
+    allreduce.
+
+    Each process copies its array into its own row of the shared buffer, then the rows are
+    reduced in place with one of two algorithms:
+
+    ring: The rows are split into one chunk per process. In each of N - 1 steps, every
+    process adds a chunk of its left neighbour's row into its own row, so that after the
+    reduce-scatter each process's row holds one fully reduced chunk. Every process then
+    gathers the reduced chunks into its output. Each process reads and writes about two
+    array sizes in total, whatever the number of processes, so this suits large arrays.
+
+    tree: Rows are added pairwise in log2(N) steps, and every process copies the total
+    from the first row. Fewer steps make this better for small arrays.
+
+    Each step ends at a barrier. Every process gets the same result.
+
+    Like SharedArrayQueue, the exchange must be created before the processes are forked.
+
+    Arguments:
+        shape: The shape of the arrays.
+        dtype: The dtype of the arrays.
+        parties: Number of processes.
+        algorithm: 'ring', 'tree', or 'auto' to use tree for arrays smaller than
+            tree_max_bytes and ring otherwise.
+    """
+    algorithms = ('auto', 'ring', 'tree')
+    tree_max_bytes = 1 << 16
+
+    def __init__(self, shape, dtype, parties, algorithm='auto'):
+        if algorithm not in self.algorithms:
+            raise ValueError("Unknown allreduce algorithm {}, expected one of {}"
+                             .format(algorithm, self.algorithms))
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.parties = parties
+        self.size = int(np.prod(self.shape, dtype=np.int64))
+        if algorithm == 'auto':
+            small = self.size * self.dtype.itemsize < self.tree_max_bytes
+            algorithm = 'tree' if small or parties < 3 else 'ring'
+        self.algorithm = algorithm
+        self.buffer = mmap.mmap(-1, max(1, self.size * self.dtype.itemsize * parties))
+        self.rows = np.frombuffer(self.buffer, dtype=self.dtype, count=self.size * parties)\
+            .reshape(parties, self.size)
+        bounds = np.linspace(0, self.size, parties + 1).astype(int)
+        self.chunks = [slice(start, stop) for start, stop in zip(bounds[:-1], bounds[1:])]
+        self.barrier = SharedBarrier(parties)
+
+    def allreduce(self, idx, x, out, reduce_func='sum'):
+        """
+        Reduces the arrays of all the processes. Every process must call allreduce.
+
+        Arguments:
+            idx: The index of the calling process.
+            x: Its array.
+            out: The array the result is written to.
+            reduce_func: 'sum' or 'mean'.
+
+        Returns:
+            out
+        """
+        np.copyto(self.rows[idx].reshape(self.shape), x, casting='unsafe')
+        self.barrier.wait()
+        flat_out = out.reshape(self.size) if out.flags.c_contiguous else None
+        if self.algorithm == 'ring':
+            result = self.ring(idx, flat_out)
+        else:
+            result = self.tree(idx, flat_out)
+        if flat_out is None:
+            out[...] = result.reshape(self.shape)
+        if reduce_func == 'mean':
+            out /= self.parties
+        # Nobody may publish the next array before everyone has read this one
+        self.barrier.wait()
+        return out
+
+    def ring(self, idx, out):
+        parties = self.parties
+        rows = self.rows
+        for step in range(parties - 1):
+            chunk = self.chunks[(idx - step - 1) % parties]
+            mine = rows[idx, chunk]
+            np.add(mine, rows[(idx - 1) % parties, chunk], out=mine)
+            self.barrier.wait()
+        # Chunk k was completed in the row of process k - 1
+        if out is None:
+            out = np.empty(self.size, dtype=self.dtype)
+        for index, chunk in enumerate(self.chunks):
+            out[chunk] = rows[(index - 1) % parties, chunk]
+        return out
+
+    def tree(self, idx, out):
+        rows = self.rows
+        step = 1
+        while step < self.parties:
+            if idx % (2 * step) == 0 and idx + step < self.parties:
+                np.add(rows[idx], rows[idx + step], out=rows[idx])
+            self.barrier.wait()
+            step *= 2
+        if out is None:
+            return rows[0]
+        out[...] = rows[0]
+        return out
@@ -0,0 +1,112 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+from collections import OrderedDict
+from contextlib import closing
+
+import numpy as np
+import pytest
+
+import ngraph as ng
+import ngraph.transformers as ngt
+from ngraph.util.checkpoint import read_archive, write_archive
+
+
+def test_archive_round_trip(tmpdir):
+    path = str(tmpdir.join('arrays.ckpt'))
+    arrays = OrderedDict([('a', np.arange(12, dtype=np.float32).reshape(3, 4)[:, ::2]),
+                          ('scalar', np.float64(3.5)),
+                          ('empty', np.zeros((0, 3), dtype=np.int32)),
+                          ('b', np.arange(5, dtype=np.int8))])
+    write_archive(path, arrays)
+    loaded = read_archive(path)
+    assert list(loaded.keys()) == list(arrays.keys())
+    for name, array in arrays.items():
+        assert loaded[name].dtype == array.dtype
+        np.testing.assert_array_equal(loaded[name], array)
+    assert isinstance(loaded['a'].base, np.memmap) or not loaded['a'].flags.owndata
+
+    with open(path, 'wb') as f:
+        f.write(b'not a checkpoint')
+    with pytest.raises(ValueError):
+        read_archive(path)
+
+
+def make_model():
+    C = ng.make_axis(length=5, name='C')
+    D = ng.make_axis(length=3, name='D')
+    x = ng.placeholder([C])
+    w = ng.variable([D, C], initial_value=np.ones((3, 5)))
+    b = ng.persistent_tensor([D], initial_value=0.0)
+    y = ng.dot(w, x) + b
+    update = ng.doall([ng.assign(w, w + ng.broadcast(x, [D, C]) * 0.1),
+                       ng.assign(b, b + 1.0)])
+    return x, y, update, [w, b]
+
+
+@pytest.mark.parametrize('background', [False, True])
+def test_save_and_restore_checkpoint(tmpdir, background):
+    path = str(tmpdir.join('model.ckpt'))
+    x_value = np.arange(5.0)
+    x, y, update, tensors = make_model()
+    with closing(ngt.make_transformer()) as transformer:
+        train = transformer.computation(update, x)
+        predict = transformer.computation(y, x)
+        assert len(transformer.persistent_tensors()) == 2
+        for _ in range(3):
+            train(x_value)
+        saved = np.copy(predict(x_value))
+        writer = transformer.save_checkpoint(path, background=background)
+        # Training continues while the checkpoint is written
+        train(x_value)
+        if background:
+            writer.wait()
+            assert writer.done()
+        assert not np.allclose(predict(x_value), saved)
+
+        transformer.restore_checkpoint(path)
+        np.testing.assert_allclose(predict(x_value), saved)
+
+    # Restore into a new transformer for a new copy of the model, whose tensors have new names
+    x, y, _, new_tensors = make_model()
+    with closing(ngt.make_transformer()) as transformer:
+        predict = transformer.computation(y, x)
+        transformer.restore_checkpoint(path, tensors=OrderedDict(
+            (tensor.name, new_tensor) for tensor, new_tensor in zip(tensors, new_tensors)))
+        np.testing.assert_allclose(predict(x_value), saved)
+
+
+def test_restore_checkpoint_missing_tensor(tmpdir):
+    path = str(tmpdir.join('empty.ckpt'))
+    write_archive(path, OrderedDict())
+    x, y, _, _ = make_model()
+    with closing(ngt.make_transformer()) as transformer:
+        predict = transformer.computation(y, x)
+        with pytest.raises(ValueError):
+            transformer.restore_checkpoint(path)
+        transformer.restore_checkpoint(path, strict=False)
+        np.testing.assert_allclose(predict(np.ones(5)), np.full(3, 5.0))
+
+
+def test_restore_checkpoint_checks_before_writing(tmpdir):
+    path = str(tmpdir.join('bad.ckpt'))
+    write_archive(path, OrderedDict([('w', np.zeros((3, 5))), ('b', np.zeros(4))]))
+    assert tmpdir.listdir() == [tmpdir.join('bad.ckpt')]
+    x, y, _, (w, b) = make_model()
+    with closing(ngt.make_transformer()) as transformer:
+        predict = transformer.computation(y, x)
+        with pytest.raises(ValueError):
+            transformer.restore_checkpoint(path, tensors=OrderedDict([('w', w), ('b', b)]))
+        # The value of w, which matched, was not restored either
+        np.testing.assert_allclose(predict(np.ones(5)), np.full(3, 5.0))
@@ -0,0 +1,104 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+from contextlib import closing
+
+import numpy as np
+
+import ngraph as ng
+import ngraph.transformers as ngt
+from ngraph.op_graph.op_graph import BroadcastOp, DotOp, Op, TanhOp
+from ngraph.transformers.passes.constfold import ConstantFoldingPass
+
+
+class StubTransformer(object):
+    pass
+
+
+def make_graph():
+    rng = np.random.RandomState(0)
+    C = ng.make_axis(length=4)
+    D = ng.make_axis(length=3)
+    N = ng.make_axis(length=2, name='N')
+    a = ng.constant(rng.uniform(-1, 1, (4, 3)), [C, D])
+    b = ng.constant(rng.uniform(-1, 1, (3, 4)), [D, C])
+    labels = ng.constant(np.array([2, 0, 1]), [D])
+    x = ng.placeholder([C, N])
+    shape_math = ng.tensor_size(x) * 2.0 + ng.sum(ng.exp(a) - ng.sqrt(ng.square(a)))
+    folded = ng.tanh(ng.dot(b, a)) + ng.one_hot(labels, axis=C) - ng.max(a, out_axes=[C])
+    y = ng.dot(folded, x) * shape_math + ng.slice_along_axis(a, D, 1)
+    return x, [y, ng.sum(a * b, out_axes=()), shape_math], rng.uniform(-1, 1, (4, 2))
+
+
+def run(constant_folding):
+    x, results, x_value = make_graph()
+    factory = ngt.make_transformer_factory('cpu', constant_folding=constant_folding)
+    with closing(factory()) as transformer:
+        computation = transformer.computation(results, x)
+        return [np.copy(result) for result in computation(x_value)]
+
+
+def test_constant_folding_results_match():
+    for result, ref in zip(run(True), run(False)):
+        assert result.shape == ref.shape
+        ng.testing.assert_allclose(result, ref, rtol=1e-5)
+
+
+def test_constant_folding_replaces_constant_subgraphs():
+    x, results, _ = make_graph()
+    folding = ConstantFoldingPass()
+    folding.do_pass(results, StubTransformer())
+    assert folding.folded > 0
+    ops = Op.ordered_ops([result.forwarded for result in results])
+    computed = [op for op in ops if op.args and all(arg.is_constant for arg in op.args)
+                and not op.is_constant and isinstance(op, (DotOp, TanhOp))]
+    assert computed == []
+    # the roots that are constant become constants
+    assert results[1].forwarded.is_constant
+    assert results[2].forwarded.is_constant
+
+
+def test_constant_folding_keeps_broadcast_scalars():
+    C = ng.make_axis(length=1000)
+    D = ng.make_axis(length=1000)
+    big = ng.broadcast(ng.constant(2.0), [C, D]) * 3.0
+    folding = ConstantFoldingPass(max_elements=100)
+    folding.do_pass([big], StubTransformer())
+    rep = big.forwarded
+    assert isinstance(rep, BroadcastOp) and rep.args[0].is_constant
+    assert rep.args[0].tensor.const == 6.0
+
+
+def test_constant_folding_size_limit():
+    C = ng.make_axis(length=20)
+    D = ng.make_axis(length=20)
+    a = ng.constant(np.arange(400.0).reshape(20, 20), [C, D])
+    b = ng.exp(a * 0.01)
+    folding = ConstantFoldingPass(max_elements=100)
+    folding.do_pass([b], StubTransformer())
+    assert folding.folded == 0 and b.forwarded is b
+
+
+def test_constant_folding_keeps_metadata():
+    C = ng.make_axis(length=3)
+    with ng.metadata(device_id='1', layer_type='affine'):
+        dense = ng.tanh(ng.constant(np.arange(3.0), [C]))
+        uniform = ng.broadcast(ng.constant(2.0), [C]) * 3.0
+    folding = ConstantFoldingPass()
+    folding.do_pass([dense, uniform], StubTransformer())
+    assert folding.folded == 2
+    for op in (dense.forwarded, uniform.forwarded, uniform.forwarded.args[0]):
+        assert op is not dense and op is not uniform
+        assert op.metadata['device_id'] == '1'
+        assert op.metadata['layer_type'] == 'affine'
@@ -41,7 +41,7 @@ def slicable(dim, pad=0):
     return (dim0, dim[-1])
 
 
-def pixel_indices(T, R, S, D, H, W, C, mt, pr, qs):
+def pixel_indices(T, R, S, D, H, W, C, mt, pr, qs, dil_d=1, dil_h=1, dil_w=1):
     HW = H * W
     DHW = D * H * W
     imax = C * DHW
@@ -51,15 +51,15 @@ def pixel_indices(T, R, S, D, H, W, C, mt, pr, qs):
 
         ci = c * DHW
 
-        z = mt + t
+        z = mt + t * dil_d
         zi = ci + z * HW
         zb = z >= 0 and z < D
 
-        y = pr + r
+        y = pr + r * dil_h
         yi = zi + y * W
         yb = zb and y >= 0 and y < H
 
-        x = qs + s
+        x = qs + s * dil_w
 
         if yb and x >= 0 and x < W:
             xi = yi + x
@@ -77,6 +77,7 @@ def reference_conv(dimI, dimF, dimO, conv_params, valI, valF, valE):
     (C, T, R, S, K) = dimF
     pad_d, pad_h, pad_w = conv_params['pad_d'], conv_params['pad_h'], conv_params['pad_w']
     str_d, str_h, str_w = conv_params['str_d'], conv_params['str_h'], conv_params['str_w']
+    dil_d, dil_h, dil_w = conv_params['dil_d'], conv_params['dil_h'], conv_params['dil_w']
     dtype = np.float32
 
     no_pad_I = slicable(dimI)
@@ -97,7 +98,7 @@ def reference_conv(dimI, dimF, dimO, conv_params, valI, valF, valE):
         pr = p * str_h - pad_h
         qs = q * str_w - pad_w
 
-        idx = pixel_indices(T, R, S, D, H, W, C, mt, pr, qs)
+        idx = pixel_indices(T, R, S, D, H, W, C, mt, pr, qs, dil_d, dil_h, dil_w)
 
         cpuO[:, m, p, q, :] = np.dot(cpuF.T, cpuI[idx, :])
 
@@ -113,11 +114,12 @@ def reference_conv(dimI, dimF, dimO, conv_params, valI, valF, valE):
 class ConvParams(object):
     def __init__(self, C=1, N=1, K=1, D=1, H=1, W=1, T=1, R=1, S=1,
                  pad_d=0, pad_h=0, pad_w=0,
-                 str_d=1, str_h=1, str_w=1):
+                 str_d=1, str_h=1, str_w=1,
+                 dil_d=1, dil_h=1, dil_w=1):
 
-        M = output_dim(D, T, pad_d, str_d)
-        P = output_dim(H, R, pad_h, str_h)
-        Q = output_dim(W, S, pad_w, str_w)
+        M = output_dim(D, T, pad_d, str_d, dilation=dil_d)
+        P = output_dim(H, R, pad_h, str_h, dilation=dil_h)
+        Q = output_dim(W, S, pad_w, str_w, dilation=dil_w)
 
         self.dimO = (K, M, P, Q, N)
         self.dimI = (C, D, H, W, N)
@@ -126,7 +128,7 @@ class ConvParams(object):
         self.conv_params = dict(
             pad_d=pad_d, pad_h=pad_h, pad_w=pad_w,
             str_d=str_d, str_h=str_h, str_w=str_w,
-            dil_d=1, dil_h=1, dil_w=1
+            dil_d=dil_d, dil_h=dil_h, dil_w=dil_w
         )
 
         batch_axis = ng.make_axis(name='N', length=N)
@@ -208,6 +210,42 @@ def test_conv(transformer_factory, n64_hw32_c32_3x3):
     assert np.allclose(gradF_ng, gradF_np, rtol=0, atol=2)
 
 
+@pytest.mark.parametrize("conv_args", [
+    dict(C=3, N=4, K=5, H=9, W=11, R=3, S=3, pad_h=1, pad_w=2, str_h=2, str_w=3),
+    dict(C=2, N=3, K=4, H=12, W=12, R=3, S=2, pad_h=2, pad_w=1, dil_h=2, dil_w=3),
+    dict(C=2, N=2, K=3, D=6, H=7, W=5, T=3, R=2, S=3, pad_d=1, str_d=2, dil_h=2, pad_w=1),
+])
+def test_conv_strides_padding_dilation(transformer_factory, conv_args):
+    """
+    test fprop, bprop and update against the reference with non-trivial strides, padding,
+    dilation and depth
+    """
+    cf = ConvParams(**conv_args)
+
+    input_value = rng.uniform(-0.5, 0.5, cf.ax_i)
+    filter_value = rng.uniform(-0.5, 0.5, cf.ax_f)
+    error_value = rng.uniform(-0.5, 0.5, cf.ax_o)
+
+    inputs = ng.placeholder(cf.ax_i)
+    filters = ng.placeholder(cf.ax_f)
+    errors = ng.placeholder(cf.ax_o)
+
+    output = ng.convolution(cf.conv_params, inputs, filters, axes=cf.ax_o)
+    bprop_out = bprop_conv(errors, inputs, filters, output)
+    updat_out = update_conv(errors, inputs, filters, output)
+
+    with executor([output, bprop_out, updat_out], inputs, filters, errors) as conv_executor:
+        result_ng, gradI_ng, gradF_ng = conv_executor(input_value, filter_value, error_value)
+
+    result_np, gradI_np, gradF_np = reference_conv(cf.dimI, cf.dimF, cf.dimO,
+                                                   cf.conv_params,
+                                                   input_value, filter_value, error_value)
+
+    ng.testing.assert_allclose(result_ng, result_np, rtol=1e-5, atol=1e-5)
+    ng.testing.assert_allclose(gradI_ng, gradI_np, rtol=1e-5, atol=1e-5)
+    ng.testing.assert_allclose(gradF_ng, gradF_np, rtol=1e-5, atol=1e-5)
+
+
 def test_wrong_filters_shape_length():
     """
     test wrong filters shape length
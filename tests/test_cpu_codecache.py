@@ -0,0 +1,112 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+import os
+from contextlib import closing
+
+import numpy as np
+import pytest
+
+import ngraph as ng
+import ngraph.transformers as ngt
+from ngraph.testing import RandomTensorGenerator
+from ngraph.transformers.cpu.codecache import CompilationCache, graph_digest
+
+
+def make_graph(seed, hidden=32):
+    rng = RandomTensorGenerator(seed, np.float32)
+    C = ng.make_axis(length=16)
+    H = ng.make_axis(length=hidden)
+    N = ng.make_axis(length=8, name='N')
+    x = ng.placeholder([C, N])
+    w1 = ng.variable([H, C], initial_value=rng.uniform(-1, 1, [H, C]))
+    w2 = ng.variable([C, H], initial_value=rng.uniform(-1, 1, [C, H]))
+    h = ng.tanh(ng.dot(w1, x))
+    y = ng.tanh(ng.dot(w2, h))
+    cost = ng.sum(y * y, out_axes=())
+    grads = [ng.deriv(cost, w) for w in (w1, w2)]
+    return x, [cost] + grads
+
+
+def run_graph(seed, cache, hidden=32, **kwargs):
+    x, results = make_graph(seed, hidden)
+    x_value = RandomTensorGenerator(seed, np.float32).uniform(-1, 1, x.axes)
+    factory = ngt.make_transformer_factory('cpu', compilation_cache=cache, **kwargs)
+    with closing(factory()) as transformer:
+        comp = transformer.computation(results, x)
+        return [np.copy(r) for r in comp(x_value)]
+
+
+def test_graph_digest_ignores_names_and_variable_values():
+    _, results1 = make_graph(0)
+    _, results2 = make_graph(1)
+    _, results3 = make_graph(0, hidden=24)
+    key1, ops1 = graph_digest(results1, dict())
+    key2, ops2 = graph_digest(results2, dict())
+    key3, _ = graph_digest(results3, dict())
+    assert key1 == key2 != key3
+    assert len(ops1) == len(ops2)
+    assert key1 != graph_digest(results1, dict(memory_planning=True))[0]
+
+
+@pytest.mark.parametrize('kwargs', [dict(),
+                                    dict(memory_planning=True, arena_allocation=True)])
+def test_compilation_cache_hit(tmpdir, kwargs):
+    cache = CompilationCache(str(tmpdir))
+    expected = run_graph(0, False, **kwargs)
+    assert run_graph(0, cache, **kwargs) is not None
+    assert (cache.hits, cache.misses) == (0, 1)
+
+    # an identical graph with other variable values reuses the entry
+    results = run_graph(0, cache, **kwargs)
+    other_results = run_graph(1, cache, **kwargs)
+    assert (cache.hits, cache.misses) == (2, 1)
+    for result, ref in zip(results, expected):
+        ng.testing.assert_allclose(result, ref, rtol=1e-5)
+    for result, ref in zip(other_results, run_graph(1, False, **kwargs)):
+        ng.testing.assert_allclose(result, ref, rtol=1e-5)
+
+
+def test_compilation_cache_directory_from_environment(tmpdir, monkeypatch):
+    monkeypatch.setenv('NGRAPH_CPU_CACHE_DIR', str(tmpdir))
+    run_graph(0, None)
+    assert len(os.listdir(str(tmpdir))) == 1
+    run_graph(0, None, hidden=24)
+    assert len(os.listdir(str(tmpdir))) == 2
+
+
+def test_compilation_cache_eviction(tmpdir):
+    cache = CompilationCache(str(tmpdir), max_bytes=2500)
+    for index in range(3):
+        cache.put(str(index), b'x' * 1000)
+        os.utime(cache.filename(str(index)), (index, index))
+    assert cache.get('0') is None
+    assert cache.get('1') is not None
+    cache.put('3', b'x' * 1000)
+    # '2' is now the least recently used entry
+    assert sorted(os.listdir(str(tmpdir))) == ['1.ngc', '3.ngc']
+
+
+def test_compilation_cache_refuses_untrusted_entries(tmpdir):
+    directory = str(tmpdir.join('cache'))
+    cache = CompilationCache(directory)
+    assert not os.stat(directory).st_mode & 0o077
+    cache.put('0', b'entry')
+    assert cache.get('0') == b'entry'
+    os.chmod(cache.filename('0'), 0o666)
+    assert cache.get('0') is None
+    os.chmod(cache.filename('0'), 0o600)
+    if os.getuid() == 0:
+        os.chown(cache.filename('0'), 12345, -1)
+        assert cache.get('0') is None
@@ -0,0 +1,77 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+from contextlib import closing
+
+import numpy as np
+import pytest
+
+import ngraph as ng
+import ngraph.transformers as ngt
+from ngraph.testing import RandomTensorGenerator
+
+
+def lstm_cell_graph(H, N):
+    """
+    The elementwise part of an LSTM cell, with the gate pre-activations as inputs.
+    """
+    gates = [ng.placeholder([H, N]) for _ in range(4)]
+    c_prev = ng.placeholder([H, N])
+    i, f, o, g = gates
+    c = ng.sigmoid(f) * c_prev + ng.sigmoid(i) * ng.tanh(g)
+    h = ng.sigmoid(o) * ng.tanh(c)
+    cost = ng.sum(h * h + c, reduction_axes=[N])
+    return gates + [c_prev], [c, h, cost]
+
+
+def run_lstm_cell(elementwise_fusion, tile_size=None):
+    rng = RandomTensorGenerator(0, np.float32)
+    H = ng.make_axis(length=512)
+    N = ng.make_axis(length=128, name='N')
+    inputs, outputs = lstm_cell_graph(H, N)
+    values = [rng.uniform(-2, 2, x.axes) for x in inputs]
+
+    factory = ngt.make_transformer_factory('cpu', elementwise_fusion=elementwise_fusion)
+    with closing(factory()) as transformer:
+        if tile_size is not None:
+            transformer.elementwise_fusion.tile_size = tile_size
+        comp = transformer.computation(outputs, *inputs)
+        results = [np.copy(r) for r in comp(*values)]
+        with open(transformer.code.filename) as f:
+            source = f.read()
+    return results, source
+
+
+@pytest.mark.parametrize("tile_size", [None, 200, 1])
+def test_fused_lstm_cell_matches_unfused(tile_size):
+    expected, source = run_lstm_cell(elementwise_fusion=False)
+    assert '_rows' not in source
+
+    results, source = run_lstm_cell(elementwise_fusion=True, tile_size=tile_size)
+    assert '_rows = slice' in source
+    for result, ref in zip(results, expected):
+        ng.testing.assert_allclose(result, ref, rtol=1e-5, atol=1e-6)
+
+
+def test_small_tensors_not_fused():
+    H = ng.make_axis(length=4)
+    N = ng.make_axis(length=8, name='N')
+    x = ng.placeholder([H, N])
+    y = ng.tanh(x * x + x)
+    with closing(ngt.make_transformer()) as transformer:
+        comp = transformer.computation(y, x)
+        x_value = np.ones((4, 8), dtype=np.float32)
+        ng.testing.assert_allclose(comp(x_value), np.tanh(2 * x_value), rtol=1e-5)
+        with open(transformer.code.filename) as f:
+            assert '_rows' not in f.read()
@@ -0,0 +1,80 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+from contextlib import closing
+import json
+
+import numpy as np
+
+import ngraph as ng
+import ngraph.transformers as ngt
+
+
+def make_graph():
+    N = ng.make_axis(length=4, name='N')
+    C = ng.make_axis(length=3)
+    x = ng.placeholder([C, N])
+    with ng.metadata(layer_type='activation'):
+        y = ng.tanh(x)
+    with ng.metadata(layer_type='affine', recurrent_step='0'):
+        z = ng.sum(y * x, out_axes=())
+    return x, z
+
+
+def test_profiled_results_and_stats(tmpdir):
+    x, z = make_graph()
+    x_value = np.arange(12, dtype=np.float32).reshape(3, 4) / 12
+
+    factory = ngt.make_transformer_factory('cpu', profile=True)
+    with closing(factory()) as transformer:
+        comp = transformer.computation(z, x)
+        for _ in range(3):
+            result = comp(x_value)
+        profiler = transformer.profiler
+
+    ng.testing.assert_allclose(result, np.sum(np.tanh(x_value) * x_value), rtol=1e-5)
+
+    summary = profiler.summary()
+    assert len(summary) > 0
+    assert all(stats.calls == 3 for stats in summary)
+    assert [stats.total for stats in summary] == sorted((stats.total for stats in summary),
+                                                        reverse=True)
+
+    layer_types = set(stats.key for stats in profiler.summary(group_by='layer_type'))
+    assert {'activation', 'affine'} <= layer_types
+    steps = [stats for stats in profiler.summary(group_by='recurrent_step')
+             if stats.key == '0']
+    assert len(steps) == 1
+
+    assert 'calls' in profiler.table()
+    assert 'activation' in profiler.table(group_by='layer_type')
+
+    filename = str(tmpdir.join('trace.json'))
+    profiler.save_chrome_trace(filename)
+    with open(filename) as f:
+        trace = json.load(f)
+    durations = [event for event in trace['traceEvents'] if event['ph'] == 'X']
+    assert len(durations) == 3 * len(summary)
+
+    profiler.reset()
+    assert profiler.summary() == []
+
+
+def test_default_code_not_profiled():
+    x, z = make_graph()
+    with closing(ngt.make_transformer()) as transformer:
+        transformer.computation(z, x)
+        transformer.initialize()
+        assert transformer.profiler is None
+        assert 'op_profiler' not in transformer.globals
@@ -0,0 +1,182 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+from contextlib import closing
+import threading
+
+import numpy as np
+import pytest
+
+import ngraph as ng
+import ngraph.transformers as ngt
+from ngraph.transformers.cpu.cpuengine import BatchSplitter
+from ngraph.transformers.cpu.scheduler import OpScheduler
+
+
+def make_graph():
+    F = ng.make_axis(length=3, name='F')
+    N = ng.make_axis(length=4, name='N')
+    x = ng.placeholder([F, N])
+    w = ng.variable([F], initial_value=np.arange(3.))
+    # Two branches that do not depend on each other, and an update of w
+    left = ng.sum(ng.tanh(x * w) + 1, out_axes=[N])
+    right = ng.sum(ng.exp(x) * 2, out_axes=[N])
+    update = ng.assign(w, w + ng.sum(x, out_axes=[F]))
+    return x, w, left + right, update
+
+
+@pytest.mark.parametrize('kwargs', [dict(),
+                                    dict(memory_planning=True),
+                                    dict(elementwise_fusion=True, memory_planning=True),
+                                    dict(profile=True)])
+def test_parallel_results(kwargs):
+    x_value = np.random.rand(3, 4).astype(np.float32)
+
+    results = []
+    for workers in (None, 1, 3):
+        x, w, y, update = make_graph()
+        factory = ngt.make_transformer_factory('cpu', parallel_workers=workers, **kwargs)
+        with closing(factory()) as transformer:
+            computation = transformer.computation([y, update, w], x)
+            runs = [computation(x_value) for _ in range(3)]
+            results.append(([run[0] for run in runs], runs[-1][2]))
+
+    for runs, w_value in results[1:]:
+        for result, expected in zip(runs, results[0][0]):
+            ng.testing.assert_allclose(result, expected, rtol=1e-6)
+        ng.testing.assert_allclose(w_value, results[0][1], rtol=1e-6)
+    ng.testing.assert_allclose(results[0][1], np.arange(3.) + 3 * x_value.sum(axis=1),
+                               rtol=1e-5)
+
+
+def test_independent_ops_are_not_ordered():
+    x, w, y, update = make_graph()
+    with closing(ngt.make_transformer_factory('cpu', parallel_workers=2)()) as transformer:
+        computation = transformer.computation([y, update], x)
+        scheduler = transformer.scheduler
+        runs = []
+
+        def run(executor, tasks, counts, successors):
+            runs.append(counts)
+            return OpScheduler.run(scheduler, executor, tasks, counts, successors)
+
+        scheduler.run = run
+        computation(np.ones((3, 4)))
+    counts, = runs
+    assert len(counts) > 2
+    assert sum(count == 0 for count in counts) >= 2
+
+
+def test_scheduler_order():
+    # A diamond, followed by a chain
+    successors = ((1, 2), (3,), (3,), (4,), ())
+    counts = (0, 1, 1, 2, 1)
+    finished = []
+    lock = threading.Lock()
+
+    def task(index):
+        def run(executor):
+            with lock:
+                finished.append(index)
+        return run
+
+    scheduler = OpScheduler(3)
+    try:
+        for _ in range(10):
+            del finished[:]
+            scheduler.run(None, [task(index) for index in range(5)], counts, successors)
+            assert sorted(finished) == list(range(5))
+            position = dict((index, finished.index(index)) for index in range(5))
+            for index, after in enumerate(successors):
+                assert all(position[index] < position[other] for other in after)
+    finally:
+        scheduler.close()
+
+
+def test_scheduler_error():
+    ran = []
+
+    def fail(executor):
+        raise RuntimeError('task failed')
+
+    scheduler = OpScheduler(2)
+    try:
+        with pytest.raises(RuntimeError):
+            scheduler.run(None, [fail, ran.append], (0, 1), ((1,), ()))
+        assert ran == []
+        scheduler.run(None, [ran.append], (0,), ((),))
+        assert ran == [None]
+    finally:
+        scheduler.close()
+    assert scheduler.threads == []
+
+    with pytest.raises(ValueError):
+        OpScheduler(0)
+
+
+def test_intra_op_results():
+    C = ng.make_axis(length=5, name='C')
+    F = ng.make_axis(length=300, name='F')
+    N = ng.make_axis(length=256, name='N')
+    x = ng.placeholder([F, N])
+    labels = ng.placeholder([N])
+    # A run of fused elementwise ops, larger than a tile, a reduction and a one-hot op
+    y = ng.tanh(x * x + x)
+    z = ng.max(ng.exp(x), out_axes=[N])
+    hot = ng.one_hot(labels, axis=C)
+    x_value = np.random.rand(300, 256).astype(np.float32)
+    labels_value = np.random.randint(5, size=256).astype(np.float32)
+
+    results = []
+    for workers in (None, 3):
+        factory = ngt.make_transformer_factory('cpu', intra_op_workers=workers,
+                                               intra_op_min_size=1, elementwise_fusion=True)
+        with closing(factory()) as transformer:
+            computation = transformer.computation([y, z, hot], x, labels)
+            results.append(computation(x_value, labels_value))
+            with open(transformer.code.filename) as f:
+                source = f.read()
+        assert ('op_splitter.split(_fused_part' in source) == (workers is not None)
+
+    for result, expected in zip(*results):
+        ng.testing.assert_allclose(result, expected, rtol=1e-6)
+    ng.testing.assert_allclose(results[0][2], np.eye(5)[:, labels_value.astype(int)])
+
+
+def test_batch_splitter():
+    splitter = BatchSplitter(3, min_size=10)
+    try:
+        assert splitter.parts(7, 10) == [slice(0, 2), slice(2, 4), slice(4, 7)]
+        assert splitter.parts(2, 10) == [slice(0, 1), slice(1, 2)]
+        assert splitter.parts(7, 9) == [slice(0, 7)]
+
+        x = np.random.rand(4, 5)
+        row = np.random.rand(5)
+        out = np.empty((4, 5))
+        splitter.elementwise(np.add, out, x, row)
+        np.testing.assert_array_equal(out, x + row)
+        splitter.elementwise(np.multiply, out, x, 2.)
+        np.testing.assert_array_equal(out, x * 2)
+
+        # An output that overlaps an argument through another view is computed whole
+        square = np.arange(25.).reshape(5, 5)
+        splitter.elementwise(np.add, square, square.T, 1.)
+        np.testing.assert_array_equal(square, np.arange(25.).reshape(5, 5).T + 1)
+
+        x = np.random.rand(3, 8, 4)
+        out = np.empty(8)
+        splitter.reduce(np.sum, x, (0, 2), out)
+        np.testing.assert_allclose(out, x.sum(axis=(0, 2)))
+    finally:
+        splitter.close()
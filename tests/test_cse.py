@@ -0,0 +1,83 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+from contextlib import closing
+
+import numpy as np
+
+import ngraph as ng
+import ngraph.transformers as ngt
+from ngraph.transformers.passes.cse import CSEPass
+
+
+class StubTransformer(object):
+    pass
+
+
+def test_cse_merges_duplicate_chains():
+    C = ng.make_axis(length=4)
+    N = ng.make_axis(length=2, name='N')
+    x = ng.placeholder([C, N])
+    y = ng.placeholder([C, N])
+    a = ng.tanh(x + y) * 2.0
+    b = ng.tanh(y + x) * 2.0
+    c = ng.tanh(x - y)
+    cse = CSEPass()
+    cse.do_pass([a, b, c], StubTransformer())
+    assert b.forwarded is a.forwarded
+    assert c.forwarded is not a.forwarded
+    assert cse.eliminated >= 3
+
+
+def test_cse_keeps_reads_around_writes():
+    v = ng.variable((), initial_value=1.0)
+    before = v + 1.0
+    after = v + 1.0
+    seq = ng.sequential([before, ng.assign(v, v + 2.0), after])
+    comp = ng.computation([before, seq])
+    CSEPass().do_pass([comp], StubTransformer())
+    assert after.forwarded is not before.forwarded
+
+    with closing(ngt.make_transformer()) as transformer:
+        v = ng.variable((), initial_value=1.0)
+        before = v + 1.0
+        after = ng.sequential([before, ng.assign(v, v + 2.0), v + 1.0])
+        computation = transformer.computation([before, after])
+        before_value, after_value = computation()
+        assert before_value == 2.0 and after_value == 4.0
+
+
+def make_graph(rng):
+    C = ng.make_axis(length=8)
+    H = ng.make_axis(length=6)
+    N = ng.make_axis(length=4, name='N')
+    x = ng.placeholder([C, N])
+    w = ng.variable([H, C], initial_value=rng.uniform(-1, 1, (6, 8)))
+    h1 = ng.tanh(ng.dot(w, x))
+    h2 = ng.tanh(ng.dot(w, x))
+    cost = ng.sum(h1 * h2 + ng.exp(ng.dot(w, x)), out_axes=())
+    return x, [cost, ng.deriv(cost, w)]
+
+
+def test_cse_results_match():
+    x_value = np.random.RandomState(1).uniform(-1, 1, (8, 4))
+    results = []
+    for cse in (False, True):
+        x, outputs = make_graph(np.random.RandomState(0))
+        factory = ngt.make_transformer_factory('cpu', cse=cse)
+        with closing(factory()) as transformer:
+            comp = transformer.computation(outputs, x)
+            results.append([np.copy(r) for r in comp(x_value)])
+    for result, ref in zip(results[1], results[0]):
+        ng.testing.assert_allclose(result, ref, rtol=1e-5)
@@ -12,9 +12,12 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ----------------------------------------------------------------------------
+import pytest
+
 import ngraph as ng
-from ngraph.op_graph.op_graph import as_op
-from ngraph.transformers.passes.passes import SimplePrune
+from ngraph.op_graph.op_graph import Op, as_op, ExpOp, LogOp, NegativeOp, TanhOp
+from ngraph.transformers.passes.passes import GraphBuildingPass, GraphPassManager, OpGraph, \
+    SimplePrune
 from orderedset import OrderedSet
 
 
@@ -37,3 +40,71 @@ def test_simpleprune_graph_pass():
     base_op, simple_graph = get_simple_graph()
     SimplePrune().do_pass([simple_graph], transformer)
     assert simple_graph.forwarded is base_op
+
+
+def test_op_graph_replace_keeps_order():
+    x = ng.placeholder(())
+    y = ng.exp(x)
+    z = ng.log(y) + y
+    graph = OpGraph([z])
+    rep = ng.tanh(x) * 2.0
+    graph.replace(y, rep)
+    ops = graph.ordered_ops
+    assert ops == Op.ordered_ops([z.forwarded])
+    assert y not in ops
+    positions = dict((op, index) for index, op in enumerate(ops))
+    for op in ops:
+        for dep in op.all_deps:
+            assert positions[dep.forwarded] < positions[op]
+
+
+def test_graph_pass_manager_stats():
+    transformer = StubTransformer()
+    base_op = as_op(ng.constant(5.0))
+    graph = ng.log(ng.exp(ng.log(ng.exp(base_op)))) + base_op
+    num_ops = len(Op.ordered_ops([graph]))
+    manager = GraphPassManager()
+    manager.run([SimplePrune()], [graph], transformer)
+    assert len(manager.stats) == 1
+    stats = manager.stats[0]
+    assert stats.name == 'SimplePrune'
+    assert stats.rewrites >= 2
+    # later rounds only visit the ops affected by the replacements
+    assert stats.visits < stats.rounds * num_ops
+
+
+class TanhChainPass(GraphBuildingPass):
+    """
+    Replaces exp(log(x)) with x, and a chain of levels tanh ops of a placeholder x with -x.
+    """
+    def __init__(self, levels):
+        super(TanhChainPass, self).__init__()
+        self.levels = levels
+
+    def visit(self, op):
+        if isinstance(op, ExpOp) and isinstance(op.args[0], LogOp):
+            self.replace_op(op, op.args[0].args[0])
+            return
+        arg = op
+        for _ in range(self.levels):
+            if not isinstance(arg, TanhOp):
+                return
+            arg = arg.args[0]
+        if arg.tensor.is_placeholder:
+            self.replace_op(op, -arg)
+
+
+@pytest.mark.parametrize('levels', [3, 5])
+def test_graph_building_pass_fixpoint(levels):
+    transformer = StubTransformer()
+    x = ng.placeholder(())
+    # The pattern only matches once exp(log(x)) is replaced, below all its levels
+    y = ng.exp(ng.log(x))
+    for _ in range(levels):
+        y = ng.tanh(y)
+    y = y + 1
+    graph_pass = TanhChainPass(levels)
+    graph_pass.do_pass([y], transformer)
+    assert graph_pass.rewrites == 2
+    assert isinstance(y.forwarded.args[0], NegativeOp)
+    assert y.forwarded.args[0].args[0].tensor is x
@@ -411,10 +411,10 @@ def test_terminate_op(transformer_factory):
     assert len(baseline) == 0
     with ExecutorFactory() as ex:
         comp = ex.executor(termOp)
-        assert len(active_children()) == 1
+        assert len(active_children()) == 0
         with pytest.raises(RuntimeError):
             comp()
-        assert len(active_children()) == 1
+        assert len(active_children()) == 0
     assert len(active_children()) == len(baseline)
 
 
@@ -425,12 +425,58 @@ def test_process_leak(transformer_factory):
     assert len(active_children()) == 0
     with ExecutorFactory() as ex:
         comp = ex.executor(x)
-        assert len(active_children()) == 1
+        assert len(active_children()) == 0
         comp()
-        assert len(active_children()) == 2
+        assert len(active_children()) == 1
     assert len(active_children()) == len(baseline)
 
 
+def test_pipelined_computation(transformer_factory):
+    H = ng.make_axis(length=4, name='height')
+    with ng.metadata(device_id='0'):
+        x = ng.placeholder([H])
+        x_plus_one = x + 1
+    with ng.metadata(device_id='1'):
+        x_plus_two = x_plus_one + 1
+    values = [np.full(4, step, dtype=np.float32) for step in range(6)]
+    with closing(ngt.make_transformer_factory('hetr')()) as transformer:
+        comp = transformer.computation([x_plus_one, x_plus_two], x)
+        results = list(comp.pipeline([(value,) for value in values], depth=3))
+        assert len(results) == len(values)
+        for value, (plus_one, plus_two) in zip(values, results):
+            np.testing.assert_array_equal(plus_one, value + 1)
+            np.testing.assert_array_equal(plus_two, value + 2)
+        comp.submit(values[0])
+        comp.submit(feed_dict={x: values[1]})
+        np.testing.assert_array_equal(comp.collect()[1], values[0] + 2)
+        np.testing.assert_array_equal(comp.collect()[0], values[1] + 1)
+
+
+def test_computation_out(transformer_factory):
+    H = ng.make_axis(length=4, name='height')
+    with ng.metadata(device_id='1'):
+        x = ng.placeholder([H])
+        x_plus_one = x + 1
+        x_plus_two = x + 2
+    value = np.arange(4, dtype=np.float32)
+    with closing(ngt.make_transformer_factory('hetr')()) as transformer:
+        comp = transformer.computation([x_plus_one, x_plus_two], x)
+        # Hetr computations are all created before the first run
+        set_comp = transformer.computation({x_plus_two}, x)
+        out = np.zeros(4, dtype=np.float32)
+        plus_one, plus_two = comp(value, out=(None, out), copy=True, bind_inputs=True)
+        assert plus_two is out
+        np.testing.assert_array_equal(out, value + 2)
+        np.testing.assert_array_equal(plus_one, value + 1)
+
+        # The returned op, which is a copy when the graph has been serialized
+        op, = set_comp.computation.returns
+        result = set_comp(value, out={op: out})
+        assert result[op] is out
+        with pytest.raises(TypeError):
+            set_comp(value, outs=out)
+
+
 ax_A = ng.make_axis(4)
 ax_B = ng.make_axis(6)
 ax_C = ng.make_axis(12)
@@ -549,7 +595,7 @@ def test_allreduce_op(config):
         ar_op = CPUQueueAllReduceOp(x[i], c['func'])
         if (i != 0):
             ar_op.idx = i
-            ar_op._shared_queues = y[0].shared_queues
+            ar_op._exchange = y[0].exchange
         y.append(ar_op)
 
     for i in range(len(c['device_id'])):
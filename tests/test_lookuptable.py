@@ -16,7 +16,7 @@ import itertools as itt
 import numpy as np
 
 import ngraph as ng
-from ngraph.op_graph.lookuptable import lookuptable_update
+from ngraph.op_graph.lookuptable import lookuptable_update, update_lut_rows
 import ngraph.transformers as ngt
 from ngraph.testing import RandomTensorGenerator, ExecutorFactory
 from ngraph.frontends.neon import ax
@@ -52,12 +52,12 @@ def lut_fprop_ref(lut, idx):
     return lut.take(idx.flatten(), 0)
 
 
-def lut_update_ref(error, lut, idx, pad_idx):
+def lut_update_ref(error, lut_shape, idx, pad_idx):
     """
     Reference implementation of the lookuptable update
     """
     unqidx, inv = np.unique(idx.flatten(), return_inverse=True)
-    dw_ref = np.zeros(lut.shape)
+    dw_ref = np.zeros(lut_shape)
     groups = [np.where(inv == i) for i in range(len(unqidx))]
 
     for (wrd_id, group) in zip(unqidx, groups):
@@ -111,10 +111,35 @@ def test_lut(transformer_factory, lut_args):
         update_lut = update_fun(update_value, lut_value, idx_value).copy()
 
         # compare bprop (udpate)
-        update_ref = lut_update_ref(update_value, lut_value, idx_value, pad_idx=pad_idx)
+        update_ref = lut_update_ref(update_value, lut_value.shape, idx_value, pad_idx=pad_idx)
         ng.testing.assert_allclose(update_lut, update_ref, rtol=0.0, atol=1.0e-5)
 
 
+def test_lut_rows(transformer_factory):
+    """
+    test the row-sparse form of the lut update
+    """
+    pad_idx = 0
+    with ExecutorFactory() as ex:
+        V = ng.make_axis(10)
+        F = ng.make_axis(7)
+        N = ng.make_axis(32, name='N')
+
+        lut = ng.placeholder([V, F])
+        idx = ng.placeholder([N])
+        ax_out = ng.make_axes([N, F])
+        lut_out_ng = ng.lookuptable(lut, idx, ax_out, pad_idx=pad_idx)
+        update_error = ng.placeholder(ax_out)
+        rows_fun = ex.executor(update_lut_rows(update_error, idx, lut_out_ng), update_error, idx)
+
+        idx_value = rng.random_integers(0, V.length - 1, idx.axes)
+        update_value = rng.uniform(-1, 1, update_error.axes)
+        update_ref = lut_update_ref(update_value, lut.axes.lengths, idx_value, pad_idx=pad_idx)
+        ng.testing.assert_allclose(rows_fun(update_value, idx_value),
+                                   update_ref.take(idx_value.astype(int), 0),
+                                   rtol=0.0, atol=1.0e-5)
+
+
 if __name__ == '__main__':
     factory = ngt.make_transformer_factory('cpu')
     ngt.set_transformer_factory(factory)
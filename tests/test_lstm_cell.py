@@ -0,0 +1,70 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+import numpy as np
+import pytest
+
+import ngraph as ng
+from ngraph.testing import check_derivative, ExecutorFactory
+
+Gates = ng.make_axis(length=4, name='Gates')
+H = ng.make_axis(length=5, name='H')
+N = ng.make_axis(length=3, name='N')
+
+
+def sigmoid(x):
+    return 1. / (1. + np.exp(-x))
+
+
+def make_cell():
+    ifog = ng.placeholder([H, Gates, N])
+    c_prev = ng.placeholder([H, N])
+    h_weights = ng.constant(np.random.randn(5, 3), [H, N])
+    c_weights = ng.constant(np.random.randn(5, 3), [H, N])
+    h, c = ng.lstm_cell(ifog, c_prev, Gates)
+    cost = ng.sum(h * h_weights, out_axes=()) + ng.sum(c * c_weights, out_axes=())
+    return ifog, c_prev, h, c, cost
+
+
+def test_lstm_cell_fprop():
+    ifog, c_prev, h, c = make_cell()[:4]
+    ifog_value = np.random.randn(5, 4, 3) * 3
+    c_prev_value = np.random.randn(5, 3)
+
+    with ExecutorFactory() as ex:
+        h_value, c_value = ex.executor([h, c], ifog, c_prev)(ifog_value, c_prev_value)
+
+    i, f, o = (sigmoid(ifog_value[:, k]) for k in range(3))
+    g = np.tanh(ifog_value[:, 3])
+    c_expected = f * c_prev_value + i * g
+    ng.testing.assert_allclose(c_value, c_expected, rtol=1e-5, atol=1e-6)
+    ng.testing.assert_allclose(h_value, o * np.tanh(c_expected), rtol=1e-5, atol=1e-6)
+
+
+def test_lstm_cell_deriv():
+    ifog, c_prev, h, c, cost = make_cell()
+    ifog_value = np.random.randn(5, 4, 3)
+    c_prev_value = np.random.randn(5, 3)
+    check_derivative(cost, ifog, 1e-3, ifog_value, [c_prev], [c_prev_value],
+                     rtol=1e-2, atol=1e-3)
+    check_derivative(cost, c_prev, 1e-3, c_prev_value, [ifog], [ifog_value],
+                     rtol=1e-2, atol=1e-3)
+
+
+def test_lstm_cell_axes():
+    c_prev = ng.placeholder([H, N])
+    with pytest.raises(ValueError):
+        ng.lstm_cell(ng.placeholder([Gates, H]), c_prev, Gates)
+    with pytest.raises(ValueError):
+        ng.lstm_cell(ng.placeholder([H, N]), c_prev, H)
@@ -0,0 +1,91 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+from contextlib import closing
+
+import numpy as np
+
+import ngraph as ng
+import ngraph.transformers as ngt
+from ngraph.testing import RandomTensorGenerator
+from ngraph.transformers.passes.liveness import plan_offsets
+
+
+def test_plan_offsets_disjoint_ranges_share():
+    offsets, total = plan_offsets([('a', 100, 0, 1), ('b', 100, 2, 3)], alignment=64)
+    assert offsets['a'] == offsets['b'] == 0
+    assert total == 128
+
+
+def test_plan_offsets_overlapping_ranges_separate():
+    offsets, total = plan_offsets([('a', 100, 0, 2), ('b', 64, 2, 3), ('c', 32, 3, 4)],
+                                  alignment=64)
+    assert offsets['a'] != offsets['b']
+    # c is only live with b, so it reuses the storage of a
+    assert offsets['c'] == offsets['a']
+    assert total == 192
+
+
+def make_mlp_graph(rng):
+    C = ng.make_axis(length=16)
+    H = ng.make_axis(length=32)
+    N = ng.make_axis(length=8, name='N')
+    x = ng.placeholder([C, N])
+    w1 = ng.variable([H, C], initial_value=lambda axes: rng.uniform(-1, 1, axes))
+    w2 = ng.variable([C, H], initial_value=lambda axes: rng.uniform(-1, 1, axes))
+    h = ng.tanh(ng.dot(w1, x))
+    h = ng.exp(-ng.square(h)) * h
+    y = ng.tanh(ng.dot(w2, h))
+    cost = ng.sum(y * y, out_axes=())
+    grads = [ng.deriv(cost, w) for w in (w1, w2)]
+    return x, cost, grads
+
+
+def run_mlp(memory_planning):
+    rng = RandomTensorGenerator(0, np.float32)
+    x, cost, grads = make_mlp_graph(rng)
+    x_value = rng.uniform(-1, 1, x.axes)
+    factory = ngt.make_transformer_factory('cpu', memory_planning=memory_planning)
+    with closing(factory()) as transformer:
+        comp = transformer.computation([cost] + grads, x)
+        results = [np.copy(r) for r in comp(x_value)]
+        return results, transformer.memory_planner
+
+
+def test_memory_planning_matches_unplanned():
+    expected, _ = run_mlp(memory_planning=False)
+    results, planner = run_mlp(memory_planning=True)
+    for result, ref in zip(results, expected):
+        ng.testing.assert_allclose(result, ref, rtol=1e-5)
+    assert 0 < planner.planned_bytes < planner.unshared_bytes
+
+
+def test_arena_allocation():
+    rng = RandomTensorGenerator(0, np.float32)
+    x, cost, grads = make_mlp_graph(rng)
+    x_value = rng.uniform(-1, 1, x.axes)
+    factory = ngt.make_transformer_factory('cpu', arena_allocation=True, memory_planning=True)
+    with closing(factory()) as transformer:
+        comp = transformer.computation([cost] + grads, x)
+        results = [np.copy(r) for r in comp(x_value)]
+        arena = transformer.arena.storage
+        assert arena.ctypes.data % 64 == 0
+        for device_buffer in transformer.device_buffers:
+            buffer = transformer.globals[device_buffer.ref_str]
+            assert np.may_share_memory(buffer, arena)
+            assert buffer.ctypes.data % 64 == 0
+
+    expected, _ = run_mlp(memory_planning=False)
+    for result, ref in zip(results, expected):
+        ng.testing.assert_allclose(result, ref, rtol=1e-5)
@@ -12,6 +12,9 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ----------------------------------------------------------------------------
+import gc
+import weakref
+
 import numpy as np
 import pytest
 
@@ -308,3 +311,56 @@ def test_initial_value(transformer_factory):
     with ExecutorFactory() as ex:
         result = ex.executor(y)()
     ng.testing.assert_allclose(result, np.asarray(w, dtype=np.float32))
+
+
+def test_debug_info(C):
+    x = ng.placeholder([C])
+    y = ng.tanh(x) * 2
+    assert y.filename == __file__.replace('.pyc', '.py')
+    assert 'y = ng.tanh(x) * 2' in y.code_context[0]
+    assert x.lineno == y.lineno - 1
+
+    with ng.fast_construction():
+        z = ng.tanh(x)
+    assert z.filename is None and z.lineno is None
+    assert x.uuid != y.uuid != z.uuid
+
+
+def test_caches_release_ops(C):
+    x = ng.placeholder([C])
+    y = ng.tanh(x)
+    cost = ng.sum(y, out_axes=())
+    td = y.tensor_description()
+    assert y.tensor_description() is td
+    grad = ng.deriv(cost, x)
+    assert cost.adjoints(ng.constant(1)) is not None
+    with ExecutorFactory() as ex:
+        ex.executor([cost, grad], x)(np.ones(C.length))
+
+    refs = [weakref.ref(op) for op in (x, y, cost, grad)]
+    del x, y, cost, grad, td, ex
+    gc.collect()
+    assert all(ref() is None for ref in refs)
+
+
+def test_tensor_description_invalidated_by_forward(C):
+    x = ng.placeholder([C])
+    y = ng.tanh(x)
+    td = y.tensor_description()
+    y.forwarded.forward = ng.exp(x)
+    assert y.tensor_description() is not td
+
+
+def make_uuid(results):
+    results.put(ng.placeholder(()).uuid)
+
+
+def test_uuids_differ_across_fork():
+    import multiprocessing
+    results = multiprocessing.Queue()
+    child = multiprocessing.Process(target=make_uuid, args=(results,))
+    child.start()
+    child_uuid = results.get(timeout=30)
+    child.join()
+    # A uuid made by the parent after the fork, with the counter value the child used
+    assert ng.placeholder(()).uuid.int >> 64 != child_uuid.int >> 64
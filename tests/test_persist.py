@@ -0,0 +1,60 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+import gzip
+
+import numpy as np
+import pytest
+
+from ngraph.util.persist import convert_pickle_dataset, load_dataset, pickle, save_dataset
+
+
+def test_dataset_round_trip(tmpdir):
+    directory = str(tmpdir.join('dataset'))
+    image = np.arange(24, dtype=np.uint8).reshape(2, 3, 4)
+    save_dataset(directory, {'train': {'image': {'data': image, 'axes': ('N', 'C', 'W')},
+                                       'label': [3, 5]},
+                             'name': 'toy'})
+    dataset = load_dataset(directory)
+
+    assert sorted(dataset.keys()) == ['name', 'train']
+    assert dataset['name'] == 'toy'
+    assert dataset['train']['image']['axes'] == ('N', 'C', 'W')
+    loaded = dataset['train']['image']['data']
+    assert isinstance(loaded, np.memmap)
+    assert loaded.dtype == image.dtype
+    np.testing.assert_array_equal(loaded, image)
+    np.testing.assert_array_equal(dataset['train']['label'], [3, 5])
+
+    assert not isinstance(load_dataset(directory, mmap_mode=None)['train']['label'], np.memmap)
+
+
+@pytest.mark.parametrize('suffix', ['.pkl', '.pkl.gz'])
+def test_convert_pickle_dataset(tmpdir, suffix):
+    path = str(tmpdir.join('dataset' + suffix))
+    data = {'data': np.arange(6.).reshape(2, 3), 'labels': [1, 0], 'batch_label': 'batch 1'}
+    with (gzip.open if suffix.endswith('.gz') else open)(path, 'wb') as f:
+        pickle.dump(data, f)
+
+    directory = str(tmpdir.join('dataset'))
+    convert_pickle_dataset(path, directory)
+    dataset = load_dataset(directory)
+    np.testing.assert_array_equal(dataset['data'], data['data'])
+    np.testing.assert_array_equal(dataset['labels'], data['labels'])
+    assert dataset['batch_label'] == 'batch 1'
+
+
+def test_save_objects(tmpdir):
+    with pytest.raises(ValueError):
+        save_dataset(str(tmpdir.join('dataset')), {'objects': [None, 'a']})
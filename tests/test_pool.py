@@ -13,12 +13,17 @@
 # limitations under the License.
 # ----------------------------------------------------------------------------
 
+import itertools as itt
+import os
+
 import numpy as np
 import pytest
 
 import ngraph as ng
 from ngraph.op_graph.pooling import BpropPoolOp
 from ngraph.testing import executor
+from ngraph.transformers.cpu.cpuengine import Mkldnn
+from ngraph.transformers.cputransform import CPUPoolEngine
 from ngraph.frontends.neon.layer import output_dim
 
 
@@ -187,3 +192,95 @@ def test_gen_reference(transformer_factory, pool_args):
 
     ng.testing.assert_allclose(output_ref, output_value)
     ng.testing.assert_allclose(delta_ref, delta_value)
+
+
+def reference_pool(pf, input_value, error_value):
+    """
+    Loop based pooling, excluding padding from every window.
+    """
+    K, M, P, Q, N = pf.dimO
+    params = pf.pool_params
+    lengths = pf.dimI[:4]
+    window = [params[s] for s in ('J', 'T', 'R', 'S')]
+    pads = [params['pad_' + s] for s in ('c', 'd', 'h', 'w')]
+    strides = [params['str_' + s] for s in ('c', 'd', 'h', 'w')]
+
+    output = np.zeros(pf.dimO)
+    delta = np.zeros(pf.dimI)
+    for kmpq in itt.product(range(K), range(M), range(P), range(Q)):
+        patch = tuple(slice(max(x * stride - pad, 0), min(x * stride - pad + length, X))
+                      for x, stride, pad, length, X in zip(kmpq, strides, pads, window, lengths))
+        cols = input_value[patch].reshape((-1, N))
+        error = error_value[kmpq]
+        grad = np.zeros_like(cols)
+        if params['op'] == 'max':
+            argmax = np.argmax(cols, axis=0)
+            output[kmpq] = cols[argmax, np.arange(N)]
+            grad[argmax, np.arange(N)] = error
+        elif params['op'] == 'avg':
+            output[kmpq] = np.mean(cols, axis=0)
+            grad[:] = error / cols.shape[0]
+        else:
+            output[kmpq] = np.sqrt(np.sum(np.square(cols), axis=0))
+            grad[:] = cols / output[kmpq] * error
+        delta[patch] += grad.reshape(delta[patch].shape)
+    return output, delta
+
+
+@pytest.mark.transformer_dependent
+@pytest.mark.flex_disabled
+@pytest.mark.parametrize("op", ['max', 'avg'])
+@pytest.mark.parametrize("settings", [
+    dict(N=3, C=2, D=5, H=6, W=7, T=2, R=3, S=2, str_d=2, str_h=2, pad_h=1, pad_w=1),
+    dict(N=2, C=6, H=5, W=5, J=3, R=2, S=2, str_c=3),
+    dict(N=2, C=3, D=4, H=4, W=4, J=2, T=3, R=3, S=3, pad_d=1, pad_h=2, pad_w=2, str_w=3),
+], ids=['3d_pad_str', 'channel', '3d_channel_pad'])
+def test_pool_against_reference(transformer_factory, settings, op):
+    pf = PoolParams(op=op, **settings)
+    input_value = np.random.uniform(-1, 1, pf.dimI).astype(np.float32)
+    error_value = np.random.uniform(-1, 1, pf.dimO).astype(np.float32)
+
+    ip = ng.placeholder(axes=pf.ax_i)
+    ep = ng.placeholder(axes=pf.ax_o)
+    output = ng.pooling(pf.pool_params, ip, axes=pf.ax_o)
+    delta = BpropPoolOp(ep, ip, output)
+
+    with executor([output, delta], ip, ep) as pool_executor:
+        output_value, delta_value = pool_executor(input_value, error_value)
+
+    output_ref, delta_ref = reference_pool(pf, input_value, error_value)
+    ng.testing.assert_allclose(output_value, output_ref, rtol=1e-5, atol=1e-6)
+    ng.testing.assert_allclose(delta_value, delta_ref, rtol=1e-5, atol=1e-6)
+
+
+class Lengths(object):
+    """
+    Stands in for a device tensor when computing pooling slices.
+    """
+    def __init__(self, shape):
+        self.tensor_description = Lengths.Description(shape)
+
+    class Description(object):
+        def __init__(self, shape):
+            self.axes = self
+            self.lengths = shape
+            self.dtype = np.float64
+
+
+def test_l2_pool_fallback():
+    pf = PoolParams(N=2, C=2, D=3, H=5, W=4, T=2, R=3, S=2, pad_h=1, str_w=2, op='l2')
+    input_value = np.random.uniform(-1, 1, pf.dimI)
+    error_value = np.random.uniform(-1, 1, pf.dimO)
+
+    pool_slices = CPUPoolEngine.get_slices(Lengths(pf.dimI), Lengths(pf.dimO),
+                                           pf.pool_params)
+    # kernels that were not initialized always run the numpy fallback
+    engine = Mkldnn(os.path.join(os.path.dirname(ng.__file__), 'mkldnn_engine.so'))
+    output_value = np.empty(pf.dimO)
+    delta_value = np.empty(pf.dimI)
+    engine.fprop_pool('pool', pool_slices, input_value, output_value)
+    engine.bprop_pool('bprop_pool', pool_slices, error_value, delta_value)
+
+    output_ref, delta_ref = reference_pool(pf, input_value, error_value)
+    ng.testing.assert_allclose(output_value, output_ref)
+    ng.testing.assert_allclose(delta_value, delta_ref)
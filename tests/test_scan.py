@@ -0,0 +1,108 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+from contextlib import closing
+
+import numpy as np
+import pytest
+
+import ngraph as ng
+import ngraph.transformers as ngt
+
+T = ng.make_axis(length=4, name='T')
+F = ng.make_axis(length=3, name='F')
+G = ng.make_axis(length=3, name='G')
+N = ng.make_axis(length=2, name='N')
+
+
+def make_rnn(W_value, reverse):
+    """
+    A tanh RNN whose step also adds a non-sequence to its input and sums its outputs.
+    """
+    x = ng.placeholder([T, F, N])
+    h_init = ng.placeholder([F, N])
+    scale = ng.placeholder([F])
+    W = ng.variable([F, G], initial_value=W_value)
+
+    def step(x_t, h, total, scale):
+        h = ng.tanh(ng.dot(W, ng.cast_axes(h, [G, N])) + x_t * scale)
+        return [h, total + ng.sum(h, out_axes=())], [h * 2]
+
+    (h_final, total), (outputs,) = ng.scan(step, [x], [h_init, ng.constant(0.)], T,
+                                           non_sequences=[scale], reverse=reverse, pos=2)
+    cost = ng.sum(outputs, out_axes=()) + total * 3 + ng.sum(h_final, out_axes=())
+    return [x, h_init, scale, W], outputs, cost
+
+
+def reference_rnn(x, h_init, scale, W, reverse):
+    h = h_init
+    total = 0
+    outputs = [None] * x.shape[0]
+    positions = range(x.shape[0])
+    for t in reversed(positions) if reverse else positions:
+        h = np.tanh(W.dot(h) + x[t] * scale[:, None])
+        total += h.sum()
+        outputs[t] = 2 * h
+    return np.sum(outputs) + 3 * total + h.sum(), np.stack(outputs, 2)
+
+
+@pytest.mark.parametrize('reverse', [False, True])
+@pytest.mark.parametrize('memory_planning', [False, True])
+def test_scan_rnn(reverse, memory_planning):
+    values = [np.random.randn(4, 3, 2), np.random.randn(3, 2), np.random.randn(3),
+              np.random.randn(3, 3)]
+    (x, h_init, scale, W), outputs, cost = make_rnn(values[3], reverse)
+    expected_cost, expected_outputs = reference_rnn(*values, reverse=reverse)
+
+    factory = ngt.make_transformer_factory('cpu', memory_planning=memory_planning)
+    with closing(factory()) as transformer:
+        forward = transformer.computation([cost, outputs], x, h_init, scale)
+        backward = transformer.computation([ng.deriv(cost, param) for param in (x, h_init,
+                                                                                scale, W)],
+                                           x, h_init, scale)
+        cost_value, outputs_value = forward(*values[:3])
+        ng.testing.assert_allclose(cost_value, expected_cost, rtol=1e-5, atol=1e-5)
+        ng.testing.assert_allclose(outputs_value, expected_outputs, rtol=1e-5, atol=1e-5)
+        grads = [np.copy(grad) for grad in backward(*values[:3])]
+
+    epsilon = 1e-6
+    for value, grad in zip(values, grads):
+        numeric = np.zeros_like(value)
+        for index in np.ndindex(value.shape):
+            saved = value[index]
+            value[index] = saved + epsilon
+            numeric[index] = (reference_rnn(*values, reverse=reverse)[0] -
+                              expected_cost) / epsilon
+            value[index] = saved
+        ng.testing.assert_allclose(grad, numeric, rtol=1e-3, atol=1e-4)
+
+
+def test_scan_graph_size():
+    x = ng.placeholder([T, F, N])
+    short_ops = ng.Op.ordered_ops(ng.scan(lambda x_t, h: ([h + x_t], []),
+                                          [x], [ng.constant(0., [F, N])], T)[0])
+    L = ng.make_axis(length=100, name='L')
+    y = ng.placeholder([L, F, N])
+    long_ops = ng.Op.ordered_ops(ng.scan(lambda y_t, h: ([h + y_t], []),
+                                         [y], [ng.constant(0., [F, N])], L)[0])
+    assert len(short_ops) == len(long_ops)
+
+
+def test_scan_captured_tensor():
+    x = ng.placeholder([T, F, N])
+    bias = ng.placeholder([F])
+    with pytest.raises(ValueError):
+        ng.scan(lambda x_t, h: ([h + x_t + bias], []), [x], [ng.constant(0., [F, N])], T)
+    with pytest.raises(ValueError):
+        ng.scan(lambda x_t, h: ([h + x_t, h], []), [x], [ng.constant(0., [F, N])], T)
@@ -36,7 +36,8 @@ def strip_dict(d):
     instance or need more complex equality handling
     """
     keys = ('_NameableValue__name', '_axes', '_args', 'valfun', 'dtype',
-            'scale', '_tensor', '_send_node')
+            'scale', '_tensor', '_send_node', '_debug_location',
+            '_tdcache')
     for key in keys:
         if key in d:
             del d[key]
@@ -85,6 +86,22 @@ def test_tensor_to_protobuf():
     np.testing.assert_allclose(orig_tensor, py_tensor)
 
 
+def test_tensor_to_protobuf_raw_data():
+    for orig_tensor in (np.arange(12, dtype=np.float16).reshape(3, 4)[:, ::2],
+                        np.array([True, False]), np.arange(3, dtype=np.uint64)):
+        pb_tensor = ser.tensor_to_protobuf(orig_tensor)
+        assert len(pb_tensor.raw_data) == orig_tensor.nbytes
+        py_tensor = ser.pb_to_tensor(pb_tensor)
+        assert py_tensor.dtype == orig_tensor.dtype
+        np.testing.assert_array_equal(orig_tensor, py_tensor)
+
+
+def test_tensor_from_value_list():
+    pb_tensor = ser.ops_pb.Tensor(dtype=ser.ops_pb.FLOAT32, shape=[2, 2],
+                                  float_data=[1, 2, 3, 4])
+    np.testing.assert_array_equal(ser.pb_to_tensor(pb_tensor), [[1, 2], [3, 4]])
+
+
 def test_scalar_to_protobuf():
     orig_tensor = np.float32(12)
     pb_tensor = ser.tensor_to_protobuf(orig_tensor)
@@ -149,6 +166,27 @@ def test_full_graph_serialization_endtoend():
     for o1, o2 in zip(sorted(py_graph, key=lambda x: x.uuid),
                       sorted(orig_graph, key=lambda x: x.uuid)):
         assert_object_equality(o1, o2)
+        assert o1.graph_label_type == o2.graph_label_type
+    assert any(op.graph_label_type.startswith('<Const') for op in py_graph)
+
+
+def test_graph_serialization_data_file(tmpdir):
+    ax = ng.make_axes([ng.make_axis(name='C', length=1000), ng.make_axis(name='D', length=30)])
+    value = np.random.RandomState(0).uniform(-1, 1, ax.lengths).astype(np.float32)
+    weights = ng.variable(ax, initial_value=value).named('weights')
+    graph = ng.sum(weights * 2.0 + ng.constant(np.ones(ax.lengths), ax), out_axes=())
+
+    data_path = str(tmpdir.join('graph.data'))
+    ser_string = ser.serialize_graph([graph], only_return_handle_ops=True, data_path=data_path)
+    assert len(ser_string) < value.nbytes // 10
+    assert os.path.getsize(data_path) >= value.nbytes
+
+    py_graph = ser.deserialize_graph(ser_string, data_path=data_path)[0]
+    py_weights, = [op for op in Op.all_op_references([py_graph])
+                   if op.name.startswith('weights')]
+    np.testing.assert_array_equal(py_weights.initial_value, value)
+    with ng.testing.executor(py_graph) as ex:
+        ng.testing.assert_allclose(ex(), np.sum(value * 2.0 + 1), rtol=1e-4)
 
 
 def test_op_handle_selection():
@@ -0,0 +1,111 @@
+# ----------------------------------------------------------------------------
+# Copyright 2017 Nervana Systems Inc.
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#      http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+# ----------------------------------------------------------------------------
+import multiprocessing
+
+import numpy as np
+import pytest
+
+from ngraph.util.shared_queue import SharedArrayQueue, SharedArrayExchange, SharedBarrier
+
+
+def produce(queue, offset, count):
+    for step in range(count):
+        queue.put(np.full((3, 4), offset + step, dtype=np.float32))
+
+
+def test_shared_array_queue_between_processes():
+    queue = SharedArrayQueue((3, 4), np.float32, slots=2)
+    producers = [multiprocessing.Process(target=produce, args=(queue, offset, 5))
+                 for offset in (0, 100)]
+    for producer in producers:
+        producer.start()
+    values = [queue.get() for _ in range(10)]
+    for producer in producers:
+        producer.join()
+    assert all(value.shape == (3, 4) and value.dtype == np.float32 for value in values)
+    firsts = sorted(float(value[0, 0]) for value in values)
+    assert firsts == list(range(5)) + list(range(100, 105))
+
+
+def test_shared_array_queue_slices_and_out():
+    queue = SharedArrayQueue((4, 6), np.float32)
+    x = np.arange(24, dtype=np.float32).reshape(4, 6)
+    queue.put(x[:, 3:])
+    out = np.zeros((8, 3), dtype=np.float32)
+    assert queue.get(out[4:]) is not None
+    np.testing.assert_array_equal(out[4:], x[:, 3:])
+    queue.put(np.float32(7))
+    with queue.receive() as value:
+        assert value.shape == () and value == 7
+    with pytest.raises(ValueError):
+        queue.put(np.zeros(25))
+
+
+def allreduce(exchange, idx, results):
+    for step in range(3):
+        x = np.arange(35, dtype=np.float32).reshape(5, 7) * (idx + 1) + step
+        out = np.empty((7, 5), dtype=np.float32).T
+        exchange.allreduce(idx, x, out, 'mean')
+        results.put((idx, step, out.tolist()))
+
+
+@pytest.mark.parametrize('algorithm', ['ring', 'tree'])
+@pytest.mark.parametrize('parties', [1, 2, 3, 5])
+def test_shared_array_exchange(algorithm, parties):
+    exchange = SharedArrayExchange((5, 7), np.float32, parties, algorithm)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=allreduce, args=(exchange, idx, results))
+               for idx in range(parties)]
+    for worker in workers:
+        worker.start()
+    values = [results.get(timeout=30) for _ in range(3 * parties)]
+    for worker in workers:
+        worker.join()
+    for idx, step, out in values:
+        expected = np.arange(35).reshape(5, 7) * (parties + 1) / 2 + step
+        np.testing.assert_allclose(out, expected, rtol=1e-6)
+
+
+def test_shared_array_exchange_algorithm():
+    assert SharedArrayExchange((10,), np.float32, 8).algorithm == 'tree'
+    assert SharedArrayExchange((1 << 16,), np.float32, 8).algorithm == 'ring'
+    with pytest.raises(ValueError):
+        SharedArrayExchange((10,), np.float32, 8, 'butterfly')
+
+
+def pass_barrier(barrier, counter, idx, results):
+    for step in range(20):
+        with counter.get_lock():
+            counter.value += 1
+        barrier.wait()
+        # Every process has arrived, and none has arrived again
+        results.put((step, counter.value))
+        barrier.wait()
+
+
+def test_shared_barrier():
+    parties = 4
+    barrier = SharedBarrier(parties)
+    counter = multiprocessing.Value('l', 0)
+    results = multiprocessing.Queue()
+    workers = [multiprocessing.Process(target=pass_barrier,
+                                       args=(barrier, counter, idx, results))
+               for idx in range(parties)]
+    for worker in workers:
+        worker.start()
+    values = [results.get(timeout=30) for _ in range(20 * parties)]
+    for worker in workers:
+        worker.join()
+    assert all(value == parties * (step + 1) for step, value in values)
@@ -52,3 +52,23 @@ def test_stack(transformer_factory):
                 d_n = n_fun(a_i, *na_is)
                 d_s = s_fun(a_i, *na_is)
             ng.testing.allclose(d_n, d_s, rtol=rtol, atol=atol)
+
+
+@pytest.mark.transformer_dependent
+def test_slice_stack_deriv(transformer_factory):
+    W = ng.make_axis(length=4)
+    H = ng.make_axis(length=5)
+    I = ng.make_axis(length=3)
+
+    rng = RandomTensorGenerator(0, np.float32)
+    a_v = rng.uniform(0, 1, [I, W, H])
+
+    a = ng.placeholder([I, W, H])
+    s = ng.stack([ng.slice_along_axis(a, I, i) * 2 for i in range(I.length)], I, 0)
+    cost = ng.sum(ng.slice_along_axis(s, H, 1), out_axes=())
+
+    expected = np.zeros(a_v.shape)
+    expected[:, :, 1] = 2
+    with ExecutorFactory() as ex:
+        d_s = ex.derivative(cost, a)(a_v)
+    ng.testing.assert_allclose(d_s, expected, rtol=rtol, atol=atol)
@@ -12,10 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # ----------------------------------------------------------------------------
+from contextlib import closing
+
 import numpy as np
 import pytest
 
 import ngraph as ng
+import ngraph.transformers as ngt
 from ngraph.testing import executor
 
 
@@ -79,3 +82,46 @@ def test_execute_non_placeholder():
     with pytest.raises(ValueError):
         with executor(x + y, x, y) as ex:
             ex
+
+
+@pytest.mark.parametrize('kwargs', [dict(),
+                                    dict(memory_planning=True),
+                                    dict(memory_planning=True, arena_allocation=True)])
+def test_bound_inputs_and_outputs(kwargs):
+    F = ng.make_axis(length=3)
+    N = ng.make_axis(length=4)
+    x = ng.placeholder([F, N])
+    w = ng.variable([F], initial_value=np.arange(3.))
+    y = ng.sum(x * w, out_axes=[N])
+    x_value = np.random.rand(3, 4).astype(np.float32)
+    y_out = np.zeros(4, dtype=np.float32)
+
+    with closing(ngt.make_transformer_factory('cpu', **kwargs)()) as transformer:
+        computation = transformer.computation([y, x * 2, w], x)
+        # The ops of the computation, which are copies when it is serialized
+        x = computation.computation.parameters[0]
+        w = computation.computation.values[-1]
+        y_value, x2_value, w_value = computation(x_value, bind_inputs=True,
+                                                 out=[y_out, None, np.empty(3, np.float32)])
+        assert y_value is y_out
+        np.testing.assert_allclose(y_out, np.arange(3.).dot(x_value), rtol=1e-6)
+        np.testing.assert_allclose(x2_value, x_value * 2)
+        np.testing.assert_array_equal(w_value, np.arange(3.))
+        assert np.shares_memory(x.value.get(None), x_value)
+
+        # Binding the same input again leaves it bound
+        x_value[...] = 1
+        np.testing.assert_array_equal(computation(x_value, bind_inputs=True)[1], 2)
+        assert np.shares_memory(x.value.get(None), x_value)
+
+        y_value, x2_value, _ = computation(np.zeros((3, 4)), copy=True)
+        np.testing.assert_array_equal(y_value, 0)
+        np.testing.assert_array_equal(x_value, 1)
+        np.testing.assert_array_equal(w.value.get(None), np.arange(3.))
+        assert not np.shares_memory(x.value.get(None), x_value)
+        assert not np.shares_memory(x2_value, computation(x_value)[1])
+
+        # Values that do not match the parameter are copied
+        x_value = np.ones((4, 3), dtype=np.float32).T
+        computation(x_value, bind_inputs=True)
+        assert not np.shares_memory(x.value.get(None), x_value)